@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        # Registra las señales que invalidan la caché de API Keys, mantienen
+        # el índice de habilidades, la caché de publicaciones y aplican los
+        # PRAGMA de SQLite
+        from . import authentication, cache_publicaciones, db, matching  # noqa: F401
@@ -0,0 +1,142 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authentication import BaseAuthentication
+from rest_framework.exceptions import AuthenticationFailed
+
+from .models import Administrador, Estudiante
+
+
+class CacheApiKeys:
+    """
+    Caché en memoria (LRU + TTL) que asocia una API Key con el Estudiante
+    o Administrador dueño. Guarda además el índice inverso (modelo, pk) -> key
+    para poder invalidar una cuenta aunque su key ya haya sido rotada.
+
+    Se guardan los valores de los campos, no la instancia: cada lectura arma
+    una instancia nueva, así que dos hilos nunca comparten el mismo objeto.
+
+    La invalidación por señales solo alcanza al proceso que guardó o borró la
+    cuenta. En los demás workers una key rotada o borrada sigue autenticando
+    hasta que vence su entrada: el TTL (API_KEY_CACHE_TTL) es la cota de la
+    revocación y conviene mantenerlo corto.
+    """
+    def __init__(self, max_entradas=4096, ttl=60):
+        self.max_entradas = max_entradas
+        self.ttl = ttl
+        self._entradas = OrderedDict()
+        self._por_cuenta = {}
+        self._lock = threading.Lock()
+
+    def obtener(self, api_key):
+        with self._lock:
+            entrada = self._entradas.get(api_key)
+            if entrada is None:
+                return None
+            modelo, db, valores, expira = entrada
+            if expira < time.monotonic():
+                self._quitar(api_key)
+                return None
+            self._entradas.move_to_end(api_key)
+        return modelo.from_db(db, [campo.attname for campo in modelo._meta.concrete_fields], valores)
+
+    def guardar(self, api_key, cuenta):
+        with self._lock:
+            self._quitar(api_key)
+            self._quitar(self._por_cuenta.get(self._clave_cuenta(cuenta)))
+            valores = tuple(getattr(cuenta, campo.attname) for campo in cuenta._meta.concrete_fields)
+            self._entradas[api_key] = (type(cuenta), cuenta._state.db, valores, time.monotonic() + self.ttl)
+            self._por_cuenta[self._clave_cuenta(cuenta)] = api_key
+            while len(self._entradas) > self.max_entradas:
+                self._quitar(next(iter(self._entradas)))
+
+    def invalidar_cuenta(self, cuenta):
+        with self._lock:
+            self._quitar(self._por_cuenta.get(self._clave_cuenta(cuenta)))
+
+    def limpiar(self):
+        with self._lock:
+            self._entradas.clear()
+            self._por_cuenta.clear()
+
+    def _quitar(self, api_key):
+        entrada = self._entradas.pop(api_key, None)
+        if entrada is not None:
+            modelo, _, valores, _ = entrada
+            pk = valores[modelo._meta.concrete_fields.index(modelo._meta.pk)]
+            self._por_cuenta.pop((modelo.__name__, pk), None)
+
+    @staticmethod
+    def _clave_cuenta(cuenta):
+        return (type(cuenta).__name__, cuenta.pk)
+
+
+cache_api_keys = CacheApiKeys(
+    max_entradas=getattr(settings, 'API_KEY_CACHE_MAX_ENTRADAS', 4096),
+    ttl=getattr(settings, 'API_KEY_CACHE_TTL', 60),
+)
+
+
+def resolver_api_key(api_key):
+    """
+    Devuelve el Estudiante o Administrador dueño de la API Key, o None.
+    Solo consulta la base de datos si la key no está en caché.
+    """
+    cuenta = cache_api_keys.obtener(api_key)
+    if cuenta is not None:
+        return cuenta
+    cuenta = Estudiante.objects.filter(api_key=api_key).first()
+    if cuenta is None:
+        cuenta = Administrador.objects.filter(api_key=api_key).first()
+    if cuenta is not None:
+        cache_api_keys.guardar(api_key, cuenta)
+    return cuenta
+
+
+class ApiKeyAuthentication(BaseAuthentication):
+    """
+    Autentica la petición a partir del header X-API-Key. Deja en request.user
+    al Estudiante o Administrador correspondiente, resuelto una sola vez.
+    """
+    header = 'X-API-Key'
+
+    def authenticate(self, request):
+        api_key = request.headers.get(self.header)
+        if not api_key:
+            return None
+        cuenta = resolver_api_key(api_key)
+        if cuenta is None:
+            raise AuthenticationFailed("API Key inválida")
+        return (cuenta, api_key)
+
+    def authenticate_header(self, request):
+        return self.header
+
+
+@receiver(post_save, sender=Estudiante)
+@receiver(post_save, sender=Administrador)
+@receiver(post_delete, sender=Estudiante)
+@receiver(post_delete, sender=Administrador)
+def invalidar_cache_api_key(sender, instance, **kwargs):
+    # Cubre rotación de key, desactivación y borrado de la cuenta.
+    cache_api_keys.invalidar_cuenta(instance)
+
+
+def estudiante_de(request):
+    """Devuelve el Estudiante autenticado o lanza AuthenticationFailed."""
+    if isinstance(request.user, Estudiante):
+        return request.user
+    if request.auth is None:
+        raise AuthenticationFailed("Falta API Key")
+    raise AuthenticationFailed("API Key inválida")
+
+
+def administrador_de(request):
+    """Devuelve el Administrador autenticado o lanza AuthenticationFailed."""
+    if isinstance(request.user, Administrador):
+        return request.user
+    raise AuthenticationFailed("No tienes permisos de moderador")
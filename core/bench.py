@@ -0,0 +1,536 @@
+"""
+Utilidades compartidas por los comandos de benchmark.
+
+- base_de_datos_temporal: base SQLite desechable con las migraciones aplicadas.
+- generar_dataset: datos sintéticos reproducibles (misma semilla, mismos datos)
+  con proporciones realistas, insertados con bulk_create.
+- ejecutar_benchmark: recorre cada ruta de core/urls.py contra la app en el
+  mismo proceso (WSGI con hilos o ASGI con tareas) y mide throughput,
+  latencias p50/p95/p99 y consultas por petición.
+"""
+import asyncio
+import contextvars
+import datetime
+import json
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.db import connections, transaction
+from django.db.backends.signals import connection_created
+from django.test import AsyncClient, Client, override_settings
+from django.test.utils import (
+    setup_databases, setup_test_environment, teardown_databases, teardown_test_environment
+)
+from django.urls import URLPattern
+from django.utils import timezone
+
+from .contadores import recalcular as recalcular_contadores
+from .matching import filas_indice
+from .models import (
+    Administrador, CalificacionChat, Chat, ChatParticipante, Estudiante, HabilidadPerfil, Mensaje,
+    Notificacion, Perfil, Publicacion, Reporte, TokenVerificacion
+)
+from .reputacion import recalcular
+
+
+@contextmanager
+def base_de_datos_temporal():
+    """
+    Crea una base SQLite temporal en disco (con migraciones aplicadas) para que
+    los benchmarks no toquen la base real, y la elimina al terminar.
+    """
+    directorio = tempfile.mkdtemp(prefix='interu_bench_')
+    for alias in connections:
+        connections[alias].settings_dict.setdefault('TEST', {})['NAME'] = os.path.join(directorio, f'{alias}.sqlite3')
+    setup_test_environment()
+    anteriores = setup_databases(verbosity=0, interactive=False)
+    try:
+        yield
+    finally:
+        connections.close_all()
+        teardown_databases(anteriores, verbosity=0)
+        teardown_test_environment()
+        shutil.rmtree(directorio, ignore_errors=True)
+
+
+def percentil(valores, p):
+    """Percentil p (0-100) por rango más cercano; 0.0 si no hay valores."""
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    indice = max(0, min(len(ordenados) - 1, round(p / 100 * len(ordenados)) - 1))
+    return ordenados[indice]
+
+
+# ----------- DATASET SINTÉTICO -----------
+PASSWORD_BENCH = 'Benchmark123'
+
+PROPORCIONES = {
+    'publicaciones_por_estudiante': 3,
+    'chats_por_publicacion': 0.7,
+    'mensajes_por_chat': 15,
+    'chats_completados': 0.3,
+    'notificaciones_por_estudiante': 12,
+    'reportes_por_publicacion': 0.05,
+    'estudiantes_sin_verificar': 0.05,
+}
+
+HABILIDADES = [
+    'Python', 'Django', 'Excel avanzado', 'Inglés', 'Guitarra', 'Cálculo', 'Redacción',
+    'Photoshop', 'SQL', 'Java', 'Contabilidad', 'Fotografía', 'Estadística', 'Arduino',
+]
+
+
+@dataclass
+class DatasetSintetico:
+    """Ids y API Keys que necesitan los escenarios del benchmark."""
+    estudiantes: list = field(default_factory=list)     # (id, email, api_key), solo verificados
+    publicaciones: list = field(default_factory=list)   # (id, autor_id)
+    chats: list = field(default_factory=list)           # (id, autor_id, receptor_id)
+    notificaciones: list = field(default_factory=list)  # (id, estudiante_id)
+    reportes: list = field(default_factory=list)
+    tokens: list = field(default_factory=list)
+    api_keys: dict = field(default_factory=dict)        # estudiante_id -> api_key
+    administrador_api_key: str = ''
+    totales: dict = field(default_factory=dict)
+
+    def estudiante(self, i):
+        return self.estudiantes[i % len(self.estudiantes)]
+
+    def publicacion(self, i):
+        return self.publicaciones[i % len(self.publicaciones)]
+
+    def chat(self, i):
+        return self.chats[i % len(self.chats)]
+
+
+def _cantidad(rng, promedio):
+    """Entero aleatorio con la media indicada (uniforme entre 0 y 2*promedio)."""
+    entero = int(promedio)
+    return rng.randint(0, 2 * entero) if entero else int(rng.random() < promedio)
+
+
+def generar_dataset(estudiantes=200, semilla=0, lote=1000, proporciones=None):
+    """
+    Crea `estudiantes` Estudiantes con Perfil y, según PROPORCIONES,
+    Publicaciones, Chats con participantes, Mensajes, Calificaciones,
+    Notificaciones y Reportes. Todo con bulk_create en una transacción; al
+    final se materializa la reputación.
+    """
+    proporciones = {**PROPORCIONES, **(proporciones or {})}
+    rng = random.Random(semilla)
+    contraseña = make_password(PASSWORD_BENCH)
+    dataset = DatasetSintetico()
+
+    with transaction.atomic():
+        filas = Estudiante.objects.bulk_create([
+            Estudiante(
+                email=f'bench{i}@inacap.cl',
+                contraseña=contraseña,
+                verificado=rng.random() >= proporciones['estudiantes_sin_verificar'],
+                api_key=f'api_{rng.getrandbits(128):032x}',
+            )
+            for i in range(estudiantes)
+        ], batch_size=lote)
+        ids = [e.pk for e in filas]
+        dataset.api_keys = {e.pk: e.api_key for e in filas}
+        dataset.estudiantes = [(e.pk, e.email, e.api_key) for e in filas if e.verificado]
+
+        perfiles = [
+            Perfil(
+                estudiante_id=e.pk,
+                nombre=f'Estudiante {e.pk}',
+                biografia='Perfil generado para benchmark',
+                habilidades_ofrecidas=', '.join(rng.sample(HABILIDADES, 3)),
+                habilidades_buscadas=', '.join(rng.sample(HABILIDADES, 2)),
+            )
+            for e in filas
+        ]
+        Perfil.objects.bulk_create(perfiles, batch_size=lote)
+        HabilidadPerfil.objects.bulk_create(
+            [fila for perfil in perfiles for fila in filas_indice(perfil)], batch_size=lote
+        )
+
+        tokens = [
+            TokenVerificacion(
+                token=f'{rng.getrandbits(128):032x}', estudiante_id=e.pk,
+                fecha_expiracion=timezone.now() + datetime.timedelta(hours=24),
+            )
+            for e in filas if not e.verificado
+        ]
+        TokenVerificacion.objects.bulk_create(tokens, batch_size=lote)
+        dataset.tokens = [t.token for t in tokens]
+
+        publicaciones = Publicacion.objects.bulk_create([
+            Publicacion(
+                titulo=f'Clases de {habilidad}',
+                descripcion=f'Ofrezco ayuda con {habilidad.lower()} a cambio de otra habilidad.',
+                habilidad=rng.randint(1, 10),
+                estudiante_id=autor,
+            )
+            for autor in ids
+            for habilidad in (rng.choice(HABILIDADES) for _ in range(
+                _cantidad(rng, proporciones['publicaciones_por_estudiante'])
+            ))
+        ], batch_size=lote)
+        dataset.publicaciones = [(p.pk, p.estudiante_id) for p in publicaciones]
+
+        pares = []
+        for publicacion in publicaciones:
+            for _ in range(_cantidad(rng, proporciones['chats_por_publicacion'])):
+                receptor = rng.choice(ids)
+                if receptor != publicacion.estudiante_id:
+                    pares.append((publicacion, receptor, rng.random() < proporciones['chats_completados']))
+        chats = Chat.objects.bulk_create(
+            [Chat(publicacion=p, estado_intercambio=completado) for p, _, completado in pares], batch_size=lote
+        )
+        mensajes = []
+        for chat, (publicacion, receptor, _) in zip(chats, pares):
+            for n in range(1 + _cantidad(rng, proporciones['mensajes_por_chat'])):
+                autor = receptor if n % 2 == 0 else publicacion.estudiante_id
+                mensajes.append(Mensaje(chat=chat, estudiante_id=autor, texto=f'Mensaje {n}'))
+        Mensaje.objects.bulk_create(mensajes, batch_size=lote)
+
+        # Marca de lectura: la mayoría leyó todo el chat, el resto quedó a mitad
+        ids_por_chat = {}
+        for mensaje in mensajes:
+            ids_por_chat.setdefault(mensaje.chat_id, []).append(mensaje.pk)
+
+        def marca(chat):
+            ids_chat = ids_por_chat.get(chat.pk, [0])
+            return ids_chat[-1] if rng.random() < 0.8 else rng.choice(ids_chat)
+
+        ChatParticipante.objects.bulk_create([
+            participante
+            for chat, (publicacion, receptor, completado) in zip(chats, pares)
+            for participante in (
+                ChatParticipante(
+                    chat=chat, estudiante_id=publicacion.estudiante_id, rol='autor', calificado=completado,
+                    ultimo_leido=marca(chat),
+                ),
+                ChatParticipante(
+                    chat=chat, estudiante_id=receptor, rol='receptor', calificado=completado, ultimo_leido=marca(chat),
+                ),
+            )
+        ], batch_size=lote)
+        dataset.chats = [(chat.pk, p.estudiante_id, receptor) for chat, (p, receptor, _) in zip(chats, pares)]
+
+        CalificacionChat.objects.bulk_create([
+            CalificacionChat(chat=chat, evaluador_id=evaluador, puntaje=rng.randint(1, 5), comentario='Buen intercambio')
+            for chat, (publicacion, receptor, completado) in zip(chats, pares) if completado
+            for evaluador in (publicacion.estudiante_id, receptor)
+        ], batch_size=lote)
+
+        tipos = [tipo for tipo, _ in Notificacion.TIPO_CHOICES]
+        notificaciones = Notificacion.objects.bulk_create([
+            Notificacion(
+                estudiante_id=estudiante, tipo=rng.choice(tipos), mensaje='Notificación de benchmark',
+                leida=rng.random() < 0.5, chat=rng.choice(chats) if chats else None,
+            )
+            for estudiante in ids
+            for _ in range(_cantidad(rng, proporciones['notificaciones_por_estudiante']))
+        ], batch_size=lote)
+        dataset.notificaciones = [(n.pk, n.estudiante_id) for n in notificaciones]
+
+        reportes = Reporte.objects.bulk_create([
+            Reporte(publicacion=p, estudiante_id=rng.choice(ids), motivo='Contenido inapropiado')
+            for p in publicaciones if rng.random() < proporciones['reportes_por_publicacion']
+        ], batch_size=lote)
+        dataset.reportes = [r.pk for r in reportes]
+
+        administrador = Administrador.objects.create(nombre='Bench', email='admin@inacap.cl', contraseña=contraseña)
+        dataset.administrador_api_key = administrador.api_key
+
+    recalcular()
+    recalcular_contadores()
+    dataset.totales = {
+        'estudiantes': len(filas), 'publicaciones': len(publicaciones), 'chats': len(chats),
+        'mensajes': len(mensajes), 'notificaciones': len(notificaciones), 'reportes': len(reportes),
+    }
+    return dataset
+
+
+# ----------- ESCENARIOS -----------
+@dataclass
+class Peticion:
+    metodo: str
+    ruta: str
+    datos: dict = None
+    api_key: str = None
+
+
+@dataclass
+class Escenario:
+    nombre_url: str
+    metodo: str
+    construir: object  # (dataset, i) -> Peticion
+    # Los que modifican datos que otros leen (borrar, moderar) se ejecutan al final
+    destructivo: bool = False
+
+    @property
+    def etiqueta(self):
+        return f'{self.metodo} {self.nombre_url}'
+
+
+def _autor(ds, publicacion):
+    return ds.api_keys[publicacion[1]]
+
+
+def _escenarios():
+    E = Escenario
+    return [
+        E('register', 'POST', lambda ds, i: Peticion('POST', '/api/register/', {
+            'email': f'nuevo{i}@inacap.cl', 'contraseña': PASSWORD_BENCH, 'aceptar_politicas': True,
+        })),
+        E('activate', 'POST', lambda ds, i: Peticion(
+            'POST', '/api/activate/', {'token': ds.tokens[i % len(ds.tokens)] if ds.tokens else 'x'}
+        )),
+        E('login', 'POST', lambda ds, i: Peticion(
+            'POST', '/api/login/', {'email': ds.estudiante(i)[1], 'password': PASSWORD_BENCH}
+        )),
+        E('login-async', 'POST', lambda ds, i: Peticion(
+            'POST', '/api/login/async/', {'email': ds.estudiante(i)[1], 'password': PASSWORD_BENCH}
+        )),
+        E('publicaciones-list-create', 'GET', lambda ds, i: Peticion('GET', '/api/publicaciones/')),
+        E('publicaciones-list-create', 'POST', lambda ds, i: Peticion('POST', '/api/publicaciones/', {
+            'titulo': f'Publicación {i}', 'descripcion': 'Benchmark', 'habilidad': 1,
+        }, ds.estudiante(i)[2])),
+        E('publicaciones-buscar', 'GET', lambda ds, i: Peticion(
+            'GET', f'/api/publicaciones/buscar/?q={HABILIDADES[i % len(HABILIDADES)].split()[0]}'
+        )),
+        E('mis-publicaciones', 'GET', lambda ds, i: Peticion('GET', '/api/publicaciones/mias/', api_key=ds.estudiante(i)[2])),
+        E('publicaciones-detail', 'GET', lambda ds, i: Peticion('GET', f'/api/publicaciones/{ds.publicacion(i)[0]}/')),
+        E('publicaciones-update', 'PATCH', lambda ds, i: Peticion(
+            'PATCH', f'/api/publicaciones/{ds.publicacion(i)[0]}/editar/', {'titulo': f'Editada {i}'},
+            _autor(ds, ds.publicacion(i)),
+        )),
+        E('publicaciones-delete', 'DELETE', lambda ds, i: Peticion(
+            'DELETE', f'/api/publicaciones/{ds.publicacion(i)[0]}/eliminar/', api_key=_autor(ds, ds.publicacion(i)),
+        ), destructivo=True),
+        E('chat-list-create', 'GET', lambda ds, i: Peticion('GET', '/api/chats/', api_key=ds.estudiante(i)[2])),
+        E('chat-list-create', 'POST', lambda ds, i: Peticion(
+            'POST', '/api/chats/', {'publicacion': ds.publicacion(i)[0]}, ds.estudiante(i + 1)[2]
+        )),
+        E('chat-inbox', 'GET', lambda ds, i: Peticion('GET', '/api/chats/inbox/', api_key=ds.api_keys[ds.chat(i)[1]])),
+        E('chat-no-leidos', 'GET', lambda ds, i: Peticion('GET', '/api/chats/no-leidos/', api_key=ds.api_keys[ds.chat(i)[1]])),
+        E('chat-detail', 'GET', lambda ds, i: Peticion(
+            'GET', f'/api/chats/{ds.chat(i)[0]}/', api_key=ds.api_keys[ds.chat(i)[1]]
+        )),
+        E('chat-mensajes', 'GET', lambda ds, i: Peticion(
+            'GET', f'/api/chats/{ds.chat(i)[0]}/mensajes/', api_key=ds.api_keys[ds.chat(i)[1]]
+        )),
+        E('chat-marcar-leido', 'POST', lambda ds, i: Peticion(
+            'POST', f'/api/chats/{ds.chat(i)[0]}/leer/', {}, ds.api_keys[ds.chat(i)[2]]
+        )),
+        E('chat-completar', 'PATCH', lambda ds, i: Peticion(
+            'PATCH', f'/api/chats/{ds.chat(i)[0]}/completar/', {}, ds.api_keys[ds.chat(i)[1]]
+        )),
+        E('mensaje-list-create', 'GET', lambda ds, i: Peticion('GET', '/api/mensajes/', api_key=ds.api_keys[ds.chat(i)[2]])),
+        E('mensaje-list-create', 'POST', lambda ds, i: Peticion(
+            'POST', '/api/mensajes/', {'chat': ds.chat(i)[0], 'texto': f'Hola {i}'}, ds.api_keys[ds.chat(i)[2]]
+        )),
+        E('calificacion-chat', 'POST', lambda ds, i: Peticion(
+            'POST', '/api/calificaciones-chat/', {'chat': ds.chat(i)[0], 'puntaje': 1 + i % 5},
+            ds.api_keys[ds.chat(i)[2]],
+        )),
+        E('notificacion-list', 'GET', lambda ds, i: Peticion('GET', '/api/notificaciones/', api_key=ds.estudiante(i)[2])),
+        E('notificacion-marcar-leida', 'PATCH', lambda ds, i: Peticion(
+            'PATCH', f'/api/notificaciones/{ds.notificaciones[i % len(ds.notificaciones)][0]}/marcar-leida/', {},
+            ds.api_keys[ds.notificaciones[i % len(ds.notificaciones)][1]],
+        )),
+        E('notificaciones-marcar-todas-leidas', 'POST', lambda ds, i: Peticion(
+            'POST', '/api/notificaciones/marcar-todas-leidas/', {}, ds.estudiante(i)[2]
+        )),
+        E('contadores', 'GET', lambda ds, i: Peticion('GET', '/api/contadores/', api_key=ds.estudiante(i)[2])),
+        E('perfil-estudiante', 'GET', lambda ds, i: Peticion('GET', '/api/perfil/', api_key=ds.estudiante(i)[2])),
+        E('crear-perfil', 'POST', lambda ds, i: Peticion(
+            'POST', '/api/perfil/crear/', {'nombre': 'Repetido'}, ds.estudiante(i)[2]
+        )),
+        E('recomendaciones', 'GET', lambda ds, i: Peticion('GET', '/api/recomendaciones/', api_key=ds.estudiante(i)[2])),
+        E('reputacion-ranking', 'GET', lambda ds, i: Peticion('GET', '/api/reputacion/ranking/?minimo=1')),
+        E('crear-reporte', 'POST', lambda ds, i: Peticion(
+            'POST', '/api/reportes/', {'publicacion': ds.publicacion(i)[0], 'motivo': 'Spam'}, ds.estudiante(i)[2]
+        )),
+        E('listar-reportes', 'GET', lambda ds, i: Peticion('GET', '/api/reportes/listar/', api_key=ds.administrador_api_key)),
+        E('moderar-reporte', 'PATCH', lambda ds, i: Peticion(
+            'PATCH', f'/api/reportes/{ds.reportes[i % len(ds.reportes)] if ds.reportes else 0}/moderar/',
+            {'accion': 'eliminar'}, ds.administrador_api_key,
+        ), destructivo=True),
+        E('exportar', 'GET', lambda ds, i: Peticion(
+            'GET', f"/api/exportar/{('reportes', 'chats', 'publicaciones')[i % 3]}/", api_key=ds.administrador_api_key,
+        )),
+        E('cola-moderacion', 'GET', lambda ds, i: Peticion('GET', '/api/reportes/cola/', api_key=ds.administrador_api_key)),
+        E('moderar-reportes-lote', 'POST', lambda ds, i: Peticion(
+            'POST', '/api/reportes/moderar/',
+            {'accion': 'rechazar', 'reportes': ds.reportes[i * 50 % max(len(ds.reportes), 1):][:50]},
+            ds.administrador_api_key,
+        ), destructivo=True),
+    ]
+
+
+# Rutas que no se pueden medir como petición/respuesta
+RUTAS_EXCLUIDAS = {
+    'eventos-stream': 'respuesta en streaming que no termina',
+}
+
+
+def nombres_de_rutas():
+    """Nombres de las rutas de core/urls.py, en orden."""
+    from . import urls
+    return [patron.name for patron in urls.urlpatterns if isinstance(patron, URLPattern)]
+
+
+# ----------- EJECUCIÓN -----------
+_consultas = contextvars.ContextVar('consultas_benchmark', default=None)
+
+
+def _contar_consulta(execute, sql, params, many, context):
+    contador = _consultas.get()
+    if contador is not None:
+        contador[0] += 1
+    return execute(sql, params, many, context)
+
+
+def _instalar_contador(sender, connection, **kwargs):
+    # Se conecta después de aplicar_pragmas: los PRAGMA de conexión no cuentan
+    if _contar_consulta not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_contar_consulta)
+
+
+@dataclass
+class Medicion:
+    latencias_ms: list = field(default_factory=list)
+    consultas: list = field(default_factory=list)
+    estados: dict = field(default_factory=dict)
+    _lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def registrar(self, latencia_ms, consultas, estado):
+        with self._lock:
+            self.latencias_ms.append(latencia_ms)
+            self.consultas.append(consultas)
+            self.estados[str(estado)] = self.estados.get(str(estado), 0) + 1
+
+    def resumen(self, segundos):
+        n = len(self.latencias_ms)
+        return {
+            'peticiones': n,
+            'por_segundo': round(n / segundos, 1) if segundos else 0.0,
+            'p50_ms': round(percentil(self.latencias_ms, 50), 2),
+            'p95_ms': round(percentil(self.latencias_ms, 95), 2),
+            'p99_ms': round(percentil(self.latencias_ms, 99), 2),
+            'consultas_por_peticion': round(sum(self.consultas) / n, 2) if n else 0.0,
+            'consultas_max': max(self.consultas, default=0),
+            'estados': dict(sorted(self.estados.items())),
+        }
+
+
+def _argumentos(peticion):
+    kwargs = {'headers': {'X-API-Key': peticion.api_key} if peticion.api_key else {}}
+    if peticion.metodo != 'GET':
+        kwargs.update(data=json.dumps(peticion.datos or {}), content_type='application/json')
+    return kwargs
+
+
+def _ejecutar_wsgi(peticiones, concurrencia, medicion):
+    pendientes = iter(peticiones)
+    lock = threading.Lock()
+
+    def trabajador():
+        cliente = Client()
+        while True:
+            with lock:
+                peticion = next(pendientes, None)
+            if peticion is None:
+                break
+            contador = [0]
+            token = _consultas.set(contador)
+            inicio = time.perf_counter()
+            respuesta = getattr(cliente, peticion.metodo.lower())(peticion.ruta, **_argumentos(peticion))
+            if respuesta.streaming:
+                # El cuerpo (y sus consultas) se genera recién al recorrerlo
+                b''.join(respuesta.streaming_content)
+            medicion.registrar((time.perf_counter() - inicio) * 1000, contador[0], respuesta.status_code)
+            _consultas.reset(token)
+        connections.close_all()
+
+    hilos = [threading.Thread(target=trabajador) for _ in range(concurrencia)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+
+async def _ejecutar_asgi(peticiones, concurrencia, medicion):
+    pendientes = iter(peticiones)
+
+    async def trabajador():
+        cliente = AsyncClient()
+        for peticion in pendientes:
+            contador = [0]
+            _consultas.set(contador)
+            inicio = time.perf_counter()
+            respuesta = await getattr(cliente, peticion.metodo.lower())(peticion.ruta, **_argumentos(peticion))
+            if respuesta.streaming:
+                # Igual que en WSGI: se mide hasta el último bloque, no solo las cabeceras
+                if respuesta.is_async:
+                    async for _ in respuesta.streaming_content:
+                        pass
+                else:
+                    await sync_to_async(b''.join, thread_sensitive=True)(respuesta.streaming_content)
+            medicion.registrar((time.perf_counter() - inicio) * 1000, contador[0], respuesta.status_code)
+
+    await asyncio.gather(*(trabajador() for _ in range(concurrencia)))
+
+
+def ejecutar_benchmark(dataset, peticiones=50, concurrencia=4, modo='wsgi', rutas=None, progreso=None):
+    """
+    Ejecuta `peticiones` peticiones de cada escenario con `concurrencia`
+    clientes simultáneos. `rutas` limita a esos nombres de URL. Devuelve un
+    dict serializable a JSON con el resumen por escenario, las rutas de
+    core/urls.py sin escenario y las excluidas. Corre sin LIMITES_TASA: todas
+    las peticiones salen de la misma IP (su costo lo mide bench_limites_tasa).
+    """
+    escenarios = [e for e in _escenarios() if rutas is None or e.nombre_url in rutas]
+    escenarios.sort(key=lambda e: e.destructivo)
+    cubiertas = {e.nombre_url for e in _escenarios()}
+
+    connection_created.connect(_instalar_contador, dispatch_uid='bench_contador_consultas')
+    for alias in connections:
+        _instalar_contador(None, connections[alias])
+    resultados = {}
+    sin_limites = override_settings(LIMITES_TASA={})
+    sin_limites.enable()
+    try:
+        cache.clear()
+        for escenario in escenarios:
+            lote = [escenario.construir(dataset, i) for i in range(peticiones)]
+            medicion = Medicion()
+            inicio = time.perf_counter()
+            if modo == 'asgi':
+                asyncio.run(_ejecutar_asgi(lote, concurrencia, medicion))
+            else:
+                _ejecutar_wsgi(lote, concurrencia, medicion)
+            resultados[escenario.etiqueta] = medicion.resumen(time.perf_counter() - inicio)
+            if progreso:
+                progreso(escenario.etiqueta, resultados[escenario.etiqueta])
+    finally:
+        sin_limites.disable()
+        connection_created.disconnect(dispatch_uid='bench_contador_consultas')
+
+    todas = nombres_de_rutas()
+    return {
+        'parametros': {'peticiones': peticiones, 'concurrencia': concurrencia, 'modo': modo},
+        'dataset': dataset.totales,
+        'escenarios': resultados,
+        'sin_escenario': [n for n in todas if n not in cubiertas and n not in RUTAS_EXCLUIDAS],
+        'excluidas': {n: motivo for n, motivo in RUTAS_EXCLUIDAS.items() if n in todas},
+    }
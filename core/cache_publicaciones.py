@@ -0,0 +1,152 @@
+"""
+Caché versionada de respuestas de publicaciones y GET condicional.
+
+Cada respuesta cacheada se identifica por las versiones de las que depende:
+- 'pub:gen': generación global, cambia con cualquier UPDATE masivo.
+- 'pub:v:<pk>': cambia cuando se edita, borra o desactiva esa publicación.
+- 'pub:lista': cambia con cualquier alta o cambio (páginas del listado).
+
+Las versiones son marcas de tiempo en ns (separadas al menos un segundo), así
+que sirven también como Last-Modified, y el ETag se deriva de ellas. Un GET
+condicional se responde con 304 solo si hay un 200 de la versión actual: si
+está en caché, sin tocar la base de datos ni serializar; si no, se genera
+primero. Así una publicación borrada, desactivada o inexistente responde 404
+aunque el cliente mande If-None-Match: * o un If-Modified-Since futuro.
+Invalidar es solo escribir
+una versión nueva (después del commit); las entradas viejas quedan huérfanas
+y expiran por TTL. El backend es el alias PUBLICACIONES_CACHE de CACHES
+(locmem por defecto; con varios procesos conviene uno compartido).
+"""
+import hashlib
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import Publicacion
+from .service import estado_cambiado
+
+GENERACION = 'pub:gen'
+LISTA = 'pub:lista'
+# Por encima de esta cantidad de pks es más barato invalidar todo
+MAX_PKS_INVALIDACION = 1000
+
+_estadisticas = {'aciertos': 0, 'fallos': 0, 'no_modificados': 0}
+_estadisticas_lock = threading.Lock()
+
+
+def _cache():
+    return caches[getattr(settings, 'PUBLICACIONES_CACHE', 'default')]
+
+
+def _clave_publicacion(pk):
+    return f'pub:v:{pk}'
+
+
+def _versiones(claves):
+    cache = _cache()
+    valores = cache.get_many(claves)
+    for clave in claves:
+        if clave not in valores:
+            ahora = time.time_ns()
+            # add() no pisa la versión que otro proceso haya fijado primero
+            valores[clave] = ahora if cache.add(clave, ahora, None) else cache.get(clave, ahora)
+    return [valores[clave] for clave in claves]
+
+
+def _contar(evento):
+    with _estadisticas_lock:
+        _estadisticas[evento] += 1
+
+
+def estadisticas():
+    with _estadisticas_lock:
+        datos = dict(_estadisticas)
+    consultas = datos['aciertos'] + datos['fallos'] + datos['no_modificados']
+    datos['tasa_aciertos'] = (datos['aciertos'] + datos['no_modificados']) / consultas if consultas else 0.0
+    return datos
+
+
+def respuesta_cacheada(request, claves_version, clave_contenido, generar):
+    """
+    Usa la respuesta cacheada de la versión actual o llama a generar() y
+    cachea su data si es un 200 (si no, la devuelve tal cual). Con un 200,
+    responde 304 si el cliente ya tiene esa versión.
+    """
+    versiones = _versiones(claves_version)
+    firma = '-'.join(map(str, versiones))
+    etag = quote_etag(hashlib.md5(f'{clave_contenido}:{firma}'.encode()).hexdigest())
+    ultima_modificacion = max(versiones) // 1_000_000_000
+    cabeceras = {'ETag': etag, 'Last-Modified': http_date(ultima_modificacion), 'Cache-Control': 'no-cache'}
+
+    if_none_match = request.headers.get('If-None-Match')
+    if_modified_since = parse_http_date_safe(request.headers.get('If-Modified-Since', ''))
+    no_modificada = (if_none_match and (if_none_match.strip() == '*' or etag in if_none_match)) or (
+        not if_none_match and if_modified_since is not None and ultima_modificacion <= if_modified_since
+    )
+
+    cache = _cache()
+    clave = f'pub:resp:{hashlib.md5(f"{clave_contenido}:{firma}".encode()).hexdigest()}'
+    data = cache.get(clave)
+    if data is None:
+        # Sin un 200 cacheado de esta versión no se sabe si existe ni si está activa
+        _contar('fallos')
+        respuesta = generar()
+        if respuesta.status_code != status.HTTP_200_OK:
+            return respuesta
+        data = respuesta.data
+        cache.set(clave, data, getattr(settings, 'PUBLICACIONES_CACHE_TTL', 300))
+    else:
+        _contar('no_modificados' if no_modificada else 'aciertos')
+    if no_modificada:
+        return Response(status=status.HTTP_304_NOT_MODIFIED, headers=cabeceras)
+    return Response(data, headers=cabeceras)
+
+
+def _avanzar_versiones(claves):
+    # Cada versión nueva supera a la anterior en al menos un segundo, para que
+    # Last-Modified (resolución de segundos) distinga también cambios seguidos
+    cache = _cache()
+    actuales = cache.get_many(claves)
+    ahora = time.time_ns()
+    cache.set_many({clave: max(ahora, actuales.get(clave, 0) + 1_000_000_000) for clave in claves}, None)
+
+
+def invalidar_publicaciones(pks):
+    """Marca como modificadas las publicaciones y el listado al confirmar la transacción."""
+    claves = [_clave_publicacion(pk) for pk in pks] + [LISTA]
+    transaction.on_commit(lambda: _avanzar_versiones(claves))
+
+
+def invalidar_todas():
+    """Invalida todas las respuestas; para UPDATE masivos sin pks conocidos."""
+    transaction.on_commit(lambda: _avanzar_versiones([GENERACION]))
+
+
+def claves_detalle(pk):
+    return [GENERACION, _clave_publicacion(pk)]
+
+
+def claves_lista():
+    return [GENERACION, LISTA]
+
+
+@receiver(post_save, sender=Publicacion)
+@receiver(post_delete, sender=Publicacion)
+def invalidar_por_cambio(sender, instance, **kwargs):
+    invalidar_publicaciones([instance.pk])
+
+
+@receiver(estado_cambiado, sender=Publicacion)
+def invalidar_por_soft_delete(sender, pks, **kwargs):
+    if len(pks) > MAX_PKS_INVALIDACION:
+        invalidar_todas()
+    else:
+        invalidar_publicaciones(pks)
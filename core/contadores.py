@@ -0,0 +1,141 @@
+"""
+Contadores de badges por estudiante: notificaciones no leídas, mensajes no
+leídos y calificaciones pendientes (chats completados que aún no calificó).
+
+Cada evento ajusta la fila Contadores de los afectados con un UPDATE atómico
+(F()) dentro de la misma transacción que lo produce. Si el estudiante todavía
+no tiene fila el UPDATE no hace nada: la fila se crea desde los datos reales
+la primera vez que se lee (leer), y recalcular la reconstruye para corregir
+desvíos (p. ej. borrados en cascada que no pasan por estos ajustes).
+"""
+from django.db import transaction
+from django.db.models import Count, Exists, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import CalificacionChat, ChatParticipante, Contadores, Estudiante, Mensaje, Notificacion
+
+CAMPOS = ('notificaciones_no_leidas', 'mensajes_no_leidos', 'calificaciones_pendientes')
+
+
+def ajustar(estudiantes_ids, **deltas):
+    """Suma cada delta (p. ej. mensajes_no_leidos=1) a los contadores de los estudiantes."""
+    estudiantes_ids = list(estudiantes_ids)
+    deltas = {campo: delta for campo, delta in deltas.items() if delta}
+    if not estudiantes_ids or not deltas:
+        return
+    Contadores.objects.filter(estudiante_id__in=estudiantes_ids).update(
+        **{campo: F(campo) + delta for campo, delta in deltas.items()}
+    )
+
+
+def mensajes_no_leidos(estudiante, lookup='exact'):
+    """
+    Mensajes ajenos por encima de la marca de lectura en los chats de
+    `estudiante` (un pk u OuterRef; con lookup='in', un queryset de pks).
+    """
+    participante = 'chat__participantes__estudiante'
+    # Todo en un mismo filter() para que la marca sea la del mismo participante
+    return Mensaje.objects.filter(
+        ~Q(estudiante=F(participante)),
+        **{f'{participante}__{lookup}': estudiante},
+        id_mensaje__gt=F('chat__participantes__ultimo_leido'),
+    )
+
+
+def recalcular_mensajes(estudiante_id):
+    """Vuelve a contar los mensajes no leídos de un estudiante con un único UPDATE."""
+    no_leidos = (
+        mensajes_no_leidos(OuterRef('estudiante'))
+        .values('chat__participantes__estudiante')
+        .annotate(total=Count('pk'))
+        .values('total')
+    )
+    Contadores.objects.filter(estudiante_id=estudiante_id).update(mensajes_no_leidos=Coalesce(Subquery(no_leidos), 0))
+
+
+def pendientes_al_completar(chat):
+    """Un chat pasa a completado: cada participante que aún no lo calificó suma una pendiente."""
+    ya_califico = CalificacionChat.objects.filter(chat=chat, evaluador=OuterRef('estudiante'))
+    Contadores.objects.filter(
+        estudiante__participaciones__chat=chat,
+    ).exclude(Exists(ya_califico)).update(calificaciones_pendientes=F('calificaciones_pendientes') + 1)
+
+
+def calcular(filtro):
+    """
+    {estudiante_id: {campo: valor}} desde los datos reales, para los
+    estudiantes que cumplen `filtro` (Q sobre Estudiante).
+    """
+    def por_estudiante(queryset, campo_estudiante):
+        return dict(queryset.values_list(campo_estudiante).annotate(total=Count('pk')).order_by())
+
+    estudiantes = Estudiante.objects.filter(filtro).values('pk')
+    ya_califico = CalificacionChat.objects.filter(chat=OuterRef('chat'), evaluador=OuterRef('estudiante'))
+    conteos = {
+        'notificaciones_no_leidas': por_estudiante(
+            Notificacion.objects.filter(estudiante__in=estudiantes, leida=False), 'estudiante'
+        ),
+        'mensajes_no_leidos': por_estudiante(
+            mensajes_no_leidos(estudiantes, lookup='in'),
+            'chat__participantes__estudiante',
+        ),
+        'calificaciones_pendientes': por_estudiante(
+            ChatParticipante.objects
+            .filter(estudiante__in=estudiantes, chat__estado_intercambio=True)
+            .exclude(Exists(ya_califico)),
+            'estudiante',
+        ),
+    }
+    return {
+        pk: {campo: conteos[campo].get(pk, 0) for campo in CAMPOS}
+        for pk in estudiantes.values_list('pk', flat=True)
+    }
+
+
+def leer(estudiante):
+    """Contadores del estudiante; si no tiene fila, se calcula y se guarda."""
+    fila = Contadores.objects.filter(estudiante=estudiante).values(*CAMPOS).first()
+    if fila is None:
+        # Calcular e insertar en la misma transacción (IMMEDIATE: con el lock de
+        # escritura). Si no, un ajustar() entre ambos pasos no encuentra la fila
+        # y su delta falta para siempre en la que se inserta después
+        with transaction.atomic():
+            fila = Contadores.objects.filter(estudiante=estudiante).values(*CAMPOS).first()
+            if fila is None:
+                fila = calcular(Q(pk=estudiante.pk))[estudiante.pk]
+                # En motores sin lock de escritura global, si otra petición la creó primero gana esa fila
+                Contadores.objects.bulk_create([Contadores(estudiante=estudiante, **fila)], ignore_conflicts=True)
+    return fila
+
+
+def recalcular(tamano_lote=500, progreso=None):
+    """
+    Reconcilia Contadores por lotes de pk de Estudiante, cada uno en su
+    propia transacción corta: solo se escriben (upsert) las filas que faltan
+    o no coinciden con los datos reales. Devuelve (estudiantes, corregidos).
+    """
+    total = corregidos = desde = 0
+    ultimo = Estudiante.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+    while desde < ultimo:
+        hasta = desde + tamano_lote
+        with transaction.atomic():
+            reales = calcular(Q(pk__gt=desde, pk__lte=hasta))
+            guardados = {
+                fila['estudiante_id']: fila
+                for fila in Contadores.objects.filter(estudiante_id__gt=desde, estudiante_id__lte=hasta)
+                .values('estudiante_id', *CAMPOS)
+            }
+            con_desvio = [
+                Contadores(estudiante_id=pk, **valores)
+                for pk, valores in reales.items()
+                if guardados.get(pk) != {'estudiante_id': pk, **valores}
+            ]
+            Contadores.objects.bulk_create(
+                con_desvio, update_conflicts=True, unique_fields=['estudiante'], update_fields=CAMPOS,
+            )
+        total += len(reales)
+        corregidos += len(con_desvio)
+        desde = hasta
+        if progreso:
+            progreso(desde, total, corregidos)
+    return total, corregidos
@@ -0,0 +1,53 @@
+"""
+Perfil de SQLite para producción y enrutamiento lectura/escritura.
+
+- aplicar_pragmas: se conecta a connection_created y aplica SQLITE_PRAGMAS
+  (WAL, synchronous=NORMAL, mmap, caché, busy_timeout) a cada conexión.
+- LecturaEscrituraRouter: durante peticiones de solo lectura (GET/HEAD,
+  marcadas por EnrutamientoLecturaMiddleware) envía las lecturas al alias
+  'lectura'. Todo lo demás, y cualquier lectura dentro de una transacción
+  abierta en 'default', va al primario para leer lo que se acaba de escribir.
+"""
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+ALIAS_LECTURA = 'lectura'
+
+solo_lectura = ContextVar('solo_lectura', default=False)
+
+
+@receiver(connection_created)
+def aplicar_pragmas(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    pragmas = getattr(settings, 'SQLITE_PRAGMAS', {})
+    if connection.alias == ALIAS_LECTURA:
+        pragmas = {**pragmas, 'query_only': 'ON'}
+    with connection.cursor() as cursor:
+        for nombre, valor in pragmas.items():
+            cursor.execute(f'PRAGMA {nombre}={valor}')
+
+
+class LecturaEscrituraRouter:
+    def db_for_read(self, model, **hints):
+        if (
+            solo_lectura.get()
+            and ALIAS_LECTURA in settings.DATABASES
+            and not connections['default'].in_atomic_block
+        ):
+            return ALIAS_LECTURA
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Ambos alias apuntan al mismo archivo
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
@@ -0,0 +1,197 @@
+"""
+Exportaciones en streaming (CSV o JSONL, opcionalmente gzip) de reportes,
+transcripciones de chats y publicaciones.
+
+Las filas salen de `.values()` recorrido con `.iterator(chunk_size=...)`, se
+codifican de a bloques y se entregan a medida que se generan: la memoria no
+depende del tamaño de la exportación y la cabecera (CSV) se envía antes de la
+primera consulta. Lo usan ExportarView y el comando `exportar`.
+"""
+import csv
+import datetime
+import io
+import json
+import zlib
+from dataclasses import dataclass
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import Mensaje, Publicacion, Reporte
+
+FORMATOS = {'csv': 'text/csv', 'jsonl': 'application/x-ndjson'}
+
+
+@dataclass
+class Exportacion:
+    modelo: type
+    campos: tuple
+    campo_fecha: str
+    campo_estado: str = None
+    orden: tuple = ('pk',)
+
+    def queryset(self, desde=None, hasta=None, estado=None, chats=None):
+        filtros = {}
+        if desde:
+            filtros[f'{self.campo_fecha}__gte'] = desde
+        if hasta:
+            filtros[f'{self.campo_fecha}__lt'] = hasta
+        if estado is not None:
+            if not self.campo_estado:
+                raise ValueError("Esta exportación no admite filtro por estado")
+            filtros[self.campo_estado] = estado
+        if chats:
+            if self.modelo is not Mensaje:
+                raise ValueError("El filtro por chat solo aplica a las transcripciones")
+            filtros['chat_id__in'] = chats
+        return self.modelo.objects.filter(**filtros).order_by(*self.orden).values(*self.campos)
+
+
+EXPORTACIONES = {
+    'reportes': Exportacion(
+        modelo=Reporte,
+        campos=(
+            'id_reporte', 'fecha', 'estado', 'motivo',
+            'publicacion_id', 'publicacion__titulo', 'publicacion__estado',
+            'estudiante_id', 'estudiante__email', 'administrador__email',
+        ),
+        campo_fecha='fecha',
+        campo_estado='estado',
+    ),
+    'chats': Exportacion(
+        modelo=Mensaje,
+        campos=(
+            'chat_id', 'chat__publicacion_id', 'chat__estado_intercambio',
+            'id_mensaje', 'fecha', 'estudiante_id', 'estudiante__email', 'texto',
+        ),
+        campo_fecha='fecha',
+        orden=('chat_id', 'id_mensaje'),
+    ),
+    'publicaciones': Exportacion(
+        modelo=Publicacion,
+        campos=(
+            'id_publicacion', 'fecha_creacion', 'estado', 'habilidad', 'titulo', 'descripcion',
+            'estudiante_id', 'estudiante__email',
+        ),
+        campo_fecha='fecha_creacion',
+        campo_estado='estado',
+    ),
+}
+
+
+# ----------- FILTROS -----------
+def _fecha(valor, fin_de_dia=False):
+    if not valor:
+        return None
+    # parse_datetime también acepta una fecha sola, así que se prueba primero
+    # parse_date: `hasta` con solo fecha incluye ese día completo
+    try:
+        fecha = parse_date(valor)
+    except ValueError:
+        fecha = None
+    if fecha is not None:
+        fecha_hora = datetime.datetime.combine(fecha + datetime.timedelta(days=int(fin_de_dia)), datetime.time())
+    else:
+        fecha_hora = parse_datetime(valor)
+        if fecha_hora is None:
+            raise ValueError(f"Fecha inválida: {valor}")
+    if timezone.is_naive(fecha_hora):
+        fecha_hora = timezone.make_aware(fecha_hora)
+    return fecha_hora
+
+
+def _estado(tipo, valor):
+    if valor in (None, ''):
+        return None
+    if tipo == 'publicaciones':
+        return str(valor).lower() in ('1', 'true', 'activa')
+    try:
+        return int(valor)
+    except ValueError:
+        raise ValueError(f"Estado inválido: {valor}")
+
+
+def construir_queryset(tipo, desde=None, hasta=None, estado=None, chats=None):
+    """queryset de values() para la exportación `tipo`; ValueError si un filtro no es válido."""
+    if tipo not in EXPORTACIONES:
+        raise ValueError(f"Exportación desconocida: {tipo}")
+    try:
+        chats = [int(chat) for chat in chats or ()]
+    except ValueError:
+        raise ValueError("chat debe ser un id numérico")
+    return EXPORTACIONES[tipo].queryset(
+        desde=_fecha(desde), hasta=_fecha(hasta, fin_de_dia=True), estado=_estado(tipo, estado), chats=chats,
+    )
+
+
+# ----------- CODIFICACIÓN -----------
+def _valor(valor):
+    return valor.isoformat() if isinstance(valor, datetime.date) else valor
+
+
+def generar_filas(queryset, campos, formato='csv', filas_por_bloque=500):
+    """Genera bloques de bytes con las filas (dicts de values()) en el formato pedido."""
+    chunk_size = getattr(settings, 'EXPORTACION_CHUNK_SIZE', 2000)
+    bufer = io.StringIO()
+    escritor = csv.writer(bufer) if formato == 'csv' else None
+    if escritor:
+        escritor.writerow(campos)
+        yield bufer.getvalue().encode()
+        bufer.seek(0)
+        bufer.truncate()
+
+    pendientes = 0
+    for fila in queryset.iterator(chunk_size=chunk_size):
+        if escritor:
+            escritor.writerow([_valor(fila[campo]) for campo in campos])
+        else:
+            bufer.write(json.dumps({campo: _valor(fila[campo]) for campo in campos}, ensure_ascii=False))
+            bufer.write('\n')
+        pendientes += 1
+        if pendientes == filas_por_bloque:
+            yield bufer.getvalue().encode()
+            bufer.seek(0)
+            bufer.truncate()
+            pendientes = 0
+    if pendientes:
+        yield bufer.getvalue().encode()
+
+
+def comprimir(bloques):
+    """Envuelve un generador de bytes en un flujo gzip, sin acumularlo."""
+    compresor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)
+    for bloque in bloques:
+        comprimido = compresor.compress(bloque)
+        if comprimido:
+            yield comprimido
+    yield compresor.flush()
+
+
+async def _iterar_async(bloques):
+    # Con un iterador síncrono, Django bajo ASGI consume la respuesta entera
+    # antes de enviarla; así se pide de a un bloque (siempre en el mismo hilo)
+    siguiente = sync_to_async(next, thread_sensitive=True)
+    fin = object()
+    while (bloque := await siguiente(bloques, fin)) is not fin:
+        yield bloque
+
+
+def respuesta_streaming(request, tipo, queryset, formato='csv', gzip=False):
+    bloques = generar_filas(queryset, EXPORTACIONES[tipo].campos, formato)
+    nombre = f"{tipo}-{timezone.now():%Y%m%d-%H%M%S}.{formato}"
+    content_type = FORMATOS[formato]
+    if gzip:
+        bloques = comprimir(bloques)
+        nombre += '.gz'
+        content_type = 'application/gzip'
+    # request puede ser el Request de DRF, que envuelve al HttpRequest
+    if isinstance(getattr(request, '_request', request), ASGIRequest):
+        bloques = _iterar_async(bloques)
+    respuesta = StreamingHttpResponse(bloques, content_type=content_type)
+    respuesta['Content-Disposition'] = f'attachment; filename="{nombre}"'
+    respuesta['X-Accel-Buffering'] = 'no'
+    return respuesta
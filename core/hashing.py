@@ -0,0 +1,84 @@
+"""
+Verificación de contraseñas fuera del worker de la petición.
+
+check_password (PBKDF2) consume decenas de ms de CPU. PoolHashing lo ejecuta en
+un pool de hilos acotado (hashlib libera el GIL, así que los hilos corren en
+paralelo) con un límite de trabajos pendientes: si el pool está saturado el
+login se rechaza de inmediato en vez de acaparar workers. Tras un login
+correcto se regenera el hash si no usa el hasher y work factor preferidos.
+
+El pool acota la CPU, no los hilos de las peticiones: la vista síncrona
+(LoginEstudianteView) espera el resultado con .result() y su hilo queda
+bloqueado mientras tanto. Solo login_estudiante_async (/login/async/, bajo
+ASGI) libera el hilo mientras se hashea; los despliegues WSGI o con muchos
+logins concurrentes deberían usar esa ruta.
+"""
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher, check_password, make_password
+
+
+class PBKDF2ConfigurableHasher(PBKDF2PasswordHasher):
+    """PBKDF2-SHA256 con la cantidad de iteraciones definida en HASH_ITERACIONES."""
+    @property
+    def iterations(self):
+        return getattr(settings, 'HASH_ITERACIONES', PBKDF2PasswordHasher.iterations)
+
+
+class PoolSaturado(Exception):
+    pass
+
+
+class PoolHashing:
+    def __init__(self, workers, max_pendientes):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='hashing')
+        # Trabajos en ejecución + en cola; por encima se rechaza sin esperar
+        self._cupos = threading.BoundedSemaphore(workers + max_pendientes)
+
+    def enviar(self, funcion, *args):
+        if not self._cupos.acquire(blocking=False):
+            raise PoolSaturado()
+        try:
+            futuro = self._executor.submit(funcion, *args)
+        except BaseException:
+            self._cupos.release()
+            raise
+        futuro.add_done_callback(lambda _: self._cupos.release())
+        return futuro
+
+    def verificar(self, password, encoded):
+        return self.enviar(verificar_contraseña, password, encoded).result()
+
+    async def verificar_async(self, password, encoded):
+        return await asyncio.wrap_future(self.enviar(verificar_contraseña, password, encoded))
+
+
+def verificar_contraseña(password, encoded):
+    """
+    Devuelve (válida, nuevo_hash). nuevo_hash es None salvo que la contraseña
+    sea válida y el hash guardado no use el hasher o work factor preferidos
+    (el primero de PASSWORD_HASHERS).
+    """
+    nuevo = []
+    valida = check_password(password, encoded, setter=nuevo.append)
+    return valida, (make_password(nuevo[0]) if nuevo else None)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = PoolHashing(
+                    workers=getattr(settings, 'LOGIN_POOL_WORKERS', min(4, os.cpu_count() or 1)),
+                    max_pendientes=getattr(settings, 'LOGIN_POOL_MAX_PENDIENTES', 32),
+                )
+    return _pool
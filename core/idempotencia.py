@@ -0,0 +1,107 @@
+"""
+Idempotency-Key para los POST.
+
+Un POST con cabecera Idempotency-Key y X-API-Key se registra por (API Key,
+clave) en el alias IDEMPOTENCIA_CACHE de CACHES (locmem por defecto, que ya
+es LRU y acotado por MAX_ENTRIES; las entradas vencen con IDEMPOTENCIA_TTL):
+
+- La primera petición reserva la clave con cache.add (atómico) y se ejecuta.
+  Al terminar se guarda su respuesta; si falló con 5xx se libera la clave
+  para que el reintento vuelva a ejecutarse.
+- Un reintento con la respuesta ya guardada la recibe tal cual, con la
+  cabecera Idempotent-Replayed, sin pasar por la vista ni la base de datos.
+- Un duplicado que llega mientras la original sigue en curso recibe 409 con
+  Retry-After; la reserva vence con IDEMPOTENCIA_EN_CURSO_TTL por si el
+  proceso muere a mitad.
+- La misma clave con otra ruta o con otro body recibe 422.
+
+Con varios procesos hace falta un backend compartido para que un reintento
+que llega a otro worker encuentre la respuesta.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse, JsonResponse
+
+CABECERA = 'Idempotency-Key'
+LARGO_MAXIMO = 255
+EN_CURSO = 'en_curso'
+# Respuestas que no se guardan: dependen de credenciales, límites o de la propia reserva
+ESTADOS_NO_GUARDADOS = {401, 403, 408, 409, 429}
+CABECERAS_GUARDADAS = ('Content-Type', 'Location')
+
+
+def _cache():
+    return caches[getattr(settings, 'IDEMPOTENCIA_CACHE', 'default')]
+
+
+def _hash(*partes):
+    digest = hashlib.sha256()
+    for parte in partes:
+        digest.update(parte if isinstance(parte, bytes) else parte.encode())
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def clave_de(request):
+    """Clave de caché para la petición, o None si no aplica (sin cabecera, sin API Key o no es POST)."""
+    clave = request.headers.get(CABECERA)
+    api_key = request.headers.get('X-API-Key')
+    if request.method != 'POST' or not clave or not api_key:
+        return None
+    return f'idem:{_hash(api_key, clave)}'
+
+
+def huella(request):
+    return _hash(request.path, request.body)
+
+
+def reservar(clave, huella_peticion):
+    """
+    Intenta reservar la clave. Devuelve None si la reservó (hay que ejecutar
+    la petición) o la respuesta a devolver en su lugar.
+    """
+    cache = _cache()
+    en_curso_ttl = getattr(settings, 'IDEMPOTENCIA_EN_CURSO_TTL', 30)
+    if cache.add(clave, {'estado': EN_CURSO, 'huella': huella_peticion}, en_curso_ttl):
+        return None
+    guardada = cache.get(clave)
+    if guardada is None:
+        # Venció entre add() y get(): se vuelve a intentar una sola vez
+        if cache.add(clave, {'estado': EN_CURSO, 'huella': huella_peticion}, en_curso_ttl):
+            return None
+        guardada = cache.get(clave) or {'estado': EN_CURSO, 'huella': huella_peticion}
+    if guardada['huella'] != huella_peticion:
+        return JsonResponse(
+            {'detail': f'{CABECERA} ya se usó con otra petición.'}, status=422,
+        )
+    if guardada['estado'] == EN_CURSO:
+        respuesta = JsonResponse(
+            {'detail': f'Hay una petición en curso con el mismo {CABECERA}.'}, status=409,
+        )
+        respuesta['Retry-After'] = '1'
+        return respuesta
+    respuesta = HttpResponse(guardada['contenido'], status=guardada['estado'])
+    for nombre, valor in guardada['cabeceras'].items():
+        respuesta[nombre] = valor
+    respuesta['Idempotent-Replayed'] = 'true'
+    return respuesta
+
+
+def completar(clave, huella_peticion, respuesta):
+    """Guarda la respuesta de la petición reservada, o libera la clave si no se debe repetir."""
+    cache = _cache()
+    if respuesta.status_code >= 500 or respuesta.status_code in ESTADOS_NO_GUARDADOS or respuesta.streaming:
+        cache.delete(clave)
+        return
+    cache.set(clave, {
+        'estado': respuesta.status_code,
+        'huella': huella_peticion,
+        'contenido': respuesta.content,
+        'cabeceras': {nombre: respuesta[nombre] for nombre in CABECERAS_GUARDADAS if respuesta.has_header(nombre)},
+    }, getattr(settings, 'IDEMPOTENCIA_TTL', 86400))
+
+
+def liberar(clave):
+    _cache().delete(clave)
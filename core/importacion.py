@@ -0,0 +1,258 @@
+"""
+Importación masiva de estudiantes, perfiles y publicaciones (CSV o JSONL).
+
+El archivo se procesa como una cadena de generadores (leer -> validar ->
+agrupar en lotes), así que en memoria solo hay un par de lotes a la vez. Las
+reglas son las mismas de RegistroEstudianteSerializer, PerfilCompletoSerializer
+y PublicacionSerializer. Las contraseñas de cada lote se hashean en un pool de
+procesos mientras se escribe el lote anterior, y cada lote se guarda con
+bulk_create en su propia transacción. Tras cada commit se informa la última
+línea confirmada: al reanudar se saltan esas líneas, y un email que ya existe
+se omite en vez de fallar, por lo que repetir un lote no duplica nada.
+
+Columnas (CSV) o claves (JSONL): email, contraseña (o password), verificado,
+nombre, biografia, foto, habilidades_ofrecidas, habilidades_buscadas y una
+publicación con publicacion_titulo, publicacion_descripcion y
+publicacion_habilidad. En JSONL también se acepta una lista `publicaciones`.
+"""
+import csv
+import functools
+import itertools
+import json
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from rest_framework import serializers
+
+from .cache_publicaciones import invalidar_todas
+from .matching import filas_indice
+from .models import Estudiante, HabilidadPerfil, Perfil, Publicacion, TokenVerificacion
+from .serializers import (
+    PerfilCompletoSerializer, PublicacionSerializer, tokens_verificacion, validar_contraseña_segura,
+    validar_email_institucional,
+)
+
+CAMPOS_PERFIL = ('nombre', 'biografia', 'foto', 'habilidades_ofrecidas', 'habilidades_buscadas')
+CAMPOS_PUBLICACION = ('titulo', 'descripcion', 'habilidad')
+VALORES_VERDADEROS = ('1', 'true', 'si', 'sí', 'yes')
+
+
+@dataclass
+class FilaImportacion:
+    linea: int
+    email: str
+    contraseña: str
+    verificado: bool
+    perfil: dict = None
+    publicaciones: list = field(default_factory=list)
+
+
+@dataclass
+class ResultadoImportacion:
+    importados: int = 0
+    existentes: int = 0
+    invalidos: int = 0
+    publicaciones: int = 0
+    lotes: int = 0
+    ultima_linea: int = 0
+    segundos: float = 0.0
+
+    @property
+    def filas_por_segundo(self):
+        return self.importados / self.segundos if self.segundos else 0.0
+
+
+# ----------- ETAPAS -----------
+def leer_registros(ruta, formato=None):
+    """Genera (número de línea, dict) sin cargar el archivo completo."""
+    formato = formato or ('jsonl' if ruta.endswith(('.jsonl', '.ndjson')) else 'csv')
+    with open(ruta, encoding='utf-8-sig', newline='') as archivo:
+        if formato == 'csv':
+            lector = csv.DictReader(archivo)
+            for registro in lector:
+                yield lector.line_num, registro
+        else:
+            for numero, linea in enumerate(archivo, start=1):
+                if linea.strip():
+                    try:
+                        yield numero, json.loads(linea)
+                    except json.JSONDecodeError as exc:
+                        yield numero, {'_error': f'JSON inválido: {exc.msg}'}
+
+
+def _texto(valor):
+    return valor.strip() if isinstance(valor, str) else valor
+
+
+@functools.lru_cache(maxsize=None)
+def _validador(clase):
+    # Construir los campos de un serializer es lo más caro de validar; se
+    # reutiliza una instancia por clase y se valida con run_validation
+    return clase()
+
+
+def _validar_con(clase, datos):
+    """validated_data de `clase` para `datos`, o lanza ValidationError con sus errores."""
+    return dict(_validador(clase).run_validation(datos))
+
+
+def validar_registro(linea, registro, verificados=False):
+    """Devuelve una FilaImportacion o lanza serializers.ValidationError."""
+    if '_error' in registro:
+        raise serializers.ValidationError({'registro': [registro['_error']]})
+    errores = {}
+    email = _texto(registro.get('email')) or ''
+    contraseña = registro.get('contraseña') or registro.get('password') or ''
+    try:
+        validar_email_institucional(serializers.EmailField().run_validation(email))
+    except serializers.ValidationError as exc:
+        errores['email'] = exc.detail
+    try:
+        validar_contraseña_segura(contraseña)
+    except serializers.ValidationError as exc:
+        errores['contraseña'] = exc.detail
+
+    perfil = {campo: _texto(registro[campo]) for campo in CAMPOS_PERFIL if registro.get(campo) not in (None, '')}
+    if perfil:
+        try:
+            perfil = _validar_con(PerfilCompletoSerializer, perfil)
+        except serializers.ValidationError as exc:
+            errores['perfil'] = exc.detail
+
+    publicaciones = list(registro.get('publicaciones') or [])
+    if registro.get('publicacion_titulo'):
+        publicaciones.append({campo: registro.get(f'publicacion_{campo}') for campo in CAMPOS_PUBLICACION})
+    validadas = []
+    for indice, datos in enumerate(publicaciones):
+        try:
+            validadas.append(_validar_con(PublicacionSerializer, datos))
+        except serializers.ValidationError as exc:
+            errores[f'publicaciones[{indice}]'] = exc.detail
+
+    if errores:
+        raise serializers.ValidationError(errores)
+    verificado = verificados or str(registro.get('verificado', '')).strip().lower() in VALORES_VERDADEROS
+    return FilaImportacion(linea, email, contraseña, verificado, perfil or None, validadas)
+
+
+def validar_registros(registros, verificados=False, al_fallar=None):
+    """Genera las filas válidas; las inválidas se informan a al_fallar(linea, errores)."""
+    for linea, registro in registros:
+        try:
+            yield validar_registro(linea, registro, verificados)
+        except serializers.ValidationError as exc:
+            if al_fallar:
+                al_fallar(linea, exc.detail)
+
+
+def agrupar(iterable, tamano):
+    iterador = iter(iterable)
+    while lote := list(itertools.islice(iterador, tamano)):
+        yield lote
+
+
+def _hashear(contraseña):
+    return make_password(contraseña)
+
+
+def _inicializar_proceso():
+    # Con el método 'spawn' el proceso hijo arranca sin Django configurado
+    import django
+    from django.apps import apps
+    if not apps.ready:
+        django.setup()
+
+
+# ----------- ESCRITURA -----------
+def _emails_existentes(emails):
+    return set(Estudiante.objects.filter(email__in=emails).values_list('email', flat=True))
+
+
+def _escribir_lote(filas, hashes, resultado):
+    with transaction.atomic():
+        # Puede haberse registrado alguien entre la validación y el commit
+        existentes = _emails_existentes([f.email for f in filas])
+        nuevas = [(f, h) for f, h in zip(filas, hashes) if f.email not in existentes]
+        resultado.existentes += len(filas) - len(nuevas)
+
+        estudiantes = Estudiante.objects.bulk_create([
+            Estudiante(email=f.email, contraseña=h, verificado=f.verificado, api_key=f"api_{uuid.uuid4().hex}")
+            for f, h in nuevas
+        ])
+        por_fila = list(zip((f for f, _ in nuevas), estudiantes))
+
+        perfiles = Perfil.objects.bulk_create([
+            Perfil(estudiante=e, **f.perfil) for f, e in por_fila if f.perfil
+        ])
+        HabilidadPerfil.objects.bulk_create([fila for perfil in perfiles for fila in filas_indice(perfil)])
+
+        publicaciones = Publicacion.objects.bulk_create([
+            Publicacion(estudiante=e, **datos) for f, e in por_fila for datos in f.publicaciones
+        ])
+        if publicaciones:
+            invalidar_todas()
+
+        TokenVerificacion.objects.bulk_create(tokens_verificacion(e for f, e in por_fila if not f.verificado))
+
+    resultado.importados += len(estudiantes)
+    resultado.publicaciones += len(publicaciones)
+    resultado.lotes += 1
+
+
+def importar(
+    ruta, formato=None, tamano_lote=500, procesos=None, verificados=False, desde_linea=0,
+    al_fallar=None, al_confirmar=None,
+):
+    """
+    Importa el archivo y devuelve un ResultadoImportacion. Se saltan las
+    líneas hasta desde_linea (inclusive). al_confirmar(resultado) se llama
+    tras cada lote confirmado, con resultado.ultima_linea actualizado.
+    procesos=0 hashea en el mismo proceso.
+    """
+    resultado = ResultadoImportacion(ultima_linea=desde_linea)
+    inicio = time.monotonic()
+
+    def contar_invalido(linea, errores):
+        resultado.invalidos += 1
+        if al_fallar:
+            al_fallar(linea, errores)
+
+    registros = ((linea, r) for linea, r in leer_registros(ruta, formato) if linea > desde_linea)
+    lotes = agrupar(validar_registros(registros, verificados, contar_invalido), tamano_lote)
+
+    pool = ProcessPoolExecutor(max_workers=procesos, initializer=_inicializar_proceso) if procesos != 0 else None
+    try:
+        anterior = None
+        for lote in itertools.chain(lotes, [None]):
+            if lote is not None:
+                # Se omiten antes de hashear los emails ya importados (reanudación)
+                existentes = _emails_existentes([f.email for f in lote])
+                repetidos = set()
+                filas = []
+                for fila in lote:
+                    if fila.email in existentes or fila.email in repetidos:
+                        resultado.existentes += 1
+                    else:
+                        repetidos.add(fila.email)
+                        filas.append(fila)
+                contraseñas = [f.contraseña for f in filas]
+                # El pool hashea este lote mientras se escribe el anterior
+                hashes = pool.map(_hashear, contraseñas, chunksize=16) if pool else map(_hashear, contraseñas)
+                siguiente = (filas, hashes, lote[-1].linea)
+            if anterior is not None:
+                filas_anteriores, hashes_anteriores, ultima_linea = anterior
+                _escribir_lote(filas_anteriores, list(hashes_anteriores), resultado)
+                resultado.ultima_linea = ultima_linea
+                resultado.segundos = time.monotonic() - inicio
+                if al_confirmar:
+                    al_confirmar(resultado)
+            anterior = siguiente if lote is not None else None
+    finally:
+        if pool:
+            pool.shutdown(cancel_futures=True)
+    resultado.segundos = time.monotonic() - inicio
+    return resultado
@@ -0,0 +1,102 @@
+"""
+Instrumentación de SQL por petición.
+
+RegistroSQL acumula, para una petición, la cantidad y el tiempo total de las
+consultas, las más lentas y las repetidas (mismo SQL ejecutado varias veces,
+la firma típica de un N+1). Las sentencias de control de transacción (BEGIN,
+COMMIT, SAVEPOINT...) no cuentan: dependen de si la petición corre dentro de
+un test y no del código de la vista.
+
+Las vistas pueden declarar `presupuesto_consultas`; el middleware avisa en el
+log cuando se supera y core/tests.py lo hace cumplir.
+"""
+import re
+import time
+import traceback
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+
+_CONTROL_TRANSACCION_RE = re.compile(r'^\s*(BEGIN|COMMIT|ROLLBACK|SAVEPOINT|RELEASE)\b', re.IGNORECASE)
+
+
+class RegistroSQL:
+    def __init__(self, lentas=3, trazas=False):
+        self.consultas = 0
+        self.duracion = 0.0
+        self.max_lentas = lentas
+        self.capturar_trazas = trazas
+        self.sentencias = []  # (segundos, sql)
+        self.repeticiones = Counter()
+        self.trazas = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            if not _CONTROL_TRANSACCION_RE.match(sql):
+                self.registrar(sql, time.perf_counter() - inicio)
+
+    def registrar(self, sql, segundos):
+        self.consultas += 1
+        self.duracion += segundos
+        self.sentencias.append((segundos, sql))
+        self.repeticiones[sql] += 1
+        if self.capturar_trazas and self.repeticiones[sql] == 2:
+            self.trazas[sql] = _traza_del_proyecto()
+
+    @property
+    def duracion_ms(self):
+        return self.duracion * 1000
+
+    def mas_lentas(self):
+        return sorted(self.sentencias, key=lambda s: s[0], reverse=True)[:self.max_lentas]
+
+    def duplicadas(self):
+        return {sql: veces for sql, veces in self.repeticiones.items() if veces > 1}
+
+    def resumen(self):
+        return {
+            'consultas': self.consultas,
+            'sql_ms': round(self.duracion_ms, 2),
+            'mas_lentas': [{'ms': round(s * 1000, 2), 'sql': sql[:300]} for s, sql in self.mas_lentas()],
+            'duplicadas': [
+                {'veces': veces, 'sql': sql[:300], **({'traza': self.trazas[sql]} if sql in self.trazas else {})}
+                for sql, veces in self.duplicadas().items()
+            ],
+        }
+
+
+def _traza_del_proyecto():
+    # Solo los frames del proyecto, sin Django ni este módulo
+    base = str(settings.BASE_DIR)
+    return [
+        f'{frame.filename}:{frame.lineno} {frame.name}'
+        for frame in traceback.extract_stack()[:-3]
+        if frame.filename.startswith(base) and 'site-packages' not in frame.filename
+    ]
+
+
+@contextmanager
+def registrar_sql(lentas=3, trazas=False):
+    """Registra las consultas de todos los alias hechas en este hilo dentro del bloque."""
+    registro = RegistroSQL(lentas=lentas, trazas=trazas)
+    with ExitStack() as pila:
+        for alias in connections:
+            pila.enter_context(connections[alias].execute_wrapper(registro))
+        yield registro
+
+
+def presupuesto_de(vista, metodo=None):
+    """
+    presupuesto_consultas de la clase de la vista (o de la función), o None.
+    Puede ser un entero para todos los métodos o un dict {'GET': n, 'POST': m}.
+    """
+    vista = getattr(vista, 'view_class', None) or getattr(vista, 'cls', None) or vista
+    presupuesto = getattr(vista, 'presupuesto_consultas', None)
+    if isinstance(presupuesto, dict):
+        return presupuesto.get(metodo) if metodo else max(presupuesto.values(), default=None)
+    return presupuesto
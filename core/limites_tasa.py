@@ -0,0 +1,177 @@
+"""
+Límites de tasa por token bucket, por API Key y por IP.
+
+Cada vista declara `throttle_scope` (un nombre, o un dict por método como
+presupuesto_consultas) y LIMITES_TASA fija para ese nombre la cubeta de cada
+tipo de cliente: capacidad (ráfaga permitida) y tokens repuestos por
+segundo. Cada petición consume un token; sin tokens se responde 429 con
+Retry-After = segundos hasta que haya uno.
+
+El estado de las cubetas vive en un almacén (LIMITES_TASA_ALMACEN):
+- AlmacenMemoria: dict en proceso con lock, acotado (LRU). Unos pocos
+  microsegundos por chequeo; cada proceso lleva su propia cuenta.
+- AlmacenSQLite: archivo SQLite aparte (LIMITES_TASA_SQLITE) compartido por
+  todos los procesos; cada chequeo es un único UPSERT ... RETURNING.
+`manage.py bench_limites_tasa` mide el costo de ambos.
+"""
+import math
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+from rest_framework.throttling import BaseThrottle
+
+
+class AlmacenMemoria:
+    def __init__(self, max_claves=None):
+        self.max_claves = max_claves or getattr(settings, 'LIMITES_TASA_MAX_CLAVES', 100_000)
+        self._cubetas = OrderedDict()  # clave -> [tokens, instante]
+        self._lock = threading.Lock()
+
+    def consumir(self, clave, capacidad, por_segundo):
+        """Consume un token de la cubeta; devuelve 0.0 si había, o los segundos de espera."""
+        ahora = time.monotonic()
+        with self._lock:
+            cubeta = self._cubetas.get(clave)
+            if cubeta is None:
+                self._cubetas[clave] = [capacidad - 1, ahora]
+                if len(self._cubetas) > self.max_claves:
+                    # La cubeta menos usada se olvida: vuelve llena, que es lo más permisivo
+                    self._cubetas.popitem(last=False)
+                return 0.0
+            self._cubetas.move_to_end(clave)
+            tokens = min(capacidad, cubeta[0] + (ahora - cubeta[1]) * por_segundo)
+            cubeta[1] = ahora
+            if tokens >= 1:
+                cubeta[0] = tokens - 1
+                return 0.0
+            cubeta[0] = tokens
+            return (1 - tokens) / por_segundo
+
+    def limpiar(self):
+        with self._lock:
+            self._cubetas.clear()
+
+
+class AlmacenSQLite:
+    # Todo el cálculo en un solo UPSERT: en SQLite una sentencia es atómica,
+    # así que dos procesos no pueden gastar el mismo token
+    CREAR = """
+        CREATE TABLE IF NOT EXISTS cubetas (
+            clave TEXT PRIMARY KEY, tokens REAL NOT NULL, instante REAL NOT NULL, permitido INTEGER NOT NULL
+        ) WITHOUT ROWID
+    """
+    CONSUMIR = """
+        INSERT INTO cubetas (clave, tokens, instante, permitido) VALUES (:clave, :capacidad - 1, :ahora, 1)
+        ON CONFLICT (clave) DO UPDATE SET
+            tokens = MIN(:capacidad, tokens + (:ahora - instante) * :por_segundo)
+                     - (MIN(:capacidad, tokens + (:ahora - instante) * :por_segundo) >= 1),
+            permitido = MIN(:capacidad, tokens + (:ahora - instante) * :por_segundo) >= 1,
+            instante = :ahora
+        RETURNING tokens, permitido
+    """
+    # Una cubeta sin uso durante este tiempo ya está llena: se puede borrar
+    INACTIVA_SEGUNDOS = 3600
+    LIMPIAR_CADA = 10_000
+
+    def __init__(self, ruta=None):
+        self.ruta = str(ruta or getattr(settings, 'LIMITES_TASA_SQLITE', settings.BASE_DIR / 'limites_tasa.sqlite3'))
+        self._local = threading.local()
+
+    def _conexion(self):
+        conexion = getattr(self._local, 'conexion', None)
+        if conexion is None:
+            conexion = sqlite3.connect(self.ruta, timeout=5, isolation_level=None, check_same_thread=False)
+            conexion.execute('PRAGMA journal_mode=WAL')
+            # Perder los últimos tokens en un corte de luz no importa
+            conexion.execute('PRAGMA synchronous=OFF')
+            conexion.execute(self.CREAR)
+            self._local.conexion = conexion
+            self._local.usos = 0
+        return conexion
+
+    def consumir(self, clave, capacidad, por_segundo):
+        conexion = self._conexion()
+        ahora = time.time()  # reloj compartido entre procesos
+        tokens, permitido = conexion.execute(self.CONSUMIR, {
+            'clave': clave, 'capacidad': capacidad, 'por_segundo': por_segundo, 'ahora': ahora,
+        }).fetchone()
+        self._local.usos += 1
+        if self._local.usos % self.LIMPIAR_CADA == 0:
+            conexion.execute('DELETE FROM cubetas WHERE instante < ?', (ahora - self.INACTIVA_SEGUNDOS,))
+        return 0.0 if permitido else (1 - tokens) / por_segundo
+
+    def limpiar(self):
+        self._conexion().execute('DELETE FROM cubetas')
+
+
+_almacen = None
+_almacen_lock = threading.Lock()
+
+
+def get_almacen():
+    global _almacen
+    if _almacen is None:
+        with _almacen_lock:
+            if _almacen is None:
+                _almacen = import_string(getattr(settings, 'LIMITES_TASA_ALMACEN', 'core.limites_tasa.AlmacenMemoria'))()
+    return _almacen
+
+
+def cubeta(scope, tipo):
+    """(capacidad, por_segundo) de LIMITES_TASA para scope y tipo ('api_key' o 'ip'), o None."""
+    return getattr(settings, 'LIMITES_TASA', {}).get(scope, {}).get(tipo)
+
+
+def consumir(scope, tipo, identidad):
+    """Segundos de espera (0.0 si se permite) para `identidad` en la cubeta scope/tipo."""
+    limite = cubeta(scope, tipo)
+    if limite is None:
+        return 0.0
+    capacidad, por_segundo = limite
+    return get_almacen().consumir(f'{scope}:{tipo}:{identidad}', capacidad, por_segundo)
+
+
+def retry_after(espera):
+    return str(max(1, math.ceil(espera)))
+
+
+class CubetaThrottle(BaseThrottle):
+    """Base de los throttles: toma el scope de la vista y consume un token de su cubeta."""
+    tipo = None
+
+    def identidad(self, request):
+        raise NotImplementedError
+
+    def allow_request(self, request, view):
+        scope = getattr(view, 'throttle_scope', None)
+        if isinstance(scope, dict):
+            scope = scope.get(request.method)
+        identidad = self.identidad(request) if scope else None
+        self.espera = consumir(scope, self.tipo, identidad) if identidad else 0.0
+        return self.espera == 0.0
+
+    def wait(self):
+        return self.espera
+
+
+class ApiKeyThrottle(CubetaThrottle):
+    """Por API Key autenticada (request.auth); sin API Key no aplica."""
+    tipo = 'api_key'
+
+    def identidad(self, request):
+        return request.auth
+
+
+class IPThrottle(CubetaThrottle):
+    """
+    Por IP del cliente: REMOTE_ADDR, o la entrada de X-Forwarded-For que
+    agregó el último de los NUM_PROXIES proxies de confianza (ver settings).
+    """
+    tipo = 'ip'
+
+    def identidad(self, request):
+        return self.get_ident(request)
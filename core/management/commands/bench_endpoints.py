@@ -0,0 +1,51 @@
+import json
+import subprocess
+
+from django.core.management.base import BaseCommand
+
+from core.bench import base_de_datos_temporal, ejecutar_benchmark, generar_dataset
+
+
+def _commit_actual():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        "Genera un dataset sintético en una base temporal y mide cada ruta de la API "
+        "(throughput, p50/p95/p99 y consultas por petición). Imprime el resultado en JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--estudiantes', type=int, default=200)
+        parser.add_argument('--semilla', type=int, default=0)
+        parser.add_argument('--peticiones', type=int, default=50, help="Peticiones por escenario.")
+        parser.add_argument('--concurrencia', type=int, default=4)
+        parser.add_argument('--modo', choices=['wsgi', 'asgi'], default='wsgi')
+        parser.add_argument('--ruta', action='append', dest='rutas', help="Nombre de URL a medir (repetible).")
+        parser.add_argument('--salida', help="Archivo donde guardar el JSON además de imprimirlo.")
+
+    def handle(self, *args, **options):
+        with base_de_datos_temporal():
+            dataset = generar_dataset(estudiantes=options['estudiantes'], semilla=options['semilla'])
+            resultado = ejecutar_benchmark(
+                dataset,
+                peticiones=options['peticiones'],
+                concurrencia=options['concurrencia'],
+                modo=options['modo'],
+                rutas=options['rutas'],
+                progreso=lambda etiqueta, r: self.stderr.write(
+                    f"{etiqueta}: {r['por_segundo']} req/s, p95 {r['p95_ms']} ms, {r['consultas_por_peticion']} consultas"
+                ),
+            )
+        resultado = {'commit': _commit_actual(), 'semilla': options['semilla'], **resultado}
+        salida = json.dumps(resultado, indent=2, ensure_ascii=False)
+        if options['salida']:
+            with open(options['salida'], 'w', encoding='utf-8') as archivo:
+                archivo.write(salida)
+        self.stdout.write(salida)
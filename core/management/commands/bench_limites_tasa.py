@@ -0,0 +1,68 @@
+import json
+import tempfile
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+
+from core import limites_tasa
+from core.bench import percentil
+
+LIMITES = {'bench': {'api_key': (1_000_000, 1_000_000), 'ip': (1_000_000, 1_000_000)}}
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide el costo por chequeo de los límites de tasa: consumir() en "
+        "AlmacenMemoria y AlmacenSQLite, y los dos throttles de DRF por petición."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iteraciones', type=int, default=50_000)
+        parser.add_argument('--claves', type=int, default=1_000,
+                            help="Clientes distintos entre los que se reparten los chequeos")
+
+    def handle(self, *args, **options):
+        resultados = {}
+        with tempfile.TemporaryDirectory() as directorio, override_settings(LIMITES_TASA=LIMITES):
+            almacenes = {
+                'memoria': limites_tasa.AlmacenMemoria(),
+                'sqlite': limites_tasa.AlmacenSQLite(Path(directorio) / 'limites_tasa.sqlite3'),
+            }
+            anterior = limites_tasa._almacen
+            try:
+                for nombre, almacen in almacenes.items():
+                    limites_tasa._almacen = almacen
+                    resultados[f'consumir_{nombre}'] = self.medir(
+                        lambda i: limites_tasa.consumir('bench', 'ip', f'10.0.{i % 256}.{i % options["claves"]}'),
+                        options['iteraciones'],
+                    )
+                    throttles = [limites_tasa.ApiKeyThrottle(), limites_tasa.IPThrottle()]
+                    vista = SimpleNamespace(throttle_scope={'POST': 'bench'})
+                    peticiones = [
+                        SimpleNamespace(
+                            method='POST', auth=f'clave-{i}', headers={}, META={'REMOTE_ADDR': f'10.1.0.{i % 256}'},
+                        )
+                        for i in range(options['claves'])
+                    ]
+                    resultados[f'peticion_drf_{nombre}'] = self.medir(
+                        lambda i: all([t.allow_request(peticiones[i % len(peticiones)], vista) for t in throttles]),
+                        options['iteraciones'],
+                    )
+            finally:
+                limites_tasa._almacen = anterior
+        self.stdout.write(json.dumps(resultados, indent=2))
+
+    def medir(self, chequeo, iteraciones):
+        latencias = []
+        for i in range(iteraciones):
+            inicio = time.perf_counter_ns()
+            chequeo(i)
+            latencias.append((time.perf_counter_ns() - inicio) / 1000)
+        return {
+            'chequeos_por_segundo': round(iteraciones / (sum(latencias) / 1e6)),
+            'p50_us': round(percentil(latencias, 50), 2),
+            'p99_us': round(percentil(latencias, 99), 2),
+        }
@@ -0,0 +1,86 @@
+import json
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.test import Client, override_settings
+
+from core import hashing
+from core.bench import base_de_datos_temporal, percentil
+from core.models import Estudiante, Publicacion
+
+PASSWORD = 'Benchmark123'
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide logins/s y la latencia p50/p99 de un endpoint no relacionado "
+        "(publicaciones/) bajo carga de login, sin límite de hashing y con el pool acotado."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--segundos', type=float, default=5.0)
+        parser.add_argument('--clientes-login', type=int, default=16)
+        parser.add_argument('--clientes-lectura', type=int, default=4)
+
+    def handle(self, *args, **options):
+        # Sin LIMITES_TASA: todos los logins salen de la misma IP
+        with base_de_datos_temporal(), override_settings(LIMITES_TASA={}):
+            estudiante = Estudiante.objects.create(
+                email='bench@inacap.cl', contraseña=make_password(PASSWORD), verificado=True
+            )
+            Publicacion.objects.bulk_create(
+                Publicacion(titulo=f'Publicación {i}', descripcion='-', habilidad=1, estudiante=estudiante)
+                for i in range(50)
+            )
+            escenarios = {
+                # Equivale al login anterior: cada petición hashea en su propio worker
+                'sin_limite': hashing.PoolHashing(options['clientes_login'], options['clientes_login']),
+                'pool_acotado': hashing.PoolHashing(
+                    getattr(settings, 'LOGIN_POOL_WORKERS', 4), getattr(settings, 'LOGIN_POOL_MAX_PENDIENTES', 32)
+                ),
+            }
+            resultados = {}
+            for nombre, pool in escenarios.items():
+                hashing._pool = pool
+                resultados[nombre] = self.medir(options)
+            hashing._pool = None
+        self.stdout.write(json.dumps(resultados, indent=2))
+
+    def medir(self, options):
+        fin = time.monotonic() + options['segundos']
+        logins, rechazados, latencias = [], [], []
+
+        def login():
+            cliente = Client()
+            while time.monotonic() < fin:
+                respuesta = cliente.post('/api/login/', {'email': 'bench@inacap.cl', 'password': PASSWORD})
+                (logins if respuesta.status_code == 200 else rechazados).append(1)
+            connections.close_all()
+
+        def lectura():
+            cliente = Client()
+            while time.monotonic() < fin:
+                inicio = time.perf_counter()
+                cliente.get('/api/publicaciones/')
+                latencias.append((time.perf_counter() - inicio) * 1000)
+            connections.close_all()
+
+        hilos = [threading.Thread(target=login) for _ in range(options['clientes_login'])]
+        hilos += [threading.Thread(target=lectura) for _ in range(options['clientes_lectura'])]
+        inicio = time.monotonic()
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        duracion = time.monotonic() - inicio
+        return {
+            'logins_por_segundo': round(len(logins) / duracion, 1),
+            'logins_rechazados': len(rechazados),
+            'lecturas_por_segundo': round(len(latencias) / duracion, 1),
+            'lectura_p50_ms': round(percentil(latencias, 50), 2),
+            'lectura_p99_ms': round(percentil(latencias, 99), 2),
+        }
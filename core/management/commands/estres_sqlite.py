@@ -0,0 +1,134 @@
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+ESQUEMA = [
+    "CREATE TABLE participante (chat_id INTEGER, estudiante_id INTEGER)",
+    "CREATE INDEX participante_chat ON participante (chat_id)",
+    "CREATE TABLE mensaje (id INTEGER PRIMARY KEY, chat_id INTEGER, estudiante_id INTEGER, texto TEXT, fecha REAL)",
+    "CREATE INDEX mensaje_chat ON mensaje (chat_id, fecha)",
+    "CREATE TABLE notificacion (id INTEGER PRIMARY KEY, estudiante_id INTEGER, chat_id INTEGER, leida INTEGER, fecha REAL)",
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Prueba de estrés de escrituras concurrentes en SQLite: compara el perfil por "
+        "defecto de Django con el perfil de producción (SQLITE_PRAGMAS + BEGIN IMMEDIATE) "
+        "y reporta escrituras/s y tasa de errores 'database is locked'."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--escritores', type=int, default=8)
+        parser.add_argument('--lectores', type=int, default=8)
+        parser.add_argument('--segundos', type=float, default=5.0)
+        parser.add_argument('--chats', type=int, default=200)
+
+    def handle(self, *args, **options):
+        perfiles = {
+            # Lo que hace hoy Django con un sqlite3 sin configurar
+            'base': {'pragmas': {}, 'begin': 'BEGIN', 'timeout': 5.0},
+            'produccion': {
+                'pragmas': getattr(settings, 'SQLITE_PRAGMAS', {}),
+                'begin': 'BEGIN IMMEDIATE',
+                'timeout': 20.0,
+            },
+        }
+        resultados = {nombre: self.ejecutar(perfil, options) for nombre, perfil in perfiles.items()}
+        self.stdout.write(json.dumps(resultados, indent=2))
+
+    def ejecutar(self, perfil, options):
+        directorio = tempfile.mkdtemp(prefix='estres_sqlite_')
+        ruta = os.path.join(directorio, 'estres.sqlite3')
+        conexion = self.conectar(ruta, perfil)
+        for sentencia in ESQUEMA:
+            conexion.execute(sentencia)
+        conexion.executemany(
+            "INSERT INTO participante VALUES (?, ?)",
+            [(chat, chat * 2 + i) for chat in range(options['chats']) for i in range(2)],
+        )
+        conexion.close()
+
+        contadores = {'escrituras': 0, 'lecturas': 0, 'errores_lock': 0}
+        lock = threading.Lock()
+        fin = time.monotonic() + options['segundos']
+
+        def escritor(n):
+            con = self.conectar(ruta, perfil)
+            i = 0
+            while time.monotonic() < fin:
+                chat = (n * 7919 + i) % options['chats']
+                i += 1
+                try:
+                    # Mismo patrón que MensajeListCreateView.create
+                    con.execute(perfil['begin'])
+                    otros = con.execute("SELECT estudiante_id FROM participante WHERE chat_id = ?", (chat,)).fetchall()
+                    ahora = time.time()
+                    con.execute(
+                        "INSERT INTO mensaje (chat_id, estudiante_id, texto, fecha) VALUES (?, ?, 'hola', ?)",
+                        (chat, otros[0][0], ahora),
+                    )
+                    con.executemany(
+                        "INSERT INTO notificacion (estudiante_id, chat_id, leida, fecha) VALUES (?, ?, 0, ?)",
+                        [(o[0], chat, ahora) for o in otros[1:]],
+                    )
+                    con.execute("COMMIT")
+                    clave = 'escrituras'
+                except sqlite3.OperationalError as exc:
+                    if con.in_transaction:
+                        con.execute("ROLLBACK")
+                    if 'locked' not in str(exc) and 'busy' not in str(exc):
+                        raise
+                    clave = 'errores_lock'
+                with lock:
+                    contadores[clave] += 1
+            con.close()
+
+        def lector(n):
+            con = self.conectar(ruta, perfil)
+            i = 0
+            while time.monotonic() < fin:
+                chat = (n * 104729 + i) % options['chats']
+                i += 1
+                try:
+                    con.execute(
+                        "SELECT * FROM mensaje WHERE chat_id = ? ORDER BY fecha DESC LIMIT 20", (chat,)
+                    ).fetchall()
+                    clave = 'lecturas'
+                except sqlite3.OperationalError:
+                    clave = 'errores_lock'
+                with lock:
+                    contadores[clave] += 1
+            con.close()
+
+        hilos = [threading.Thread(target=escritor, args=(n,)) for n in range(options['escritores'])]
+        hilos += [threading.Thread(target=lector, args=(n,)) for n in range(options['lectores'])]
+        inicio = time.monotonic()
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        duracion = time.monotonic() - inicio
+        shutil.rmtree(directorio, ignore_errors=True)
+
+        intentos = contadores['escrituras'] + contadores['errores_lock']
+        return {
+            'escrituras_por_segundo': round(contadores['escrituras'] / duracion, 1),
+            'lecturas_por_segundo': round(contadores['lecturas'] / duracion, 1),
+            'errores_lock': contadores['errores_lock'],
+            'tasa_errores_lock': round(contadores['errores_lock'] / intentos, 4) if intentos else 0.0,
+        }
+
+    @staticmethod
+    def conectar(ruta, perfil):
+        con = sqlite3.connect(ruta, timeout=perfil['timeout'], isolation_level=None, check_same_thread=False)
+        for nombre, valor in perfil['pragmas'].items():
+            con.execute(f'PRAGMA {nombre}={valor}')
+        return con
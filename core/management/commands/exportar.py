@@ -0,0 +1,44 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.exportacion import EXPORTACIONES, FORMATOS, comprimir, construir_queryset, generar_filas
+
+
+class Command(BaseCommand):
+    help = "Exporta reportes, chats (transcripciones) o publicaciones en CSV/JSONL, en streaming."
+
+    def add_arguments(self, parser):
+        parser.add_argument('tipo', choices=sorted(EXPORTACIONES))
+        parser.add_argument('--formato', choices=sorted(FORMATOS), default='csv')
+        parser.add_argument('--desde', help="Fecha o fecha-hora inicial (inclusive).")
+        parser.add_argument('--hasta', help="Fecha (día completo) o fecha-hora final.")
+        parser.add_argument('--estado', help="Estado del reporte (0, 1, 2) o de la publicación (true/false).")
+        parser.add_argument('--chat', action='append', dest='chats', help="Id de chat (repetible).")
+        parser.add_argument('--gzip', action='store_true')
+        parser.add_argument('--salida', help="Archivo de salida (por defecto la salida estándar).")
+
+    def handle(self, *args, **options):
+        try:
+            queryset = construir_queryset(
+                options['tipo'],
+                desde=options['desde'],
+                hasta=options['hasta'],
+                estado=options['estado'],
+                chats=options['chats'],
+            )
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+        bloques = generar_filas(queryset, EXPORTACIONES[options['tipo']].campos, options['formato'])
+        if options['gzip']:
+            bloques = comprimir(bloques)
+
+        salida = open(options['salida'], 'wb') if options['salida'] else sys.stdout.buffer
+        try:
+            for bloque in bloques:
+                salida.write(bloque)
+            salida.flush()
+        finally:
+            if options['salida']:
+                salida.close()
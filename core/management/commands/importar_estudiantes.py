@@ -0,0 +1,74 @@
+import json
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.importacion import importar
+
+
+class Command(BaseCommand):
+    help = (
+        "Importa estudiantes (con perfil y publicaciones opcionales) desde CSV o JSONL "
+        "por lotes. Con --reanudar continúa desde el último lote confirmado."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo')
+        parser.add_argument('--formato', choices=['csv', 'jsonl'], help="Por defecto según la extensión.")
+        parser.add_argument('--lote', type=int, default=500, help="Filas por transacción.")
+        parser.add_argument('--procesos', type=int, default=None, help="Procesos para hashear (0 = sin pool).")
+        parser.add_argument('--verificados', action='store_true', help="Crea las cuentas ya activadas.")
+        parser.add_argument('--reanudar', action='store_true', help="Salta las líneas ya confirmadas.")
+        parser.add_argument('--progreso', help="Archivo de progreso (por defecto <archivo>.progreso).")
+        parser.add_argument('--errores', help="Guarda las filas inválidas en este archivo JSONL.")
+
+    def handle(self, *args, **options):
+        archivo = options['archivo']
+        if not os.path.exists(archivo):
+            raise CommandError(f"No existe el archivo {archivo}")
+        ruta_progreso = options['progreso'] or f'{archivo}.progreso'
+
+        desde_linea = 0
+        if options['reanudar'] and os.path.exists(ruta_progreso):
+            with open(ruta_progreso, encoding='utf-8') as progreso:
+                desde_linea = json.load(progreso)['ultima_linea']
+            self.stdout.write(f"Reanudando después de la línea {desde_linea}")
+
+        errores = open(options['errores'], 'a', encoding='utf-8') if options['errores'] else None
+
+        def al_fallar(linea, detalle):
+            if errores:
+                errores.write(json.dumps({'linea': linea, 'errores': detalle}, ensure_ascii=False) + '\n')
+
+        def al_confirmar(resultado):
+            # Se escribe a un temporal y se renombra para no dejar el archivo a medias
+            with open(f'{ruta_progreso}.tmp', 'w', encoding='utf-8') as progreso:
+                json.dump({'ultima_linea': resultado.ultima_linea}, progreso)
+            os.replace(f'{ruta_progreso}.tmp', ruta_progreso)
+            self.stdout.write(
+                f"Lote {resultado.lotes}: línea {resultado.ultima_linea}, {resultado.importados} importados, "
+                f"{resultado.existentes} existentes, {resultado.invalidos} inválidos "
+                f"({resultado.filas_por_segundo:.0f} filas/s)"
+            )
+
+        try:
+            resultado = importar(
+                archivo,
+                formato=options['formato'],
+                tamano_lote=options['lote'],
+                procesos=options['procesos'],
+                verificados=options['verificados'],
+                desde_linea=desde_linea,
+                al_fallar=al_fallar,
+                al_confirmar=al_confirmar,
+            )
+        finally:
+            if errores:
+                errores.close()
+
+        if os.path.exists(ruta_progreso):
+            os.remove(ruta_progreso)
+        self.stdout.write(self.style.SUCCESS(
+            f"Importación terminada: {resultado.importados} estudiantes, {resultado.publicaciones} publicaciones, "
+            f"{resultado.existentes} existentes, {resultado.invalidos} inválidos en {resultado.segundos:.1f} s."
+        ))
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.retencion import aplicar_politica, obtener_politicas
+
+
+class Command(BaseCommand):
+    help = "Aplica las políticas de retención (eliminar/archivar) por lotes de rango de pk."
+
+    def add_arguments(self, parser):
+        parser.add_argument('politicas', nargs='*', help="Políticas a aplicar (por defecto todas).")
+        parser.add_argument('--lote', type=int, default=1000, help="Filas por transacción.")
+        parser.add_argument('--pausa', type=float, default=0.0, help="Segundos de espera entre lotes.")
+        parser.add_argument('--dry-run', action='store_true', help="Solo cuenta las filas afectadas.")
+
+    def handle(self, *args, **options):
+        try:
+            politicas = obtener_politicas(options['politicas'])
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+        for politica in politicas:
+            resultado = aplicar_politica(
+                politica,
+                tamano_lote=options['lote'],
+                pausa=options['pausa'],
+                simular=options['dry_run'],
+            )
+            verbo = "afectaría" if options['dry_run'] else ("eliminó" if politica.accion == 'eliminar' else "archivó")
+            self.stdout.write(
+                f"{politica.nombre}: {verbo} {resultado.filas} filas en {resultado.lotes} lotes "
+                f"({resultado.filas_por_segundo:.0f} filas/s)"
+            )
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from core.contadores import recalcular
+
+
+class Command(BaseCommand):
+    help = "Reconcilia por lotes la tabla Contadores con notificaciones, mensajes y calificaciones (reparación de desvíos)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=500, help="Estudiantes por transacción.")
+
+    def handle(self, *args, **options):
+        def progreso(hasta_pk, total, corregidos):
+            if options['verbosity'] > 1:
+                self.stdout.write(f"Hasta estudiante {hasta_pk}: {total} revisados, {corregidos} corregidos")
+
+        total, corregidos = recalcular(tamano_lote=options['lote'], progreso=progreso)
+        self.stdout.write(self.style.SUCCESS(
+            f"Contadores revisados para {total} estudiantes; {corregidos} tenían desvío y se corrigieron."
+        ))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from core.reputacion import recalcular
+
+
+class Command(BaseCommand):
+    help = "Recalcula por lotes la tabla Reputacion desde CalificacionChat (reparación de desvíos)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=500, help="Estudiantes por transacción.")
+
+    def handle(self, *args, **options):
+        def progreso(hasta_pk, total):
+            if options['verbosity'] > 1:
+                self.stdout.write(f"Hasta estudiante {hasta_pk}: {total} reputaciones")
+
+        total = recalcular(tamano_lote=options['lote'], progreso=progreso)
+        self.stdout.write(self.style.SUCCESS(f"Reputación recalculada para {total} estudiantes."))
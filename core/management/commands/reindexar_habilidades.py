@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from core.matching import indexar_perfil
+from core.models import Perfil
+
+
+class Command(BaseCommand):
+    help = "Reconstruye el índice de habilidades a partir de todos los perfiles."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=1000, help="Perfiles leídos por consulta.")
+
+    def handle(self, *args, **options):
+        total = 0
+        perfiles = Perfil.objects.only('estudiante_id', 'habilidades_ofrecidas', 'habilidades_buscadas')
+        for perfil in perfiles.iterator(chunk_size=options['lote']):
+            indexar_perfil(perfil)
+            total += 1
+        self.stdout.write(self.style.SUCCESS(f"Índice de habilidades reconstruido: {total} perfiles."))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from core.search import fts_disponible, reconstruir_indice
+
+
+class Command(BaseCommand):
+    help = "Reconstruye el índice de búsqueda FTS5 de publicaciones (una transacción, con 'rebuild')."
+
+    def handle(self, *args, **options):
+        if not fts_disponible():
+            self.stdout.write(self.style.WARNING("El motor actual no es SQLite; no hay índice FTS5."))
+            return
+
+        def progreso(total, segundos):
+            self.stdout.write(f"{total} publicaciones indexadas ({total / max(segundos, 1e-6):.0f} filas/s)")
+
+        total = reconstruir_indice(progreso=progreso)
+        self.stdout.write(self.style.SUCCESS(f"Índice reconstruido: {total} publicaciones."))
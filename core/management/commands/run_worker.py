@@ -0,0 +1,51 @@
+import signal
+import threading
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.tareas import iniciar_workers
+
+
+class Command(BaseCommand):
+    help = (
+        "Ejecuta las tareas en segundo plano de la tabla Tarea con N workers "
+        "concurrentes (hilos, cada uno con su conexión). SIGINT/SIGTERM dejan "
+        "terminar la tarea en curso antes de salir."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=2)
+        parser.add_argument('--intervalo', type=float, default=1.0,
+                            help="Segundos de espera cuando no hay tareas disponibles.")
+        parser.add_argument('--salir-si-vacia', action='store_true',
+                            help="Termina cuando no quedan tareas disponibles (p. ej. desde cron).")
+
+    def handle(self, *args, **options):
+        if options['workers'] < 1:
+            raise CommandError("--workers debe ser al menos 1")
+        detener = threading.Event()
+        for senal in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(senal, lambda *_: detener.set())
+
+        lock = threading.Lock()
+        resultado = {'completadas': 0, 'con_error': 0}
+
+        def al_terminar(tarea, ok):
+            with lock:
+                resultado['completadas' if ok else 'con_error'] += 1
+            if options['verbosity'] > 1:
+                estado = "ok" if ok else f"error (intento {tarea.intentos}/{tarea.max_intentos})"
+                self.stdout.write(f"{tarea.nombre} #{tarea.pk}: {estado}")
+
+        self.stdout.write(f"{options['workers']} workers esperando tareas")
+        hilos = iniciar_workers(
+            options['workers'], detener,
+            intervalo=options['intervalo'], salir_si_vacia=options['salir_si_vacia'], al_terminar=al_terminar,
+        )
+        # join con timeout para que el hilo principal siga atendiendo las señales
+        while any(hilo.is_alive() for hilo in hilos):
+            for hilo in hilos:
+                hilo.join(timeout=0.5)
+        self.stdout.write(self.style.SUCCESS(
+            f"{resultado['completadas']} tareas completadas, {resultado['con_error']} con error."
+        ))
@@ -0,0 +1,115 @@
+"""
+Motor de recomendaciones por habilidades.
+
+Las habilidades de Perfil son texto libre; aquí se normalizan a términos
+(minúsculas, sin tildes, sin palabras vacías) y se guardan en HabilidadPerfil,
+que funciona como índice invertido término -> estudiantes. El índice se
+actualiza solo para el perfil que se guarda.
+"""
+import re
+import unicodedata
+
+from django.db import transaction
+from django.db.models import Count, F, Q
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import HabilidadPerfil, Perfil
+
+PALABRAS_VACIAS = {
+    'de', 'el', 'la', 'en', 'un', 'lo', 'al', 'se', 'es', 'mi', 'tu', 'su', 'me', 'te', 'le',
+    'of', 'to', 'on', 'or', 'an', 'at', 'by', 'is',
+    'con', 'del', 'las', 'los', 'por', 'para', 'una', 'uno', 'unos', 'unas',
+    'que', 'como', 'mas', 'muy', 'sus', 'and', 'the', 'for', 'nivel',
+}
+# Habilidades de una letra que no deben descartarse como ruido
+HABILIDADES_DE_UNA_LETRA = {'c', 'r'}
+
+_TOKEN_RE = re.compile(r'[a-z0-9+#]+')
+
+
+def normalizar_habilidades(texto):
+    """Devuelve el conjunto de términos normalizados de un texto libre."""
+    if not texto:
+        return set()
+    texto = unicodedata.normalize('NFKD', texto.lower())
+    texto = ''.join(c for c in texto if not unicodedata.combining(c))
+    # Términos cortos como go, js, ui o ia son habilidades; c# y c++ se
+    # conservan siempre por el símbolo
+    return {
+        token[:64] for token in _TOKEN_RE.findall(texto)
+        if '+' in token or '#' in token or token in HABILIDADES_DE_UNA_LETRA
+        or (len(token) >= 2 and token not in PALABRAS_VACIAS)
+    }
+
+
+def filas_indice(perfil, modelo=HabilidadPerfil):
+    """
+    Entradas de HabilidadPerfil (sin guardar) que corresponden al perfil.
+    `modelo` permite usar el modelo histórico desde una migración.
+    """
+    return [
+        modelo(estudiante_id=perfil.estudiante_id, tipo=HabilidadPerfil.OFRECIDA, termino=termino)
+        for termino in normalizar_habilidades(perfil.habilidades_ofrecidas)
+    ] + [
+        modelo(estudiante_id=perfil.estudiante_id, tipo=HabilidadPerfil.BUSCADA, termino=termino)
+        for termino in normalizar_habilidades(perfil.habilidades_buscadas)
+    ]
+
+
+def indexar_perfil(perfil):
+    """Reemplaza las entradas del índice para el estudiante del perfil."""
+    filas = filas_indice(perfil)
+    with transaction.atomic():
+        HabilidadPerfil.objects.filter(estudiante_id=perfil.estudiante_id).delete()
+        HabilidadPerfil.objects.bulk_create(filas)
+
+
+def recomendar(estudiante, limite=10):
+    """
+    Estudiantes con coincidencia recíproca: ofrecen algo que el estudiante
+    busca y buscan algo que él ofrece. Se ordenan por la cantidad total de
+    términos en común. Solo se leen las entradas del índice de esos términos.
+    """
+    propios = list(HabilidadPerfil.objects.filter(estudiante=estudiante).values_list('tipo', 'termino'))
+    ofrezco = {termino for tipo, termino in propios if tipo == HabilidadPerfil.OFRECIDA}
+    busco = {termino for tipo, termino in propios if tipo == HabilidadPerfil.BUSCADA}
+    if not ofrezco or not busco:
+        return []
+
+    candidatos = (
+        HabilidadPerfil.objects
+        .filter(
+            Q(tipo=HabilidadPerfil.OFRECIDA, termino__in=busco)
+            | Q(tipo=HabilidadPerfil.BUSCADA, termino__in=ofrezco)
+        )
+        .exclude(estudiante=estudiante)
+        .values('estudiante')
+        .annotate(
+            me_ofrece=Count('pk', filter=Q(tipo=HabilidadPerfil.OFRECIDA)),
+            me_busca=Count('pk', filter=Q(tipo=HabilidadPerfil.BUSCADA)),
+        )
+        .filter(me_ofrece__gt=0, me_busca__gt=0)
+        .annotate(puntaje=F('me_ofrece') + F('me_busca'))
+        .order_by('-puntaje', 'estudiante')[:limite]
+    )
+    candidatos = list(candidatos)
+    perfiles = {
+        perfil.estudiante_id: perfil
+        for perfil in Perfil.objects.filter(estudiante_id__in=[c['estudiante'] for c in candidatos])
+    }
+    return [
+        dict(c, nombre=perfiles[c['estudiante']].nombre, foto=perfiles[c['estudiante']].foto)
+        for c in candidatos if c['estudiante'] in perfiles
+    ]
+
+
+@receiver(post_save, sender=Perfil)
+def actualizar_indice_habilidades(sender, instance, raw=False, **kwargs):
+    if not raw:
+        indexar_perfil(instance)
+
+
+@receiver(post_delete, sender=Perfil)
+def borrar_indice_habilidades(sender, instance, **kwargs):
+    HabilidadPerfil.objects.filter(estudiante_id=instance.estudiante_id).delete()
@@ -0,0 +1,108 @@
+import json
+import logging
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import JsonResponse
+
+from . import idempotencia
+from .db import solo_lectura
+from .instrumentacion import presupuesto_de, registrar_sql
+
+METODOS_SOLO_LECTURA = ('GET', 'HEAD', 'OPTIONS')
+
+logger = logging.getLogger('core.sql')
+
+
+class EnrutamientoLecturaMiddleware:
+    """Marca las peticiones de solo lectura para que el router use el alias 'lectura'."""
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = solo_lectura.set(request.method in METODOS_SOLO_LECTURA)
+        try:
+            return self.get_response(request)
+        finally:
+            solo_lectura.reset(token)
+
+
+class InstrumentacionSQLMiddleware:
+    """
+    Mide el SQL de cada petición (ver core/instrumentacion.py). Lo expone en
+    la cabecera Server-Timing, escribe una línea JSON en el logger 'core.sql'
+    (con 'excedido' si la vista supera su presupuesto_consultas, p. ej. con la
+    caché de API Keys fría) y deja el registro en response.registro_sql para
+    los tests.
+    """
+    def __init__(self, get_response):
+        if not getattr(settings, 'SQL_INSTRUMENTACION', True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.lentas = getattr(settings, 'SQL_INSTRUMENTACION_LENTAS', 3)
+        self.trazas = getattr(settings, 'SQL_INSTRUMENTACION_TRAZAS', False)
+
+    def __call__(self, request):
+        inicio = time.perf_counter()
+        with registrar_sql(lentas=self.lentas, trazas=self.trazas) as registro:
+            response = self.get_response(request)
+        total_ms = (time.perf_counter() - inicio) * 1000
+
+        metricas = [
+            f'db;dur={registro.duracion_ms:.2f};desc="{registro.consultas} consultas"',
+            f'app;dur={total_ms:.2f}',
+        ]
+        if registro.duplicadas():
+            metricas.append(f'db-dup;desc="{sum(registro.duplicadas().values())} repetidas"')
+        if response.has_header('Server-Timing'):
+            metricas.insert(0, response['Server-Timing'])
+        response['Server-Timing'] = ', '.join(metricas)
+        response.registro_sql = registro
+
+        if logger.isEnabledFor(logging.INFO):
+            match = request.resolver_match
+            presupuesto = presupuesto_de(match.func, request.method) if match else None
+            logger.info(json.dumps({
+                'metodo': request.method,
+                'ruta': request.path,
+                'vista': match.view_name if match else None,
+                'estado': response.status_code,
+                'total_ms': round(total_ms, 2),
+                'presupuesto': presupuesto,
+                'excedido': presupuesto is not None and registro.consultas > presupuesto,
+                **registro.resumen(),
+            }, ensure_ascii=False))
+        return response
+
+
+class IdempotenciaMiddleware:
+    """
+    Idempotency-Key en los POST autenticados (ver core/idempotencia.py): los
+    reintentos reciben la respuesta guardada sin volver a ejecutar la vista.
+    """
+    def __init__(self, get_response):
+        if not getattr(settings, 'IDEMPOTENCIA', True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        clave = idempotencia.clave_de(request)
+        if clave is None:
+            return self.get_response(request)
+        if len(request.headers[idempotencia.CABECERA]) > idempotencia.LARGO_MAXIMO:
+            return JsonResponse(
+                {'detail': f'{idempotencia.CABECERA} admite hasta {idempotencia.LARGO_MAXIMO} caracteres.'}, status=400,
+            )
+
+        huella = idempotencia.huella(request)
+        respuesta = idempotencia.reservar(clave, huella)
+        if respuesta is not None:
+            return respuesta
+        try:
+            respuesta = self.get_response(request)
+        except BaseException:
+            idempotencia.liberar(clave)
+            raise
+        idempotencia.completar(clave, huella, respuesta)
+        return respuesta
@@ -0,0 +1,62 @@
+from django.db import migrations
+
+# Índice FTS5 de contenido externo sobre core_publicacion. Los triggers lo
+# mantienen al día con cada INSERT, UPDATE de titulo/descripcion y DELETE.
+# El borrado lógico (estado=False) no toca el índice: se filtra en la query.
+CREAR_FTS = [
+    """
+    CREATE VIRTUAL TABLE core_publicacion_fts USING fts5(
+        titulo, descripcion,
+        content='core_publicacion', content_rowid='id_publicacion',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER core_publicacion_fts_ai AFTER INSERT ON core_publicacion BEGIN
+        INSERT INTO core_publicacion_fts(rowid, titulo, descripcion)
+        VALUES (new.id_publicacion, new.titulo, new.descripcion);
+    END
+    """,
+    """
+    CREATE TRIGGER core_publicacion_fts_ad AFTER DELETE ON core_publicacion BEGIN
+        INSERT INTO core_publicacion_fts(core_publicacion_fts, rowid, titulo, descripcion)
+        VALUES ('delete', old.id_publicacion, old.titulo, old.descripcion);
+    END
+    """,
+    """
+    CREATE TRIGGER core_publicacion_fts_au AFTER UPDATE OF titulo, descripcion ON core_publicacion BEGIN
+        INSERT INTO core_publicacion_fts(core_publicacion_fts, rowid, titulo, descripcion)
+        VALUES ('delete', old.id_publicacion, old.titulo, old.descripcion);
+        INSERT INTO core_publicacion_fts(rowid, titulo, descripcion)
+        VALUES (new.id_publicacion, new.titulo, new.descripcion);
+    END
+    """,
+    "INSERT INTO core_publicacion_fts(core_publicacion_fts) VALUES ('rebuild')",
+]
+
+BORRAR_FTS = [
+    "DROP TRIGGER IF EXISTS core_publicacion_fts_au",
+    "DROP TRIGGER IF EXISTS core_publicacion_fts_ad",
+    "DROP TRIGGER IF EXISTS core_publicacion_fts_ai",
+    "DROP TABLE IF EXISTS core_publicacion_fts",
+]
+
+
+def ejecutar(sentencias):
+    def operacion(apps, schema_editor):
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        for sentencia in sentencias:
+            schema_editor.execute(sentencia)
+    return operacion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_rename_estado_notificacion_leida_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(ejecutar(CREAR_FTS), ejecutar(BORRAR_FTS)),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-17 13:46
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from core.matching import filas_indice
+
+# Los perfiles guardados antes de esta migración no pasan por la señal que
+# mantiene el índice: se indexan aquí, de a lotes.
+LOTE = 1000
+
+
+def indexar_perfiles(apps, schema_editor):
+    HabilidadPerfil = apps.get_model('core', 'HabilidadPerfil')
+    Perfil = apps.get_model('core', 'Perfil')
+    filas = []
+    for perfil in Perfil.objects.only('estudiante_id', 'habilidades_ofrecidas', 'habilidades_buscadas').iterator(LOTE):
+        filas.extend(filas_indice(perfil, modelo=HabilidadPerfil))
+        if len(filas) >= LOTE:
+            HabilidadPerfil.objects.bulk_create(filas)
+            filas = []
+    HabilidadPerfil.objects.bulk_create(filas)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_publicacion_fts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HabilidadPerfil',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('ofrecida', 'Ofrecida'), ('buscada', 'Buscada')], max_length=10)),
+                ('termino', models.CharField(max_length=64)),
+                ('estudiante', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='habilidades', to='core.estudiante')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['tipo', 'termino', 'estudiante'], name='habilidad_tipo_termino_idx')],
+                'unique_together': {('estudiante', 'tipo', 'termino')},
+            },
+        ),
+        migrations.RunPython(indexar_perfiles, migrations.RunPython.noop),
+    ]
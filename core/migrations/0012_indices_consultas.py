@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-17 13:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_habilidadperfil'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='chatparticipante',
+            index=models.Index(fields=['estudiante', 'chat'], name='participante_estudiante_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='mensaje',
+            index=models.Index(fields=['chat', 'fecha', 'id_mensaje'], name='mensaje_chat_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='mensaje',
+            index=models.Index(fields=['fecha', 'id_mensaje'], name='mensaje_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notificacion',
+            index=models.Index(fields=['estudiante', 'fecha', 'id_notificacion'], name='notif_estudiante_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notificacion',
+            index=models.Index(condition=models.Q(('leida', False)), fields=['estudiante', 'fecha'], name='notif_no_leidas_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='publicacion',
+            index=models.Index(fields=['fecha_creacion', 'id_publicacion'], name='publicacion_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='publicacion',
+            index=models.Index(condition=models.Q(('estado', True)), fields=['fecha_creacion', 'id_publicacion'], name='publicacion_activa_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='publicacion',
+            index=models.Index(fields=['habilidad', 'fecha_creacion'], name='publicacion_habilidad_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reporte',
+            index=models.Index(fields=['estado', 'fecha'], name='reporte_estado_fecha_idx'),
+        ),
+    ]
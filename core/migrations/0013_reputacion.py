@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-17 13:53
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from core.reputacion import reconstruir_rango
+
+# Sin esto registrar_calificacion sumaría sobre filas en cero para todas las
+# calificaciones anteriores a la migración
+LOTE = 500
+
+
+def rellenar_reputacion(apps, schema_editor):
+    CalificacionChat = apps.get_model('core', 'CalificacionChat')
+    Estudiante = apps.get_model('core', 'Estudiante')
+    Reputacion = apps.get_model('core', 'Reputacion')
+    ultimo = Estudiante.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+    for desde in range(0, ultimo, LOTE):
+        reconstruir_rango(desde, desde + LOTE, calificaciones=CalificacionChat, reputaciones=Reputacion)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_indices_consultas'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Reputacion',
+            fields=[
+                ('estudiante', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='reputacion', serialize=False, to='core.estudiante')),
+                ('cantidad', models.PositiveIntegerField(default=0)),
+                ('suma', models.PositiveIntegerField(default=0)),
+                ('promedio', models.FloatField(default=0)),
+                ('estrellas_1', models.PositiveIntegerField(default=0)),
+                ('estrellas_2', models.PositiveIntegerField(default=0)),
+                ('estrellas_3', models.PositiveIntegerField(default=0)),
+                ('estrellas_4', models.PositiveIntegerField(default=0)),
+                ('estrellas_5', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-promedio', '-cantidad'], name='reputacion_ranking_idx')],
+            },
+        ),
+        migrations.RunPython(rellenar_reputacion, migrations.RunPython.noop),
+    ]
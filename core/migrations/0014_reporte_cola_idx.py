@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-17 14:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_reputacion'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='reporte',
+            index=models.Index(fields=['estado', 'publicacion', 'estudiante', 'fecha'], name='reporte_cola_idx'),
+        ),
+    ]
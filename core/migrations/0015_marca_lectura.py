@@ -0,0 +1,63 @@
+from django.db import migrations, models
+from django.db.models import Exists, Max, Min, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+# Mensaje.leido pasa a ser una marca por participante (ChatParticipante.ultimo_leido).
+# Un mensaje con leido=True fue leído por el resto del chat, así que la marca
+# de cada participante llega hasta justo antes del primer mensaje ajeno sin
+# leer o, si no hay ninguno, hasta el último mensaje del chat.
+
+
+def leido_a_marcas(apps, schema_editor):
+    ChatParticipante = apps.get_model('core', 'ChatParticipante')
+    Mensaje = apps.get_model('core', 'Mensaje')
+    primer_no_leido = (
+        Mensaje.objects
+        .filter(chat=OuterRef('chat'), leido=False)
+        .exclude(estudiante=OuterRef('estudiante'))
+        .values('chat')
+        .annotate(primero=Min('id_mensaje'))
+        .values('primero')
+    )
+    ultimo = Mensaje.objects.filter(chat=OuterRef('chat')).values('chat').annotate(ultimo=Max('id_mensaje')).values('ultimo')
+    ChatParticipante.objects.update(
+        ultimo_leido=Coalesce(
+            Subquery(primer_no_leido, output_field=models.IntegerField()) - Value(1),
+            Subquery(ultimo, output_field=models.IntegerField()),
+            Value(0),
+        )
+    )
+
+
+def marcas_a_leido(apps, schema_editor):
+    ChatParticipante = apps.get_model('core', 'ChatParticipante')
+    Mensaje = apps.get_model('core', 'Mensaje')
+    leido_por_otro = ChatParticipante.objects.filter(
+        chat=OuterRef('chat'), ultimo_leido__gte=OuterRef('id_mensaje'),
+    ).exclude(estudiante=OuterRef('estudiante'))
+    Mensaje.objects.update(leido=Exists(leido_por_otro))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_reporte_cola_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chatparticipante',
+            name='fecha_lectura',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='chatparticipante',
+            name='ultimo_leido',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(leido_a_marcas, marcas_a_leido),
+        migrations.RemoveField(
+            model_name='mensaje',
+            name='leido',
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 14:19
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_marca_lectura'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Contadores',
+            fields=[
+                ('estudiante', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='contadores', serialize=False, to='core.estudiante')),
+                ('notificaciones_no_leidas', models.IntegerField(default=0)),
+                ('mensajes_no_leidos', models.IntegerField(default=0)),
+                ('calificaciones_pendientes', models.IntegerField(default=0)),
+            ],
+        ),
+    ]
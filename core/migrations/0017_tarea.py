@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-17 14:28
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_contadores'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tarea',
+            fields=[
+                ('id_tarea', models.AutoField(primary_key=True, serialize=False)),
+                ('nombre', models.CharField(max_length=200)),
+                ('argumentos', models.JSONField(default=dict)),
+                ('prioridad', models.SmallIntegerField(default=0)),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('en_curso', 'En curso'), ('completada', 'Completada'), ('fallida', 'Fallida')], default='pendiente', max_length=10)),
+                ('disponible_desde', models.DateTimeField(default=django.utils.timezone.now)),
+                ('intentos', models.PositiveSmallIntegerField(default=0)),
+                ('max_intentos', models.PositiveSmallIntegerField(default=5)),
+                ('visibilidad', models.PositiveIntegerField(default=300)),
+                ('reserva', models.CharField(blank=True, max_length=100)),
+                ('error', models.TextField(blank=True)),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True)),
+                ('fecha_fin', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'indexes': [models.Index(condition=models.Q(('fecha_fin__isnull', True)), fields=['-prioridad', 'disponible_desde'], name='tarea_disponible_idx'), models.Index(fields=['estado', 'fecha_fin'], name='tarea_estado_fin_idx')],
+            },
+        ),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 import uuid
 import secrets
     #-----------------------Estudiantes y Administradores
@@ -10,6 +11,10 @@ class Estudiante(models.Model):
     api_key = models.CharField(max_length=100, unique=True, blank=True, null=True)
     es_admin = models.BooleanField(default=False)
 
+    # Necesarios para que DRF trate al Estudiante como request.user
+    is_authenticated = True
+    is_anonymous = False
+
     def save(self, *args, **kwargs):
         if not self.api_key:
             self.api_key = f"api_{uuid.uuid4().hex}"
@@ -22,6 +27,9 @@ class Administrador(models.Model):
     contraseña = models.CharField(max_length=255)
     api_key = models.CharField(max_length=100, unique=True, blank=True, null=True)
 
+    is_authenticated = True
+    is_anonymous = False
+
     def save(self, *args, **kwargs):
         if not self.api_key:
             while True:
@@ -32,6 +40,32 @@ class Administrador(models.Model):
         super().save(*args, **kwargs)
         
 #-----------------------Publicaciones y Calificaciones
+class PublicacionQuerySet(models.QuerySet):
+    def activas(self):
+        return self.filter(estado=True)
+
+    def desactivar(self):
+        """Borrado lógico masivo en un solo UPDATE; devuelve las filas afectadas."""
+        return self.update(estado=False)
+
+    def reactivar(self):
+        return self.update(estado=True)
+
+    def update(self, **kwargs):
+        filas = super().update(**kwargs)
+        if filas:
+            # UPDATE masivo sin pks conocidos: se invalidan todas las respuestas cacheadas
+            from .cache_publicaciones import invalidar_todas
+            invalidar_todas()
+        return filas
+
+
+class ActivasManager(models.Manager.from_queryset(PublicacionQuerySet)):
+    """Solo publicaciones no borradas lógicamente (usa publicacion_activa_fecha_idx)."""
+    def get_queryset(self):
+        return super().get_queryset().filter(estado=True)
+
+
 class Publicacion(models.Model):
     id_publicacion = models.AutoField(primary_key=True)
     titulo = models.CharField(max_length=200)
@@ -40,7 +74,23 @@ class Publicacion(models.Model):
     fecha_creacion = models.DateTimeField(auto_now_add=True)
     estado = models.BooleanField(default=True)
     estudiante = models.ForeignKey(Estudiante, on_delete=models.CASCADE)
-    
+
+    # objects sigue siendo el manager por defecto (admin, relaciones, moderación);
+    # los listados públicos usan activas
+    objects = PublicacionQuerySet.as_manager()
+    activas = ActivasManager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['fecha_creacion', 'id_publicacion'], name='publicacion_fecha_idx'),
+            models.Index(
+                fields=['fecha_creacion', 'id_publicacion'],
+                condition=models.Q(estado=True),
+                name='publicacion_activa_fecha_idx',
+            ),
+            models.Index(fields=['habilidad', 'fecha_creacion'], name='publicacion_habilidad_idx'),
+        ]
+
 # ---------- calificaciones de estudiantes ----------
 
 class Chat(models.Model):
@@ -59,9 +109,14 @@ class ChatParticipante(models.Model):
     estudiante = models.ForeignKey('core.Estudiante', on_delete=models.CASCADE, related_name='participaciones')
     rol = models.CharField(max_length=20, choices=ROL_CHOICES, default='receptor')  # 👈 default
     calificado = models.BooleanField(default=False)
+    # Marca de lectura: id del último mensaje leído por este participante. Los
+    # no leídos son los mensajes de otros con id mayor (rango sobre chat_id)
+    ultimo_leido = models.IntegerField(default=0)
+    fecha_lectura = models.DateTimeField(null=True, blank=True)
 
     class Meta:
         unique_together = ('chat', 'estudiante')
+        indexes = [models.Index(fields=['estudiante', 'chat'], name='participante_estudiante_idx')]
 
 
 class Mensaje(models.Model):
@@ -70,7 +125,12 @@ class Mensaje(models.Model):
     fecha = models.DateTimeField(auto_now_add=True)
     chat = models.ForeignKey(Chat, on_delete=models.CASCADE, related_name='mensajes')
     estudiante = models.ForeignKey('core.Estudiante', on_delete=models.CASCADE, related_name='mensajes')
-    leido = models.BooleanField(default=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['chat', 'fecha', 'id_mensaje'], name='mensaje_chat_fecha_idx'),
+            models.Index(fields=['fecha', 'id_mensaje'], name='mensaje_fecha_idx'),
+        ]
 
 
 class CalificacionChat(models.Model):
@@ -102,6 +162,88 @@ class Notificacion(models.Model):
     chat = models.ForeignKey(Chat, on_delete=models.CASCADE, null=True, blank=True, related_name='notificaciones')
     publicacion = models.ForeignKey('core.Publicacion', on_delete=models.CASCADE, null=True, blank=True, related_name='notificaciones')
     calificacion = models.ForeignKey('core.CalificacionChat', on_delete=models.CASCADE, null=True, blank=True, related_name='notificaciones')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['estudiante', 'fecha', 'id_notificacion'], name='notif_estudiante_fecha_idx'),
+            models.Index(fields=['estudiante', 'fecha'], condition=models.Q(leida=False), name='notif_no_leidas_idx'),
+        ]
+
+
+class Reputacion(models.Model):
+    """
+    Agregado de las calificaciones recibidas por un estudiante, mantenido de
+    forma incremental (ver core/reputacion.py) para no recalcularlo por petición.
+    """
+    estudiante = models.OneToOneField('core.Estudiante', on_delete=models.CASCADE, primary_key=True, related_name='reputacion')
+    cantidad = models.PositiveIntegerField(default=0)
+    suma = models.PositiveIntegerField(default=0)
+    promedio = models.FloatField(default=0)
+    estrellas_1 = models.PositiveIntegerField(default=0)
+    estrellas_2 = models.PositiveIntegerField(default=0)
+    estrellas_3 = models.PositiveIntegerField(default=0)
+    estrellas_4 = models.PositiveIntegerField(default=0)
+    estrellas_5 = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [models.Index(fields=['-promedio', '-cantidad'], name='reputacion_ranking_idx')]
+
+    @property
+    def histograma(self):
+        return {n: getattr(self, f'estrellas_{n}') for n in range(1, 6)}
+
+
+class Contadores(models.Model):
+    """
+    Contadores de los badges del estudiante, ajustados con F() en cada evento
+    (ver core/contadores.py) para no contar filas en cada refresco.
+    """
+    estudiante = models.OneToOneField('core.Estudiante', on_delete=models.CASCADE, primary_key=True, related_name='contadores')
+    notificaciones_no_leidas = models.IntegerField(default=0)
+    mensajes_no_leidos = models.IntegerField(default=0)
+    calificaciones_pendientes = models.IntegerField(default=0)
+
+
+class Tarea(models.Model):
+    """Tarea en segundo plano, ejecutada por `manage.py run_worker` (ver core/tareas.py)."""
+    PENDIENTE = 'pendiente'
+    EN_CURSO = 'en_curso'
+    COMPLETADA = 'completada'
+    FALLIDA = 'fallida'
+    ESTADO_CHOICES = (
+        (PENDIENTE, 'Pendiente'),
+        (EN_CURSO, 'En curso'),
+        (COMPLETADA, 'Completada'),
+        (FALLIDA, 'Fallida'),
+    )
+    id_tarea = models.AutoField(primary_key=True)
+    nombre = models.CharField(max_length=200)  # ruta de la función, p. ej. core.notifications.escribir_notificaciones
+    argumentos = models.JSONField(default=dict)
+    prioridad = models.SmallIntegerField(default=0)  # mayor se ejecuta antes
+    estado = models.CharField(max_length=10, choices=ESTADO_CHOICES, default=PENDIENTE)
+    # Pendiente: desde cuándo se puede ejecutar. En curso: hasta cuándo dura la reserva
+    disponible_desde = models.DateTimeField(default=timezone.now)
+    intentos = models.PositiveSmallIntegerField(default=0)
+    max_intentos = models.PositiveSmallIntegerField(default=5)
+    visibilidad = models.PositiveIntegerField(default=300)  # segundos
+    reserva = models.CharField(max_length=100, blank=True)
+    error = models.TextField(blank=True)
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+    fecha_fin = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Solo las tareas vivas (sin fecha_fin), en el orden en que se reservan.
+            # La condición no lleva parámetros para que SQLite pueda usar el índice
+            models.Index(
+                fields=['-prioridad', 'disponible_desde'],
+                condition=models.Q(fecha_fin__isnull=True),
+                name='tarea_disponible_idx',
+            ),
+            models.Index(fields=['estado', 'fecha_fin'], name='tarea_estado_fin_idx'),
+        ]
+
+
 #-----------------------Perfiles y Notificaciones
 class TokenVerificacion(models.Model):
     id_token = models.AutoField(primary_key=True)
@@ -117,6 +259,19 @@ class Perfil(models.Model):
     foto = models.URLField(blank=True, null=True)
     habilidades_ofrecidas = models.TextField(blank=True, null=True)
     habilidades_buscadas = models.TextField(blank=True, null=True)
+
+class HabilidadPerfil(models.Model):
+    """Índice invertido término -> estudiante, derivado de Perfil (ver core/matching.py)."""
+    OFRECIDA = 'ofrecida'
+    BUSCADA = 'buscada'
+    TIPO_CHOICES = ((OFRECIDA, 'Ofrecida'), (BUSCADA, 'Buscada'))
+    estudiante = models.ForeignKey(Estudiante, on_delete=models.CASCADE, related_name='habilidades')
+    tipo = models.CharField(max_length=10, choices=TIPO_CHOICES)
+    termino = models.CharField(max_length=64)
+
+    class Meta:
+        unique_together = ('estudiante', 'tipo', 'termino')
+        indexes = [models.Index(fields=['tipo', 'termino', 'estudiante'], name='habilidad_tipo_termino_idx')]
 #-----------------------Reportes
 class Reporte(models.Model):
     id_reporte = models.AutoField(primary_key=True)
@@ -127,5 +282,12 @@ class Reporte(models.Model):
     estudiante = models.ForeignKey(Estudiante, on_delete=models.CASCADE)
     publicacion = models.ForeignKey(Publicacion, on_delete=models.CASCADE)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['estado', 'fecha'], name='reporte_estado_fecha_idx'),
+            # Cubre la cola de moderación: agrupa los pendientes sin leer la tabla
+            models.Index(fields=['estado', 'publicacion', 'estudiante', 'fecha'], name='reporte_cola_idx'),
+        ]
+
 
 #hola
\ No newline at end of file
@@ -0,0 +1,64 @@
+"""
+Cola de moderación y moderación en lote de reportes.
+
+cola_pendiente agrupa los reportes pendientes por publicación en una sola
+consulta agregada (resuelta con el índice reporte_cola_idx, sin leer la
+tabla). moderar_lote aplica una acción a muchos reportes o publicaciones con
+UPDATE por conjuntos dentro de una transacción, en lugar de una petición y un
+save() por reporte.
+"""
+from django.db import transaction
+from django.db.models import Count, Max, Min, Q
+
+from .models import Publicacion, Reporte
+from .service import SoftDeleteService
+
+PENDIENTE, ACEPTADO, RECHAZADO = 0, 1, 2
+# 'eliminar' da de baja la publicación y acepta sus reportes
+ESTADO_POR_ACCION = {'aprobar': ACEPTADO, 'rechazar': RECHAZADO, 'eliminar': ACEPTADO}
+
+
+def cola_pendiente():
+    """
+    Una fila (dict) por publicación con reportes pendientes: cuántos, de
+    cuántos estudiantes distintos y el primero y el último. La severidad es la
+    cantidad de reportantes distintos (un mismo estudiante repitiendo el
+    reporte no la sube); el orden lo fija la paginación.
+    """
+    return (
+        Reporte.objects
+        .filter(estado=PENDIENTE)
+        .values('publicacion', 'publicacion__titulo', 'publicacion__estado', 'publicacion__estudiante')
+        .annotate(
+            reportantes=Count('estudiante', distinct=True),
+            reportes=Count('pk'),
+            primer_reporte=Min('fecha'),
+            ultimo_reporte=Max('fecha'),
+        )
+    )
+
+
+def moderar_lote(administrador, accion, reportes=(), publicaciones=()):
+    """
+    Aplica `accion` a los reportes pendientes indicados y a todos los
+    pendientes de las publicaciones indicadas. Con 'eliminar' además se dan de
+    baja esas publicaciones (y las de los reportes). Los reportes ya moderados
+    no se tocan, así que repetir el lote no cambia nada.
+    Devuelve {'reportes': n, 'publicaciones': m} con las filas cambiadas.
+    """
+    reportes, publicaciones = set(reportes), set(publicaciones)
+    with transaction.atomic():
+        retiradas = 0
+        if accion == 'eliminar':
+            if reportes:
+                publicaciones |= set(
+                    Reporte.objects.filter(pk__in=reportes).values_list('publicacion_id', flat=True)
+                )
+            # Via SoftDeleteService para invalidar la caché solo de esas publicaciones
+            retiradas = SoftDeleteService.desactivar_lote(
+                Publicacion.objects.filter(pk__in=publicaciones, estado=True)
+            )
+        moderados = Reporte.objects.filter(
+            Q(pk__in=reportes) | Q(publicacion_id__in=publicaciones), estado=PENDIENTE,
+        ).update(estado=ESTADO_POR_ACCION[accion], administrador=administrador)
+    return {'reportes': moderados, 'publicaciones': retiradas}
@@ -0,0 +1,81 @@
+"""
+Despacho de notificaciones.
+
+Todas las notificaciones de un evento se construyen en memoria y se escriben
+con un solo bulk_create. Con diferir=True (o NOTIFICACIONES_AL_CONFIRMAR) la
+escritura se hace en transaction.on_commit, fuera de la transacción de la
+petición, para que el lock de escritura de SQLite se libere antes. Con
+NOTIFICACIONES_EN_COLA se encola una tarea (core/tareas.py) y la escritura
+sale por completo de la petición. Cada notificación escrita se empuja además
+a los clientes conectados (ver core/realtime.py).
+"""
+from collections import Counter
+
+from django.conf import settings
+from django.db import transaction
+
+from .contadores import ajustar
+from .models import ChatParticipante, Notificacion
+from .realtime import publicar_al_confirmar
+from .serializers import NotificacionSerializer
+from .tareas import tarea
+
+
+def otros_participantes(chat, excluir):
+    """ids de los participantes del chat distintos de `excluir`, en una consulta."""
+    return list(
+        ChatParticipante.objects
+        .filter(chat=chat)
+        .exclude(estudiante=excluir)
+        .values_list('estudiante_id', flat=True)
+    )
+
+
+CAMPOS_EN_COLA = ('estudiante_id', 'tipo', 'mensaje', 'chat_id', 'publicacion_id', 'calificacion_id')
+
+
+def notificar(estudiantes_ids, tipo, mensaje, chat=None, publicacion=None, calificacion=None, diferir=None):
+    """Crea una Notificacion por destinatario con un único INSERT."""
+    filas = [
+        Notificacion(
+            estudiante_id=estudiante_id,
+            tipo=tipo,
+            mensaje=mensaje,
+            chat=chat,
+            publicacion=publicacion,
+            calificacion=calificacion,
+        )
+        for estudiante_id in estudiantes_ids
+    ]
+    if not filas:
+        return filas
+    if getattr(settings, 'NOTIFICACIONES_EN_COLA', False):
+        escribir_notificaciones.encolar(filas=[
+            {campo: getattr(fila, campo) for campo in CAMPOS_EN_COLA} for fila in filas
+        ])
+        return filas
+    if diferir is None:
+        diferir = getattr(settings, 'NOTIFICACIONES_AL_CONFIRMAR', False)
+    if diferir:
+        transaction.on_commit(lambda: _escribir(filas))
+    else:
+        _escribir(filas)
+    return filas
+
+
+def _escribir(filas):
+    with transaction.atomic():
+        Notificacion.objects.bulk_create(filas)
+        # Un UPDATE por cada cantidad distinta de notificaciones por destinatario (casi siempre 1)
+        cantidades = Counter(fila.estudiante_id for fila in filas)
+        for cantidad in set(cantidades.values()):
+            ajustar([pk for pk, n in cantidades.items() if n == cantidad], notificaciones_no_leidas=cantidad)
+    # Push a los clientes conectados; se emite solo si la escritura confirma
+    for fila in filas:
+        publicar_al_confirmar([fila.estudiante_id], 'notificacion', NotificacionSerializer(fila).data)
+
+
+@tarea(prioridad=5)
+def escribir_notificaciones(filas):
+    # Todo en una transacción: solo se repite si el worker muere entre esta y el cierre de la tarea
+    _escribir([Notificacion(**fila) for fila in filas])
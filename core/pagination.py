@@ -0,0 +1,153 @@
+import base64
+import json
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Paginación por cursor (keyset) sobre el par (campo_orden, pk).
+    Cada página se resuelve con un WHERE sobre la última fila vista en lugar
+    de un OFFSET, por lo que el costo no crece con el número de página y
+    los inserts concurrentes no desplazan ni duplican filas.
+    Las filas pueden ser instancias o dicts de values(); en ese caso
+    campo_pk indica la columna que desempata.
+    """
+    campo_orden = 'fecha'
+    campo_pk = 'pk'
+    descendente = True
+    page_size = getattr(settings, 'PAGINACION_PAGE_SIZE', 20)
+    page_size_query_param = 'page_size'
+    max_page_size = getattr(settings, 'PAGINACION_MAX_PAGE_SIZE', 100)
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Cursor inválido'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        page_size = self.get_page_size(request)
+        cursor = self.decode_cursor(request)
+        atras = bool(cursor and cursor['atras'])
+
+        # Al retroceder se recorre en el orden contrario y luego se invierte.
+        desc = self.descendente != atras
+        if cursor:
+            op = 'lt' if desc else 'gt'
+            queryset = queryset.filter(
+                Q(**{f'{self.campo_orden}__{op}': cursor['valor']})
+                | Q(**{self.campo_orden: cursor['valor'], f'{self.campo_pk}__{op}': cursor['pk']})
+            )
+        orden = [f'-{self.campo_orden}', f'-{self.campo_pk}'] if desc else [self.campo_orden, self.campo_pk]
+        filas = list(queryset.order_by(*orden)[:page_size + 1])
+
+        hay_mas = len(filas) > page_size
+        filas = filas[:page_size]
+        if atras:
+            filas.reverse()
+            self.has_next, self.has_previous = cursor is not None, hay_mas
+        else:
+            self.has_next, self.has_previous = hay_mas, cursor is not None
+        self.page = filas
+        return filas
+
+    def get_page_size(self, request):
+        if self.page_size_query_param:
+            try:
+                valor = int(request.query_params[self.page_size_query_param])
+                if valor > 0:
+                    return min(valor, self.max_page_size)
+            except (KeyError, ValueError):
+                pass
+        return self.page_size
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], atras=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], atras=True)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def valor_de(self, fila, campo):
+        return fila[campo] if isinstance(fila, dict) else getattr(fila, campo)
+
+    def codificar_valor(self, valor):
+        return valor.isoformat()
+
+    def decodificar_valor(self, valor):
+        valor = parse_datetime(valor)
+        if valor is None:
+            raise ValueError
+        return valor
+
+    def encode_cursor(self, fila, atras):
+        valor = self.valor_de(fila, self.campo_orden)
+        datos = {'v': self.codificar_valor(valor), 'p': self.valor_de(fila, self.campo_pk), 'a': int(atras)}
+        cursor = base64.urlsafe_b64encode(json.dumps(datos).encode()).decode()
+        return replace_query_param(self.base_url, self.cursor_query_param, cursor)
+
+    def decode_cursor(self, request):
+        codificado = request.query_params.get(self.cursor_query_param)
+        if not codificado:
+            return None
+        try:
+            datos = json.loads(base64.urlsafe_b64decode(codificado.encode()).decode())
+            return {'valor': self.decodificar_valor(datos['v']), 'pk': int(datos['p']), 'atras': bool(datos.get('a'))}
+        except (TypeError, ValueError, KeyError):
+            raise ValidationError({self.cursor_query_param: self.invalid_cursor_message})
+
+
+class PublicacionPagination(KeysetPagination):
+    campo_orden = 'fecha_creacion'
+
+
+class MensajePagination(KeysetPagination):
+    # Los mensajes se leen en orden cronológico
+    descendente = False
+
+
+class NotificacionPagination(KeysetPagination):
+    pass
+
+
+class InboxPagination(KeysetPagination):
+    # Anotación calculada en ChatInboxView.get_queryset
+    campo_orden = 'ultima_actividad'
+
+
+class ColaModeracionPagination(KeysetPagination):
+    # Filas agregadas de moderacion.cola_pendiente, por severidad descendente
+    campo_orden = 'reportantes'
+    campo_pk = 'publicacion'
+
+    def codificar_valor(self, valor):
+        return valor
+
+    def decodificar_valor(self, valor):
+        return int(valor)
@@ -0,0 +1,239 @@
+"""
+Push en tiempo real de mensajes y notificaciones.
+
+Los eventos se publican en un broker (por defecto BrokerMemoria, en proceso;
+REALTIME_BROKER permite enchufar otro) y se entregan a los clientes
+conectados por WebSocket (/ws/eventos/) o por Server-Sent Events
+(/api/eventos/stream/). Cada evento tiene un id creciente: al reconectar, el
+cliente envía el último id recibido (Last-Event-ID o ?last_event_id=) y solo
+recibe lo que se perdió, no todo el historial.
+
+Ambos transportes requieren servir la app con ASGI (interu_backend/asgi.py).
+"""
+import asyncio
+import itertools
+import json
+import threading
+import time
+from collections import defaultdict, deque
+from dataclasses import dataclass, field
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.module_loading import import_string
+
+from .authentication import resolver_api_key
+from .models import Estudiante
+
+
+@dataclass
+class Evento:
+    id: int
+    estudiante_id: int
+    tipo: str
+    datos: dict = field(default_factory=dict)
+
+    def como_json(self):
+        return json.dumps({'id': self.id, 'tipo': self.tipo, 'datos': self.datos})
+
+    def como_sse(self):
+        return f"id: {self.id}\nevent: {self.tipo}\ndata: {json.dumps(self.datos)}\n\n"
+
+
+class Suscripcion:
+    """Cola de eventos de un cliente conectado, ligada a su event loop."""
+    def __init__(self, broker, estudiante_id, max_pendientes=1000):
+        self.broker = broker
+        self.estudiante_id = estudiante_id
+        self._loop = asyncio.get_running_loop()
+        self._cola = asyncio.Queue(maxsize=max_pendientes)
+
+    def entregar(self, evento):
+        """Encola el evento; False si el event loop del cliente ya se cerró."""
+        # Se puede llamar desde cualquier hilo (las vistas síncronas publican)
+        try:
+            self._loop.call_soon_threadsafe(self._poner, evento)
+        except RuntimeError:
+            return False
+        return True
+
+    def _poner(self, evento):
+        try:
+            self._cola.put_nowait(evento)
+        except asyncio.QueueFull:
+            # Cliente demasiado lento: se descarta y deberá resincronizar por REST
+            pass
+
+    async def siguiente(self, timeout=None):
+        """Próximo evento, o None si pasa `timeout` segundos sin eventos."""
+        try:
+            return await asyncio.wait_for(self._cola.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def cerrar(self):
+        self.broker.cancelar(self)
+
+
+class BrokerBase:
+    """Interfaz que debe implementar cualquier broker de eventos."""
+    def publicar(self, estudiante_id, tipo, datos):
+        raise NotImplementedError
+
+    def suscribir(self, estudiante_id, desde_id=None):
+        raise NotImplementedError
+
+    def cancelar(self, suscripcion):
+        raise NotImplementedError
+
+
+class BrokerMemoria(BrokerBase):
+    """
+    Pub/sub en memoria del proceso. Guarda los últimos `historial` eventos
+    por estudiante para poder reanudar desde un id. Sirve para un único
+    proceso ASGI y para pruebas.
+
+    Los ids arrancan en el instante de inicio en microsegundos: tras un
+    reinicio siguen siendo mayores que los ya entregados, así que un
+    Last-Event-ID anterior no oculta los eventos nuevos.
+    """
+    def __init__(self, historial=200):
+        self._ids = itertools.count(time.time_ns() // 1000)
+        self._historial = defaultdict(lambda: deque(maxlen=historial))
+        self._suscriptores = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def publicar(self, estudiante_id, tipo, datos):
+        with self._lock:
+            evento = Evento(next(self._ids), estudiante_id, tipo, datos)
+            self._historial[estudiante_id].append(evento)
+            suscriptores = list(self._suscriptores[estudiante_id])
+        caidas = [suscripcion for suscripcion in suscriptores if not suscripcion.entregar(evento)]
+        if caidas:
+            # Clientes cuyo event loop terminó sin cancelar la suscripción
+            with self._lock:
+                self._suscriptores[estudiante_id].difference_update(caidas)
+        return evento
+
+    def suscribir(self, estudiante_id, desde_id=None):
+        suscripcion = Suscripcion(self, estudiante_id)
+        with self._lock:
+            if desde_id is not None:
+                for evento in self._historial[estudiante_id]:
+                    if evento.id > desde_id:
+                        suscripcion.entregar(evento)
+            self._suscriptores[estudiante_id].add(suscripcion)
+        return suscripcion
+
+    def cancelar(self, suscripcion):
+        with self._lock:
+            self._suscriptores[suscripcion.estudiante_id].discard(suscripcion)
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                _broker = import_string(getattr(settings, 'REALTIME_BROKER', 'core.realtime.BrokerMemoria'))()
+    return _broker
+
+
+def publicar_al_confirmar(estudiantes_ids, tipo, datos):
+    """Publica el evento a cada estudiante cuando la transacción actual confirme."""
+    estudiantes_ids = list(estudiantes_ids)
+
+    def publicar():
+        broker = get_broker()
+        for estudiante_id in estudiantes_ids:
+            broker.publicar(estudiante_id, tipo, datos)
+
+    # robust: un broker que falla no convierte en error una petición ya confirmada
+    transaction.on_commit(publicar, robust=True)
+
+
+# ----------- TRANSPORTES -----------
+INTERVALO_KEEPALIVE = 15
+
+
+def _parse_last_event_id(valor):
+    try:
+        return int(valor) if valor else None
+    except ValueError:
+        return None
+
+
+async def _estudiante_por_api_key(api_key):
+    if not api_key:
+        return None
+    cuenta = await sync_to_async(resolver_api_key)(api_key)
+    return cuenta if isinstance(cuenta, Estudiante) else None
+
+
+async def eventos_stream(request):
+    """
+    Server-Sent Events. Acepta la key en X-API-Key o en ?api_key= (EventSource
+    no permite headers propios) y reanuda desde Last-Event-ID.
+    """
+    api_key = request.headers.get('X-API-Key') or request.GET.get('api_key')
+    estudiante = await _estudiante_por_api_key(api_key)
+    if estudiante is None:
+        return HttpResponse(status=401)
+    desde = _parse_last_event_id(request.headers.get('Last-Event-ID') or request.GET.get('last_event_id'))
+
+    async def flujo():
+        suscripcion = get_broker().suscribir(estudiante.pk, desde)
+        try:
+            yield 'retry: 3000\n\n'
+            while True:
+                evento = await suscripcion.siguiente(timeout=INTERVALO_KEEPALIVE)
+                yield evento.como_sse() if evento else ': keepalive\n\n'
+        finally:
+            suscripcion.cerrar()
+
+    respuesta = StreamingHttpResponse(flujo(), content_type='text/event-stream')
+    respuesta['Cache-Control'] = 'no-cache'
+    respuesta['X-Accel-Buffering'] = 'no'
+    return respuesta
+
+
+async def websocket_eventos(scope, receive, send):
+    """Aplicación ASGI para /ws/eventos/ (ver interu_backend/asgi.py)."""
+    query = parse_qs(scope.get('query_string', b'').decode())
+    headers = dict(scope.get('headers', []))
+    api_key = headers.get(b'x-api-key', b'').decode() or query.get('api_key', [''])[0]
+
+    if (await receive())['type'] != 'websocket.connect':
+        return
+    estudiante = await _estudiante_por_api_key(api_key)
+    if estudiante is None:
+        await send({'type': 'websocket.close', 'code': 4401})
+        return
+    await send({'type': 'websocket.accept'})
+
+    desde = _parse_last_event_id(query.get('last_event_id', [''])[0])
+    suscripcion = get_broker().suscribir(estudiante.pk, desde)
+
+    async def enviar_eventos():
+        while True:
+            evento = await suscripcion.siguiente()
+            await send({'type': 'websocket.send', 'text': evento.como_json()})
+
+    async def esperar_cierre():
+        while (await receive())['type'] != 'websocket.disconnect':
+            pass
+
+    tareas = [asyncio.ensure_future(enviar_eventos()), asyncio.ensure_future(esperar_cierre())]
+    try:
+        await asyncio.wait(tareas, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for tarea in tareas:
+            tarea.cancel()
+        suscripcion.cerrar()
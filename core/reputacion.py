@@ -0,0 +1,92 @@
+"""
+Reputación materializada a partir de CalificacionChat.
+
+Una calificación en un chat cuenta para los participantes distintos del
+evaluador. registrar_calificacion ajusta la fila Reputacion de cada uno con un
+UPDATE atómico (F()), dentro de la transacción que crea la calificación;
+recalcular reconstruye los agregados desde cero por rangos de estudiantes;
+la migración 0013 usa el mismo reconstruir_rango para rellenar la tabla.
+"""
+from django.db import transaction
+from django.db.models import Count, F, FloatField, Q, Sum
+from django.db.models.functions import Cast
+
+from .models import CalificacionChat, Estudiante, Reputacion
+
+PUNTAJES = range(1, 6)
+
+
+def registrar_calificacion(calificados_ids, puntaje):
+    calificados_ids = list(calificados_ids)
+    if not calificados_ids:
+        return
+    Reputacion.objects.bulk_create(
+        [Reputacion(estudiante_id=estudiante_id) for estudiante_id in calificados_ids],
+        ignore_conflicts=True,
+    )
+    # Todas las expresiones se evalúan sobre los valores previos de la fila
+    Reputacion.objects.filter(estudiante_id__in=calificados_ids).update(
+        cantidad=F('cantidad') + 1,
+        suma=F('suma') + puntaje,
+        promedio=Cast(F('suma') + puntaje, FloatField()) / (F('cantidad') + 1),
+        **{f'estrellas_{puntaje}': F(f'estrellas_{puntaje}') + 1},
+    )
+
+
+def agregados_por_calificado(desde, hasta, calificaciones=CalificacionChat):
+    """Agregados por estudiante calificado con pk en (desde, hasta]."""
+    calificado = 'chat__participantes__estudiante_id'
+    return (
+        calificaciones.objects
+        .filter(
+            Q(**{f'{calificado}__gt': desde, f'{calificado}__lte': hasta})
+            & ~Q(evaluador_id=F(calificado))
+        )
+        .values(calificado)
+        .annotate(
+            cantidad=Count('pk'),
+            suma=Sum('puntaje'),
+            **{f'estrellas_{n}': Count('pk', filter=Q(puntaje=n)) for n in PUNTAJES},
+        )
+    )
+
+
+def reconstruir_rango(desde, hasta, calificaciones=CalificacionChat, reputaciones=Reputacion):
+    """
+    Reemplaza las filas Reputacion con estudiante en (desde, hasta] y devuelve
+    cuántas escribió. Los modelos se pueden pasar para usar los históricos
+    desde una migración.
+    """
+    # Los agregados se leen dentro de la transacción (IMMEDIATE: ya tiene el
+    # lock de escritura): una calificación confirmada entre la lectura y la
+    # escritura se perdería al reemplazar las filas
+    with transaction.atomic():
+        filas = [
+            reputaciones(
+                estudiante_id=fila['chat__participantes__estudiante_id'],
+                cantidad=fila['cantidad'],
+                suma=fila['suma'],
+                promedio=fila['suma'] / fila['cantidad'],
+                **{f'estrellas_{n}': fila[f'estrellas_{n}'] for n in PUNTAJES},
+            )
+            for fila in agregados_por_calificado(desde, hasta, calificaciones)
+        ]
+        reputaciones.objects.filter(estudiante_id__gt=desde, estudiante_id__lte=hasta).delete()
+        reputaciones.objects.bulk_create(filas)
+    return len(filas)
+
+
+def recalcular(tamano_lote=500, progreso=None):
+    """
+    Reconstruye Reputacion por lotes de pk de Estudiante, cada uno en su
+    propia transacción corta. Devuelve la cantidad de filas escritas.
+    """
+    total, desde = 0, 0
+    ultimo = Estudiante.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+    while desde < ultimo:
+        hasta = desde + tamano_lote
+        total += reconstruir_rango(desde, hasta)
+        desde = hasta
+        if progreso:
+            progreso(desde, total)
+    return total
@@ -0,0 +1,147 @@
+"""
+Motor de retención y purga.
+
+Cada política declara un modelo, el campo de fecha, la antigüedad (usando
+TemporizadorAutoEliminacion), un filtro opcional, fechas relacionadas que
+cuentan como actividad (`campos_actividad`) y la acción: 'eliminar' o
+'archivar' (UPDATE con `valores`). Las filas se procesan en lotes por rango
+de pk, cada lote en su propia transacción corta, para no retener el lock de
+escritura de SQLite. Las políticas por defecto se pueden reemplazar con
+RETENCION_POLITICAS en settings.
+"""
+import time
+from dataclasses import dataclass, field
+
+from django.apps import apps
+from django.conf import settings
+from django.db import transaction
+
+from .service import TemporizadorAutoEliminacion
+
+POLITICAS_POR_DEFECTO = {
+    'tokens_expirados': {
+        'modelo': 'core.TokenVerificacion',
+        'campo_fecha': 'fecha_expiracion',
+        'dias': 0,
+    },
+    'notificaciones_leidas': {
+        'modelo': 'core.Notificacion',
+        'campo_fecha': 'fecha',
+        'dias': 30,
+        'filtro': {'leida': True},
+    },
+    'tareas_completadas': {
+        'modelo': 'core.Tarea',
+        'campo_fecha': 'fecha_fin',
+        'dias': 7,
+        'filtro': {'estado': 'completada'},
+    },
+    'tareas_fallidas': {
+        'modelo': 'core.Tarea',
+        'campo_fecha': 'fecha_fin',
+        'dias': 30,
+        'filtro': {'estado': 'fallida'},
+    },
+    'publicaciones_inactivas': {
+        'modelo': 'core.Publicacion',
+        'campo_fecha': 'fecha_creacion',
+        'dias': 180,
+        'filtro': {'estado': True},
+        # Antigua no es inactiva: un chat o mensaje reciente la mantiene activa
+        'campos_actividad': ('chats__fecha_inicio', 'chats__mensajes__fecha'),
+        'accion': 'archivar',
+        'valores': {'estado': False},
+    },
+}
+
+
+@dataclass
+class PoliticaRetencion:
+    nombre: str
+    modelo: str
+    campo_fecha: str
+    dias: int
+    filtro: dict = field(default_factory=dict)
+    accion: str = 'eliminar'
+    valores: dict = field(default_factory=dict)
+    # Lookups de fechas relacionadas: la fila solo se procesa si ninguna es posterior al límite
+    campos_actividad: tuple = ()
+
+    def __post_init__(self):
+        if self.accion not in ('eliminar', 'archivar'):
+            raise ValueError(f"Acción de retención desconocida: {self.accion}")
+        if self.accion == 'archivar' and not self.valores:
+            raise ValueError(f"La política {self.nombre} archiva pero no define 'valores'")
+
+    def queryset(self):
+        modelo = apps.get_model(self.modelo)
+        limite = TemporizadorAutoEliminacion(dias=self.dias).fecha_limite()
+        queryset = modelo.objects.filter(**self.filtro, **{f'{self.campo_fecha}__lt': limite})
+        for campo in self.campos_actividad:
+            queryset = queryset.exclude(**{f'{campo}__gte': limite})
+        return queryset
+
+
+@dataclass
+class ResultadoRetencion:
+    politica: str
+    filas: int
+    lotes: int
+    segundos: float
+
+    @property
+    def filas_por_segundo(self):
+        return self.filas / self.segundos if self.segundos else 0.0
+
+
+def obtener_politicas(nombres=None):
+    definiciones = getattr(settings, 'RETENCION_POLITICAS', POLITICAS_POR_DEFECTO)
+    desconocidas = set(nombres or ()) - set(definiciones)
+    if desconocidas:
+        raise ValueError(f"Políticas desconocidas: {', '.join(sorted(desconocidas))}")
+    return [
+        PoliticaRetencion(nombre=nombre, **definicion)
+        for nombre, definicion in definiciones.items()
+        if not nombres or nombre in nombres
+    ]
+
+
+def aplicar_politica(politica, tamano_lote=1000, pausa=0.0, simular=False, progreso=None):
+    """
+    Aplica la política por lotes de rango de pk. Con simular=True solo cuenta
+    las filas afectadas. `pausa` son segundos de espera entre lotes.
+    """
+    candidatos = politica.queryset().order_by('pk')
+    filas = lotes = 0
+    ultimo_pk = None
+    inicio = time.monotonic()
+    while True:
+        pendientes = candidatos if ultimo_pk is None else candidatos.filter(pk__gt=ultimo_pk)
+        pks = list(pendientes.values_list('pk', flat=True)[:tamano_lote])
+        if not pks:
+            break
+        # Se vuelve a evaluar la condición dentro del rango por si cambió
+        rango = politica.queryset().filter(pk__gte=pks[0], pk__lte=pks[-1])
+        if simular:
+            afectadas = len(pks)
+        else:
+            with transaction.atomic():
+                if politica.accion == 'eliminar':
+                    afectadas = rango.delete()[1].get(rango.model._meta.label, 0)
+                else:
+                    afectadas = rango.update(**politica.valores)
+        ultimo_pk = pks[-1]
+        filas += afectadas
+        lotes += 1
+        if progreso:
+            progreso(politica, filas, time.monotonic() - inicio)
+        if len(pks) < tamano_lote:
+            break
+        if pausa:
+            time.sleep(pausa)
+    return ResultadoRetencion(politica.nombre, filas, lotes, time.monotonic() - inicio)
+
+
+def ejecutar_retencion(nombres=None, **opciones):
+    """Punto de entrada para el planificador (cron, cola de tareas)."""
+    return [aplicar_politica(politica, **opciones) for politica in obtener_politicas(nombres)]
@@ -0,0 +1,95 @@
+"""
+Búsqueda de publicaciones sobre un índice FTS5 de SQLite.
+
+La tabla virtual core_publicacion_fts usa core_publicacion como contenido
+externo y se mantiene sincronizada con triggers (ver migración 0010), así
+que los INSERT/UPDATE/DELETE, incluidos los masivos, actualizan el índice
+sin pasar por Python. En otros motores se usa un icontains como respaldo.
+"""
+import re
+import time
+
+from django.db import connection, transaction
+
+from .models import Publicacion
+
+TABLA_FTS = 'core_publicacion_fts'
+
+# Peso de titulo y descripcion en bm25(); el título pesa más
+PESOS_BM25 = (10.0, 1.0)
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def fts_disponible():
+    return connection.vendor == 'sqlite'
+
+
+def construir_consulta_fts(texto):
+    """
+    Convierte el texto del usuario en una consulta FTS5 segura: cada palabra
+    va entre comillas (sin operadores inyectables) y con * para que funcione
+    como prefijo. Las palabras se combinan con AND implícito.
+    """
+    tokens = _TOKEN_RE.findall(texto or '')
+    return ' '.join(f'"{token}"*' for token in tokens)
+
+
+def buscar_publicaciones(texto, estado=True, habilidad=None, limite=20, desplazamiento=0):
+    """Publicaciones que coinciden con texto, ordenadas por relevancia BM25."""
+    consulta = construir_consulta_fts(texto)
+    if not consulta:
+        return []
+    if not fts_disponible():
+        return list(_buscar_sin_fts(texto, estado, habilidad)[desplazamiento:desplazamiento + limite])
+
+    filtros, params = ['f.{tabla} MATCH %s'.format(tabla=TABLA_FTS)], [consulta]
+    if estado is not None:
+        filtros.append('p.estado = %s')
+        params.append(estado)
+    if habilidad is not None:
+        filtros.append('p.habilidad = %s')
+        params.append(habilidad)
+    params += [limite, desplazamiento]
+
+    sql = (
+        'SELECT p.*, bm25(f.{tabla}, {pesos}) AS relevancia '
+        'FROM {tabla} AS f JOIN core_publicacion AS p ON p.id_publicacion = f.rowid '
+        'WHERE {filtros} ORDER BY relevancia LIMIT %s OFFSET %s'
+    ).format(tabla=TABLA_FTS, pesos=', '.join(map(str, PESOS_BM25)), filtros=' AND '.join(filtros))
+    return list(Publicacion.objects.raw(sql, params))
+
+
+def _buscar_sin_fts(texto, estado, habilidad):
+    queryset = Publicacion.objects.all()
+    for token in _TOKEN_RE.findall(texto):
+        queryset = queryset.filter(titulo__icontains=token) | queryset.filter(descripcion__icontains=token)
+    if estado is not None:
+        queryset = queryset.filter(estado=estado)
+    if habilidad is not None:
+        queryset = queryset.filter(habilidad=habilidad)
+    return queryset.order_by('-fecha_creacion')
+
+
+def reconstruir_indice(progreso=None):
+    """
+    Reconstruye el índice con el comando 'rebuild' de FTS5, que lo vuelve a
+    leer completo desde core_publicacion, en una sola transacción. Por lotes
+    no es seguro: un INSERT/UPDATE/DELETE concurrente dispara los triggers
+    sobre filas que el lote todavía no reindexó (entradas duplicadas o
+    'delete' de filas ausentes) y corrompe el índice de contenido externo.
+    Devuelve la cantidad de filas indexadas.
+    """
+    if not fts_disponible():
+        return 0
+    inicio = time.monotonic()
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f"INSERT INTO {TABLA_FTS}({TABLA_FTS}) VALUES('rebuild')")
+        cursor.execute('SELECT COUNT(*) FROM core_publicacion')
+        total = cursor.fetchone()[0]
+    if progreso:
+        progreso(total, time.monotonic() - inicio)
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"INSERT INTO {TABLA_FTS}({TABLA_FTS}) VALUES('optimize')")
+    return total
@@ -1,15 +1,40 @@
 from rest_framework import serializers
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Prefetch
 from django.contrib.auth.hashers import make_password
 from django.utils import timezone
 from datetime import timedelta
 import uuid
 
+from .service import SoftDeleteService
 from .models import (
     CalificacionChat, Estudiante, Administrador, Publicacion, 
     Chat, ChatParticipante, Mensaje, Reporte,
-    TokenVerificacion, Perfil, Notificacion
+    TokenVerificacion, Perfil, Notificacion, Reputacion
 )
 
+def validar_email_institucional(value):
+    if not value.endswith("@inacap.cl"):
+        raise serializers.ValidationError("Debe usar un correo institucional válido.")
+    return value
+
+
+def validar_contraseña_segura(value):
+    if len(value) < 8 or not any(c.isupper() for c in value) or not any(c.isdigit() for c in value):
+        raise serializers.ValidationError("La contraseña debe tener al menos 8 caracteres, una mayúscula y un número.")
+    return value
+
+
+def tokens_verificacion(estudiantes):
+    """TokenVerificacion sin guardar, vigentes por 24 h, para cada estudiante (registro e importación)."""
+    vencimiento = timezone.now() + timedelta(hours=24)
+    return [
+        TokenVerificacion(token=uuid.uuid4().hex, estudiante=estudiante, fecha_expiracion=vencimiento)
+        for estudiante in estudiantes
+    ]
+
+
 class RegistroEstudianteSerializer(serializers.ModelSerializer):
     aceptar_politicas = serializers.BooleanField(write_only=True)
 
@@ -19,14 +44,10 @@ class RegistroEstudianteSerializer(serializers.ModelSerializer):
         extra_kwargs = {'contraseña': {'write_only': True}}
 
     def validate_email(self, value):
-        if not value.endswith("@inacap.cl"):
-            raise serializers.ValidationError("Debe usar un correo institucional válido.")
-        return value
+        return validar_email_institucional(value)
 
     def validate_contraseña(self, value):
-        if len(value) < 8 or not any(c.isupper() for c in value) or not any(c.isdigit() for c in value):
-            raise serializers.ValidationError("La contraseña debe tener al menos 8 caracteres, una mayúscula y un número.")
-        return make_password(value)
+        return make_password(validar_contraseña_segura(value))
 
     def validate_aceptar_politicas(self, value):
         if not value:
@@ -35,13 +56,10 @@ class RegistroEstudianteSerializer(serializers.ModelSerializer):
 
     def create(self, validated_data):
         validated_data.pop("aceptar_politicas")
-        estudiante = Estudiante.objects.create(**validated_data, verificado=False)
-        token = str(uuid.uuid4().hex)
-        TokenVerificacion.objects.create(
-            token=token,
-            estudiante=estudiante,
-            fecha_expiracion=timezone.now() + timedelta(hours=24)
-        )
+        with transaction.atomic():
+            estudiante = Estudiante.objects.create(**validated_data, verificado=False)
+            # Síncrono a propósito: sin run_worker la cuenta quedaría sin token
+            TokenVerificacion.objects.bulk_create(tokens_verificacion([estudiante]))
         return estudiante
 
 class ActivarCuentaSerializer(serializers.Serializer):
@@ -63,7 +81,7 @@ class MensajeSerializer(serializers.ModelSerializer):
     class Meta:
         model = Mensaje
         fields = '__all__'
-        read_only_fields = ['id_mensaje', 'fecha', 'leido']
+        read_only_fields = ['id_mensaje', 'fecha']
 
 
 class CalificacionChatSerializer(serializers.ModelSerializer):
@@ -79,13 +97,61 @@ class CalificacionChatSerializer(serializers.ModelSerializer):
 
 
 class ChatSerializer(serializers.ModelSerializer):
+    """
+    Chat con sus participantes y solo los últimos mensajes (ventana de
+    CHAT_MENSAJES_RECIENTES). El historial anterior se pide paginado a
+    chats/<pk>/mensajes/ con before/after.
+    """
     participantes = ChatParticipanteSerializer(many=True, read_only=True)
-    mensajes = MensajeSerializer(many=True, read_only=True)
+    mensajes = serializers.SerializerMethodField()
 
     class Meta:
         model = Chat
         fields = '__all__'
 
+    @staticmethod
+    def preparar_queryset(queryset):
+        # Cantidad fija de consultas al listar, sin importar cuántos chats haya
+        recientes = Mensaje.objects.order_by('-fecha', '-id_mensaje')[:getattr(settings, 'CHAT_MENSAJES_RECIENTES', 20)]
+        return queryset.prefetch_related(
+            'participantes',
+            Prefetch('mensajes', queryset=recientes, to_attr='mensajes_recientes'),
+        )
+
+    def get_mensajes(self, chat):
+        recientes = getattr(chat, 'mensajes_recientes', None)
+        if recientes is None:
+            recientes = chat.mensajes.order_by('-fecha', '-id_mensaje')[:getattr(settings, 'CHAT_MENSAJES_RECIENTES', 20)]
+        return MensajeSerializer(reversed(list(recientes)), many=True).data
+
+
+class ChatInboxSerializer(serializers.ModelSerializer):
+    """
+    Fila de la bandeja de chats. Todos los campos extra vienen de las
+    anotaciones de ChatInboxView, sin consultas adicionales por chat.
+    """
+    ultima_actividad = serializers.DateTimeField(read_only=True)
+    contraparte = serializers.CharField(source='contraparte_nombre', read_only=True)
+    no_leidos = serializers.IntegerField(read_only=True)
+    ultimo_mensaje = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Chat
+        fields = [
+            'id_chat', 'publicacion', 'fecha_inicio', 'estado_intercambio',
+            'ultima_actividad', 'contraparte', 'no_leidos', 'ultimo_mensaje',
+        ]
+
+    def get_ultimo_mensaje(self, chat):
+        if chat.ultimo_mensaje_id is None:
+            return None
+        return {
+            'id_mensaje': chat.ultimo_mensaje_id,
+            'texto': chat.ultimo_mensaje_texto,
+            'estudiante': chat.ultimo_mensaje_estudiante,
+            'fecha': serializers.DateTimeField().to_representation(chat.ultimo_mensaje_fecha),
+        }
+
 
 class NotificacionSerializer(serializers.ModelSerializer):
     class Meta:
@@ -93,7 +159,21 @@ class NotificacionSerializer(serializers.ModelSerializer):
         fields = '__all__'
         read_only_fields = ['id_notificacion', 'fecha']
         
+class ReputacionSerializer(serializers.ModelSerializer):
+    nombre = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Reputacion
+        fields = ['estudiante', 'nombre', 'cantidad', 'promedio', 'histograma']
+
+    def get_nombre(self, reputacion):
+        perfil = getattr(reputacion.estudiante, 'perfil', None)
+        return perfil.nombre if perfil else None
+
+
 class PerfilCompletoSerializer(serializers.ModelSerializer):
+    reputacion = serializers.SerializerMethodField()
+
     class Meta:
         model = Perfil
         fields = [
@@ -103,9 +183,17 @@ class PerfilCompletoSerializer(serializers.ModelSerializer):
             'biografia',
             'habilidades_ofrecidas',
             'habilidades_buscadas',
+            'reputacion',
         ]
         read_only_fields = ['id_perfil']
 
+    def get_reputacion(self, perfil):
+        # Lectura O(1) de la fila materializada; sin calificaciones aún -> vacía
+        reputacion = Reputacion.objects.filter(estudiante_id=perfil.estudiante_id).first()
+        if reputacion is None:
+            return {'cantidad': 0, 'promedio': None, 'histograma': {n: 0 for n in range(1, 6)}}
+        return {'cantidad': reputacion.cantidad, 'promedio': reputacion.promedio, 'histograma': reputacion.histograma}
+
 #-----------------------Reportes
 class ReporteSerializer(serializers.ModelSerializer):
     class Meta:
@@ -123,13 +211,36 @@ class ModerarReporteSerializer(serializers.ModelSerializer):
 
     def update(self, instance, validated_data):
         accion = validated_data.pop("accion")
+        instance.administrador = validated_data.get("administrador", instance.administrador)
         if accion == "aprobar":
             instance.estado = 1
         elif accion == "rechazar":
             instance.estado = 2
         elif accion == "eliminar":
-            instance.publicacion.estado = False
-            instance.publicacion.save()
+            SoftDeleteService.desactivar_lote(Publicacion.objects.filter(pk=instance.publicacion_id))
             instance.estado = 1
         instance.save()
         return instance
+
+
+class ColaModeracionSerializer(serializers.Serializer):
+    """Fila de la cola de moderación (dict agregado de moderacion.cola_pendiente)."""
+    publicacion = serializers.IntegerField()
+    titulo = serializers.CharField(source='publicacion__titulo')
+    activa = serializers.BooleanField(source='publicacion__estado')
+    autor = serializers.IntegerField(source='publicacion__estudiante')
+    reportantes = serializers.IntegerField()
+    reportes = serializers.IntegerField()
+    primer_reporte = serializers.DateTimeField()
+    ultimo_reporte = serializers.DateTimeField()
+
+
+class ModerarLoteSerializer(serializers.Serializer):
+    accion = serializers.ChoiceField(choices=["aprobar", "rechazar", "eliminar"])
+    reportes = serializers.ListField(child=serializers.IntegerField(min_value=1), max_length=1000, default=list)
+    publicaciones = serializers.ListField(child=serializers.IntegerField(min_value=1), max_length=1000, default=list)
+
+    def validate(self, data):
+        if not data["reportes"] and not data["publicaciones"]:
+            raise serializers.ValidationError("Indica al menos un reporte o una publicación.")
+        return data
@@ -1,7 +1,12 @@
 import datetime
+from django.db import transaction
+from django.dispatch import Signal
 from django.utils import timezone
 from django.core.exceptions import ValidationError
 
+# Se emite tras cada cambio de estado hecho por SoftDeleteService (pks=lista)
+estado_cambiado = Signal()
+
 class PoliticaContraseña:
     def __init__(self, min_longitud=8, requiere_mayuscula=True, requiere_numero=True):
         self.min_longitud = min_longitud
@@ -26,20 +31,53 @@ class TemporizadorAutoEliminacion:
     def __init__(self, dias=30):
         self.dias = dias
 
+    def fecha_limite(self):
+        """Todo lo anterior a esta fecha está listo para eliminarse."""
+        return timezone.now() - datetime.timedelta(days=self.dias)
+
     def esta_listo_para_eliminar(self, fecha_creacion):
-        return timezone.now() - fecha_creacion > datetime.timedelta(days=self.dias)
+        return fecha_creacion < self.fecha_limite()
 
 
 class SoftDeleteService:
     """
     Implementa borrado lógico (soft delete) para entidades como Publicación.
+    Cada operación actualiza solo la columna estado, sin cargar los objetos,
+    y avisa con estado_cambiado qué pks cambiaron (p. ej. para invalidar cachés).
     """
+    TAMAÑO_LOTE = 500
+
     @staticmethod
     def desactivar(objeto):
+        SoftDeleteService._actualizar(type(objeto), [objeto.pk], estado=False)
         objeto.estado = False
-        objeto.save()
 
     @staticmethod
     def reactivar(objeto):
+        SoftDeleteService._actualizar(type(objeto), [objeto.pk], estado=True)
         objeto.estado = True
-        objeto.save()
+
+    @staticmethod
+    def desactivar_lote(queryset):
+        return SoftDeleteService._actualizar_queryset(queryset, estado=False)
+
+    @staticmethod
+    def reactivar_lote(queryset):
+        return SoftDeleteService._actualizar_queryset(queryset, estado=True)
+
+    @staticmethod
+    def _actualizar_queryset(queryset, **valores):
+        # Dentro de la transacción nadie más puede escribir entre el SELECT y el UPDATE
+        with transaction.atomic(using=queryset.db):
+            pks = list(queryset.values_list('pk', flat=True))
+            return SoftDeleteService._actualizar(queryset.model, pks, **valores)
+
+    @staticmethod
+    def _actualizar(modelo, pks, **valores):
+        filas = 0
+        for inicio in range(0, len(pks), SoftDeleteService.TAMAÑO_LOTE):
+            lote = pks[inicio:inicio + SoftDeleteService.TAMAÑO_LOTE]
+            filas += modelo._base_manager.filter(pk__in=lote).update(**valores)
+        if pks:
+            estado_cambiado.send(sender=modelo, pks=pks)
+        return filas
@@ -0,0 +1,189 @@
+"""
+Cola de tareas en segundo plano guardada en la tabla Tarea, sin broker externo.
+
+Una función decorada con @tarea se encola con `funcion.encolar(**argumentos)`
+(argumentos serializables a JSON: ids, no instancias). La fila se inserta en
+la transacción en curso, así que los workers solo la ven cuando esta
+confirma y desaparece si se revierte; fuera de una transacción queda visible
+de inmediato.
+
+`manage.py run_worker` levanta N workers que reservan tareas por prioridad
+(mayor primero) y antigüedad:
+- Reservar suma un intento y oculta la tarea durante su `visibilidad`: si el
+  worker muere sin terminarla, vuelve a estar disponible al vencer.
+- Si falla se reintenta con backoff exponencial con jitter
+  (TAREAS_BACKOFF_BASE, duplicado por intento hasta TAREAS_BACKOFF_MAXIMO)
+  hasta `max_intentos`; después queda FALLIDA con el último error.
+- Solo el worker con la reserva vigente puede cerrarla.
+Por lo mismo una tarea puede ejecutarse más de una vez: deben ser
+idempotentes. Las terminadas se purgan con las políticas de core/retencion.py.
+
+Sin un `run_worker` corriendo las tareas quedan pendientes indefinidamente:
+solo se encola lo que puede esperar (hoy, las notificaciones con
+NOTIFICACIONES_EN_COLA). Lo que una petición necesita para quedar completa,
+como el token de verificación del registro, se sigue haciendo en línea.
+"""
+import os
+import random
+import socket
+import threading
+import traceback
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, connections, transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Tarea
+
+LARGO_ERROR = 5000
+
+
+def tarea(funcion=None, *, prioridad=0, max_intentos=None, visibilidad=None):
+    """
+    Registra `funcion` como tarea y le agrega `encolar(**argumentos)`.
+    max_intentos y visibilidad (segundos) toman TAREAS_MAX_INTENTOS y
+    TAREAS_VISIBILIDAD si no se indican.
+    """
+    def registrar(funcion):
+        funcion.nombre_tarea = f'{funcion.__module__}.{funcion.__qualname__}'
+        funcion.opciones_tarea = {'prioridad': prioridad, 'max_intentos': max_intentos, 'visibilidad': visibilidad}
+        funcion.encolar = lambda **argumentos: encolar(funcion, argumentos)
+        return funcion
+    return registrar(funcion) if funcion else registrar
+
+
+def encolar(funcion, argumentos=None, prioridad=None, retraso=0):
+    """Inserta una ejecución de la tarea `funcion`; `retraso` en segundos."""
+    opciones = funcion.opciones_tarea
+    return Tarea.objects.create(
+        nombre=funcion.nombre_tarea,
+        argumentos=argumentos or {},
+        prioridad=opciones['prioridad'] if prioridad is None else prioridad,
+        max_intentos=opciones['max_intentos'] or getattr(settings, 'TAREAS_MAX_INTENTOS', 5),
+        visibilidad=opciones['visibilidad'] or getattr(settings, 'TAREAS_VISIBILIDAD', 300),
+        disponible_desde=timezone.now() + timedelta(seconds=retraso),
+    )
+
+
+def backoff(intentos):
+    """Segundos antes del próximo intento, tras `intentos` intentos fallidos."""
+    espera = min(
+        getattr(settings, 'TAREAS_BACKOFF_MAXIMO', 3600),
+        getattr(settings, 'TAREAS_BACKOFF_BASE', 10) * 2 ** (intentos - 1),
+    )
+    # La mitad fija y la otra al azar: lo que falló junto no se reintenta junto
+    return espera / 2 + random.uniform(0, espera / 2)
+
+
+def reservar(worker):
+    """Reserva la próxima tarea disponible para `worker`, o None si no hay."""
+    while True:
+        ahora = timezone.now()
+        # Con SQLite la transacción IMMEDIATE ya tiene el lock de escritura, así
+        # que dos workers no eligen la misma fila; en otros motores lo asegura
+        # select_for_update
+        with transaction.atomic():
+            tarea = (
+                Tarea.objects.select_for_update(skip_locked=True)
+                # Pendientes y en curso (sin fecha_fin), por tarea_disponible_idx
+                .filter(fecha_fin__isnull=True, disponible_desde__lte=ahora)
+                .order_by('-prioridad', 'disponible_desde', 'pk')
+                .first()
+            )
+            if tarea is None:
+                return None
+            if tarea.intentos >= tarea.max_intentos:
+                # Reserva vencida en el último intento: el worker murió o se colgó
+                tarea.estado = Tarea.FALLIDA
+                tarea.error = tarea.error or "Venció la reserva sin que la tarea terminara"
+                tarea.reserva = ''
+                tarea.fecha_fin = ahora
+                tarea.save(update_fields=['estado', 'error', 'reserva', 'fecha_fin'])
+                continue
+            tarea.estado = Tarea.EN_CURSO
+            tarea.intentos += 1
+            tarea.reserva = f'{worker}/{uuid.uuid4().hex[:12]}'
+            tarea.disponible_desde = ahora + timedelta(seconds=tarea.visibilidad)
+            tarea.save(update_fields=['estado', 'intentos', 'reserva', 'disponible_desde'])
+            return tarea
+
+
+def _cerrar(tarea, estado, error='', disponible_desde=None):
+    valores = {'estado': estado, 'reserva': '', 'error': error[-LARGO_ERROR:]}
+    if disponible_desde:
+        valores['disponible_desde'] = disponible_desde
+    if estado in (Tarea.COMPLETADA, Tarea.FALLIDA):
+        valores['fecha_fin'] = timezone.now()
+    # Si la reserva venció y otro worker la tomó, este resultado ya no cuenta
+    return Tarea.objects.filter(pk=tarea.pk, reserva=tarea.reserva).update(**valores) == 1
+
+
+def ejecutar(tarea):
+    """Ejecuta una tarea reservada y guarda el resultado. Devuelve True si terminó bien."""
+    try:
+        funcion = import_string(tarea.nombre)
+        if not hasattr(funcion, 'nombre_tarea'):
+            raise ImportError(f"{tarea.nombre} no está registrada con @tarea")
+    except ImportError as exc:
+        # Reintentar no lo va a arreglar
+        _cerrar(tarea, Tarea.FALLIDA, error=str(exc))
+        return False
+    try:
+        funcion(**tarea.argumentos)
+    except Exception:
+        error = traceback.format_exc()
+        if tarea.intentos >= tarea.max_intentos:
+            _cerrar(tarea, Tarea.FALLIDA, error=error)
+        else:
+            reintento = timezone.now() + timedelta(seconds=backoff(tarea.intentos))
+            _cerrar(tarea, Tarea.PENDIENTE, error=error, disponible_desde=reintento)
+        return False
+    _cerrar(tarea, Tarea.COMPLETADA)
+    return True
+
+
+def identidad_worker(numero):
+    return f'{socket.gethostname()}:{os.getpid()}:{numero}'
+
+
+def trabajar(numero, detener, intervalo=1.0, salir_si_vacia=False, al_terminar=None):
+    """
+    Bucle de un worker: reserva y ejecuta tareas hasta que se active el
+    evento `detener`; sin tareas espera `intervalo` segundos (o sale, con
+    salir_si_vacia). `al_terminar(tarea, ok)` se llama tras cada tarea.
+    """
+    worker = identidad_worker(numero)
+    try:
+        while not detener.is_set():
+            try:
+                tarea = reservar(worker)
+                if tarea is None:
+                    if salir_si_vacia:
+                        return
+                    detener.wait(intervalo)
+                    continue
+                ok = ejecutar(tarea)
+            except DatabaseError:
+                # p. ej. 'database is locked' tras busy_timeout. Si la tarea
+                # quedó sin cerrar, se vuelve a ejecutar al vencer la reserva
+                connections.close_all()
+                detener.wait(intervalo)
+                continue
+            if al_terminar:
+                al_terminar(tarea, ok)
+    finally:
+        connections.close_all()
+
+
+def iniciar_workers(cantidad, detener, **opciones):
+    """Lanza `cantidad` hilos con trabajar(); cada uno usa su propia conexión."""
+    hilos = [
+        threading.Thread(target=trabajar, args=(numero, detener), kwargs=opciones, name=f'worker-{numero}')
+        for numero in range(cantidad)
+    ]
+    for hilo in hilos:
+        hilo.start()
+    return hilos
@@ -1,3 +1,1239 @@
-from django.test import TestCase
+import asyncio
+import json
+import os
+import re
+import tempfile
+from datetime import timedelta
+from importlib import import_module
+from unittest import mock
 
-# Create your tests here.
+from django.apps import apps as django_apps
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, get_hasher, identify_hasher, make_password
+from django.core.cache import cache, caches
+from django.db import OperationalError, connection, connections, transaction
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, resolve
+from django.utils import timezone
+from django.utils.http import http_date
+from rest_framework.test import APIClient, APIRequestFactory
+
+from . import idempotencia, limites_tasa, realtime, urls
+from .authentication import CacheApiKeys
+from .bench import ejecutar_benchmark, generar_dataset
+from .contadores import CAMPOS as CAMPOS_CONTADORES, leer as contadores_leer, recalcular as contadores_recalcular
+from .db import ALIAS_LECTURA, LecturaEscrituraRouter, solo_lectura
+from .hashing import PoolHashing
+from .importacion import importar
+from .instrumentacion import presupuesto_de
+from .matching import normalizar_habilidades, recomendar
+from .models import (
+    Administrador, Chat, ChatParticipante, Contadores, Estudiante, HabilidadPerfil, Mensaje, Notificacion, Perfil,
+    Publicacion, Reporte, Reputacion, Tarea, TokenVerificacion,
+)
+from .reputacion import PUNTAJES, recalcular
+from .retencion import aplicar_politica, obtener_politicas
+from .search import TABLA_FTS, buscar_publicaciones, reconstruir_indice
+from .service import SoftDeleteService, estado_cambiado
+from .tareas import backoff, ejecutar, encolar, reservar, tarea
+
+# "SCAN core_x" sin "USING ... INDEX" es un recorrido completo de la tabla
+TABLE_SCAN_RE = re.compile(r'^SCAN (core_\w+)(?: AS \w+)?$')
+
+
+class DatosDePruebaTestCase(TestCase):
+    """Varios chats, mensajes y notificaciones: con una sola fila no se ven los N+1."""
+    @classmethod
+    def setUpTestData(cls):
+        cls.autor = Estudiante.objects.create(email='autor@inacap.cl', contraseña='x')
+        cls.lector = Estudiante.objects.create(email='lector@inacap.cl', contraseña='x')
+        cls.otros = [Estudiante.objects.create(email=f'otro{i}@inacap.cl', contraseña='x') for i in range(2)]
+        for estudiante in (cls.autor, cls.lector, *cls.otros):
+            Perfil.objects.create(
+                estudiante=estudiante, nombre=estudiante.email,
+                habilidades_ofrecidas='Python, SQL', habilidades_buscadas='Inglés',
+            )
+        cls.publicacion = Publicacion.objects.create(
+            titulo='Clases de Python', descripcion='Aprende Python', habilidad=1, estudiante=cls.autor
+        )
+        cls.chats = []
+        for receptor in (cls.lector, *cls.otros):
+            chat = Chat.objects.create(publicacion=cls.publicacion)
+            ChatParticipante.objects.create(chat=chat, estudiante=cls.autor, rol='autor')
+            ChatParticipante.objects.create(chat=chat, estudiante=receptor)
+            for i in range(3):
+                Mensaje.objects.create(chat=chat, estudiante=receptor, texto=f'hola {i}')
+                Notificacion.objects.create(estudiante=cls.autor, mensaje=f'n {i}', chat=chat)
+            cls.chats.append(chat)
+        cls.chat = cls.chats[0]
+        cls.administrador = Administrador.objects.create(nombre='Admin', email='admin@inacap.cl', contraseña='x')
+        Reporte.objects.create(publicacion=cls.publicacion, estudiante=cls.lector, motivo='spam')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.credentials(HTTP_X_API_KEY=self.autor.api_key)
+        # Las cubetas viven en memoria del proceso: cada test empieza con todas llenas
+        limites_tasa.get_almacen().limpiar()
+
+
+class IndicesConsultasTests(DatosDePruebaTestCase):
+    """
+    Ejecuta cada endpoint de listado y verifica con EXPLAIN QUERY PLAN que
+    ninguna de sus consultas recorre una tabla completa.
+    """
+    def assertSinTableScan(self, url):
+        self.client.get(url)  # calienta la caché de API Keys
+        cache.clear()  # sin respuestas cacheadas, para ver las consultas reales
+        with CaptureQueriesContext(connection) as contexto:
+            respuesta = self.client.get(url)
+        self.assertEqual(respuesta.status_code, 200, url)
+
+        with connection.cursor() as cursor:
+            for query in contexto.captured_queries:
+                if not query['sql'].startswith('SELECT'):
+                    continue
+                cursor.execute('EXPLAIN QUERY PLAN ' + query['sql'])
+                for fila in cursor.fetchall():
+                    detalle = fila[-1]
+                    self.assertIsNone(
+                        TABLE_SCAN_RE.match(detalle),
+                        f"{url}: {detalle}\n{query['sql']}",
+                    )
+
+    def test_publicaciones(self):
+        self.assertSinTableScan('/api/publicaciones/')
+
+    def test_mis_publicaciones(self):
+        self.assertSinTableScan('/api/publicaciones/mias/')
+
+    def test_mensajes(self):
+        self.assertSinTableScan('/api/mensajes/')
+
+    def test_notificaciones(self):
+        self.assertSinTableScan('/api/notificaciones/')
+
+    def test_inbox(self):
+        self.assertSinTableScan('/api/chats/inbox/')
+
+    def test_no_leidos(self):
+        self.assertSinTableScan('/api/chats/no-leidos/')
+
+    def test_historial_chat(self):
+        self.assertSinTableScan(f'/api/chats/{self.chat.pk}/mensajes/')
+
+    def test_cola_moderacion(self):
+        self.client.credentials(HTTP_X_API_KEY=self.administrador.api_key)
+        self.assertSinTableScan('/api/reportes/cola/')
+
+
+class PresupuestoConsultasTests(DatosDePruebaTestCase):
+    """
+    Cada vista con presupuesto_consultas debe respetarlo. Si un cambio suma
+    consultas a un endpoint caliente, este test falla.
+    """
+    def peticiones(self):
+        chat = self.chat.pk
+        return [
+            ('get', '/api/publicaciones/', None),
+            ('get', f'/api/publicaciones/{self.publicacion.pk}/', None),
+            ('get', '/api/publicaciones/mias/', None),
+            ('get', '/api/publicaciones/buscar/?q=python', None),
+            ('get', '/api/chats/', None),
+            ('post', '/api/chats/', {'publicacion': self.publicacion.pk}),
+            ('get', '/api/chats/inbox/', None),
+            ('get', '/api/chats/no-leidos/', None),
+            ('post', f'/api/chats/{chat}/leer/', {}),
+            ('get', f'/api/chats/{chat}/', None),
+            ('get', f'/api/chats/{chat}/mensajes/', None),
+            ('patch', f'/api/chats/{chat}/completar/', {}),
+            ('get', '/api/mensajes/', None),
+            ('post', '/api/mensajes/', {'chat': chat, 'texto': 'hola'}),
+            ('post', '/api/calificaciones-chat/', {'chat': chat, 'puntaje': 5}),
+            ('get', '/api/notificaciones/', None),
+            ('get', '/api/contadores/', None),
+            ('get', '/api/perfil/', None),
+            ('get', '/api/recomendaciones/', None),
+            ('get', '/api/reputacion/ranking/', None),
+            ('get', '/api/reportes/listar/', None),
+            ('get', '/api/reportes/cola/', None),
+            ('post', '/api/reportes/moderar/', {'accion': 'eliminar', 'publicaciones': [self.publicacion.pk]}),
+        ]
+
+    def api_key_para(self, metodo, ruta):
+        if ruta.startswith('/api/reportes/'):
+            return self.administrador.api_key
+        # El autor no puede abrir un chat sobre su propia publicación
+        return self.otros[0].api_key if (metodo, ruta) == ('post', '/api/chats/') else self.autor.api_key
+
+    def test_vistas_respetan_su_presupuesto(self):
+        for metodo, ruta, datos in self.peticiones():
+            presupuesto = presupuesto_de(resolve(ruta.split('?')[0]).func, metodo.upper())
+            with self.subTest(metodo=metodo, ruta=ruta):
+                self.assertIsNotNone(presupuesto, f'{ruta} no declara presupuesto_consultas')
+                self.client.credentials(HTTP_X_API_KEY=self.api_key_para(metodo, ruta))
+                self.client.get(ruta)  # calienta la caché de API Keys
+                cache.clear()
+                respuesta = getattr(self.client, metodo)(ruta, datos, format='json')
+                self.assertLess(respuesta.status_code, 400, respuesta.content)
+                registro = respuesta.registro_sql
+                self.assertLessEqual(
+                    registro.consultas, presupuesto,
+                    f'{metodo.upper()} {ruta}: {registro.consultas} consultas (presupuesto {presupuesto})\n'
+                    + '\n'.join(sql for _, sql in registro.sentencias),
+                )
+
+    def test_vistas_con_presupuesto_estan_cubiertas(self):
+        cubiertas = {resolve(ruta.split('?')[0]).func.view_class for _, ruta, _ in self.peticiones()}
+        for patron in urls.urlpatterns:
+            vista = getattr(patron.callback, 'view_class', None)
+            if isinstance(patron, URLPattern) and presupuesto_de(patron.callback) is not None:
+                self.assertIn(vista, cubiertas, f'{patron.name} declara presupuesto pero no se prueba')
+
+
+class CacheApiKeysTests(DatosDePruebaTestCase):
+    """Rotar o borrar una cuenta invalida su API Key en caché sin esperar el TTL."""
+    def test_key_rotada_deja_de_autenticar(self):
+        api_key = self.autor.api_key
+        self.assertEqual(self.client.get('/api/perfil/').status_code, 200)  # queda en caché
+        self.autor.api_key = None
+        self.autor.save()  # save() genera una key nueva
+        self.assertEqual(self.client.get('/api/perfil/').status_code, 401)
+        self.client.credentials(HTTP_X_API_KEY=self.autor.api_key)
+        self.assertNotEqual(self.autor.api_key, api_key)
+        self.assertEqual(self.client.get('/api/perfil/').status_code, 200)
+
+    def test_cuenta_borrada_deja_de_autenticar(self):
+        self.client.credentials(HTTP_X_API_KEY=self.administrador.api_key)
+        self.assertEqual(self.client.get('/api/reportes/listar/').status_code, 200)
+        self.administrador.delete()
+        self.assertEqual(self.client.get('/api/reportes/listar/').status_code, 401)
+
+    def test_cada_lectura_es_una_instancia_nueva(self):
+        cache_keys = CacheApiKeys()
+        cache_keys.guardar(self.autor.api_key, self.autor)
+        primera, segunda = cache_keys.obtener(self.autor.api_key), cache_keys.obtener(self.autor.api_key)
+        self.assertIsNot(primera, self.autor)
+        self.assertIsNot(primera, segunda)
+        self.assertEqual((primera.pk, primera.email), (self.autor.pk, self.autor.email))
+        self.assertFalse(primera._state.adding)
+
+    def test_la_entrada_vence_con_el_ttl(self):
+        # Otros procesos no reciben la invalidación: el TTL acota la revocación
+        cache_keys = CacheApiKeys(ttl=-1)
+        cache_keys.guardar(self.autor.api_key, self.autor)
+        self.assertIsNone(cache_keys.obtener(self.autor.api_key))
+
+
+class MensajesVisiblesTests(DatosDePruebaTestCase):
+    """GET /mensajes/ solo lista mensajes de los chats del estudiante."""
+    def ids_de_chat(self, respuesta):
+        self.assertEqual(respuesta.status_code, 200)
+        return {mensaje['chat'] for mensaje in respuesta.data['results']}
+
+    def test_solo_chats_propios(self):
+        self.client.credentials(HTTP_X_API_KEY=self.lector.api_key)
+        self.assertEqual(self.ids_de_chat(self.client.get('/api/mensajes/')), {self.chat.pk})
+        self.client.credentials(HTTP_X_API_KEY=self.autor.api_key)
+        self.assertEqual(self.ids_de_chat(self.client.get('/api/mensajes/')), {chat.pk for chat in self.chats})
+
+    def test_filtro_por_chat_ajeno_no_devuelve_nada(self):
+        self.client.credentials(HTTP_X_API_KEY=self.lector.api_key)
+        self.assertEqual(self.ids_de_chat(self.client.get(f'/api/mensajes/?chat={self.chats[1].pk}')), set())
+        self.assertEqual(self.client.get('/api/mensajes/?chat=x').status_code, 400)
+
+
+class PaginacionKeysetTests(DatosDePruebaTestCase):
+    """Cursores de /publicaciones/: sin saltos ni repetidos, aunque la fecha empate."""
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        for i in range(6):
+            Publicacion.objects.create(titulo=f'Extra {i}', descripcion='x', habilidad=1, estudiante=cls.autor)
+        # Cuatro con la misma fecha: el orden lo decide el pk
+        fecha = timezone.now()
+        Publicacion.objects.filter(titulo__in=['Extra 1', 'Extra 2', 'Extra 3', 'Extra 4']).update(fecha_creacion=fecha)
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    def recorrer(self, url, enlace):
+        paginas = []
+        while url:
+            respuesta = self.client.get(url)
+            self.assertEqual(respuesta.status_code, 200)
+            paginas.append([fila['id_publicacion'] for fila in respuesta.data['results']])
+            url = respuesta.data[enlace]
+        return paginas
+
+    def test_ida_y_vuelta(self):
+        esperadas = list(
+            Publicacion.activas.order_by('-fecha_creacion', '-pk').values_list('pk', flat=True)
+        )
+        paginas = self.recorrer('/api/publicaciones/?page_size=2', 'next')
+        self.assertEqual([pk for pagina in paginas for pk in pagina], esperadas)
+        self.assertEqual(len(paginas), 4)
+
+        # Desde la última página, previous devuelve las mismas páginas al revés
+        ultima = self.client.get('/api/publicaciones/?page_size=2')
+        for _ in range(3):
+            ultima = self.client.get(ultima.data['next'])
+        self.assertIsNone(ultima.data['next'])
+        atras = self.recorrer(ultima.data['previous'], 'previous')
+        self.assertEqual(atras, paginas[-2::-1])
+
+    def test_cursor_malformado_es_400(self):
+        for cursor in ('no-es-base64!', 'eyJ2IjogMX0=', 'eyJ2IjogIm1hbGEiLCAicCI6IDF9'):
+            respuesta = self.client.get(f'/api/publicaciones/?cursor={cursor}')
+            self.assertEqual(respuesta.status_code, 400, cursor)
+
+
+class HistorialChatTests(DatosDePruebaTestCase):
+    """Ventana de mensajes recientes en ChatSerializer e historial con before/after."""
+    def setUp(self):
+        super().setUp()
+        self.mensajes = list(Mensaje.objects.filter(chat=self.chat).order_by('pk').values_list('pk', flat=True))
+
+    @override_settings(CHAT_MENSAJES_RECIENTES=2)
+    def test_detalle_trae_solo_la_ventana_reciente(self):
+        respuesta = self.client.get(f'/api/chats/{self.chat.pk}/')
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual([m['id_mensaje'] for m in respuesta.data['mensajes']], self.mensajes[-2:])
+
+    def test_before_recorre_hacia_atras(self):
+        url = f'/api/chats/{self.chat.pk}/mensajes/'
+        recientes = self.client.get(url, {'limit': 2}).data
+        self.assertEqual([m['id_mensaje'] for m in recientes['results']], self.mensajes[-2:])
+        self.assertEqual(recientes['before'], self.mensajes[-2])
+
+        anteriores = self.client.get(url, {'limit': 2, 'before': recientes['before']}).data
+        self.assertEqual([m['id_mensaje'] for m in anteriores['results']], self.mensajes[:1])
+        self.assertIsNone(anteriores['before'])
+
+    def test_after_trae_los_posteriores(self):
+        url = f'/api/chats/{self.chat.pk}/mensajes/'
+        pagina = self.client.get(url, {'limit': 1, 'after': self.mensajes[0]}).data
+        self.assertEqual([m['id_mensaje'] for m in pagina['results']], self.mensajes[1:2])
+        self.assertTrue(pagina['hay_mas'])
+        pagina = self.client.get(url, {'limit': 5, 'after': pagina['after']}).data
+        self.assertEqual([m['id_mensaje'] for m in pagina['results']], self.mensajes[2:])
+        self.assertFalse(pagina['hay_mas'])
+        self.assertEqual(self.client.get(url, {'after': 'x'}).status_code, 400)
+
+    def test_listar_chats_no_depende_de_cuantos_haya(self):
+        def consultas():
+            with CaptureQueriesContext(connection) as contexto:
+                self.assertEqual(self.client.get('/api/chats/').status_code, 200)
+            return len(contexto)
+
+        self.client.get('/api/chats/')  # calienta la caché de API Keys
+        antes = consultas()
+        for receptor in self.otros:
+            for _ in range(5):
+                chat = Chat.objects.create(publicacion=self.publicacion)
+                ChatParticipante.objects.create(chat=chat, estudiante=self.autor, rol='autor')
+                ChatParticipante.objects.create(chat=chat, estudiante=receptor)
+                Mensaje.objects.create(chat=chat, estudiante=receptor, texto='hola')
+        self.assertEqual(consultas(), antes)
+
+
+class BandejaChatsTests(DatosDePruebaTestCase):
+    """Campos y orden de /chats/inbox/."""
+    def bandeja(self):
+        respuesta = self.client.get('/api/chats/inbox/')
+        self.assertEqual(respuesta.status_code, 200)
+        return respuesta.data['results']
+
+    def test_campos_por_chat(self):
+        ChatParticipante.objects.filter(chat=self.chat, estudiante=self.autor).update(
+            ultimo_leido=Mensaje.objects.filter(chat=self.chat).order_by('pk').values_list('pk', flat=True)[0]
+        )
+        filas = {fila['id_chat']: fila for fila in self.bandeja()}
+        self.assertEqual(set(filas), {chat.pk for chat in self.chats})
+
+        fila = filas[self.chat.pk]
+        ultimo = Mensaje.objects.filter(chat=self.chat).latest('pk')
+        self.assertEqual(fila['ultimo_mensaje']['id_mensaje'], ultimo.pk)
+        self.assertEqual(fila['ultimo_mensaje']['texto'], 'hola 2')
+        self.assertEqual(fila['ultimo_mensaje']['estudiante'], self.lector.pk)
+        self.assertEqual(fila['contraparte'], self.lector.email)
+        self.assertEqual(fila['no_leidos'], 2)
+        self.assertEqual(filas[self.chats[1].pk]['contraparte'], self.otros[0].email)
+        self.assertEqual(filas[self.chats[1].pk]['no_leidos'], 3)
+
+    def test_mensajes_propios_no_cuentan_como_no_leidos(self):
+        self.client.post('/api/mensajes/', {'chat': self.chat.pk, 'texto': 'respuesta'}, format='json')
+        fila = next(fila for fila in self.bandeja() if fila['id_chat'] == self.chat.pk)
+        self.assertEqual(fila['ultimo_mensaje']['texto'], 'respuesta')
+        self.assertEqual(fila['no_leidos'], 3)
+
+    def test_orden_por_ultima_actividad(self):
+        ahora = timezone.now()
+        for minutos, chat in ((30, self.chats[0]), (10, self.chats[1]), (20, self.chats[2])):
+            Mensaje.objects.filter(chat=chat).update(fecha=ahora - timedelta(minutes=minutos))
+        # Un chat sin mensajes se ordena por su fecha_inicio
+        vacio = Chat.objects.create(publicacion=self.publicacion)
+        ChatParticipante.objects.create(chat=vacio, estudiante=self.autor, rol='autor')
+        Chat.objects.filter(pk=vacio.pk).update(fecha_inicio=ahora - timedelta(minutes=15))
+
+        filas = self.bandeja()
+        self.assertEqual(
+            [fila['id_chat'] for fila in filas], [self.chats[1].pk, vacio.pk, self.chats[2].pk, self.chats[0].pk],
+        )
+        self.assertIsNone(filas[1]['ultimo_mensaje'])
+
+
+class IndiceBusquedaTests(DatosDePruebaTestCase):
+    """El índice FTS5 sigue íntegro si hay escrituras durante y después de reconstruirlo."""
+    def assertIndiceIntegro(self):
+        with connection.cursor() as cursor:
+            # rank=1 compara además contra core_publicacion (contenido externo)
+            cursor.execute(f"INSERT INTO {TABLA_FTS}({TABLA_FTS}, rank) VALUES('integrity-check', 1)")
+
+    def test_escrituras_alrededor_de_la_reconstruccion(self):
+        def escribir(total, segundos):
+            Publicacion.objects.create(titulo='Clases de Rust', descripcion='-', habilidad=1, estudiante=self.lector)
+            Publicacion.objects.filter(pk=self.publicacion.pk).update(titulo='Clases de Python avanzado')
+
+        self.assertEqual(reconstruir_indice(progreso=escribir), 1)
+        self.assertIndiceIntegro()
+        self.assertEqual([p.titulo for p in buscar_publicaciones('rust')], ['Clases de Rust'])
+        self.assertEqual([p.pk for p in buscar_publicaciones('avanzado')], [self.publicacion.pk])
+        self.assertEqual(reconstruir_indice(), 2)
+        self.assertIndiceIntegro()
+
+    def test_solo_administradores_ven_inactivas(self):
+        Publicacion.objects.create(
+            titulo='Clases de Python básico', descripcion='-', habilidad=1, estudiante=self.lector, estado=False,
+        )
+        for credenciales in ({}, {'HTTP_X_API_KEY': self.autor.api_key}):
+            cliente = APIClient()
+            cliente.credentials(**credenciales)
+            for estado in ('', 'false', 'todas', '0'):
+                respuesta = cliente.get('/api/publicaciones/buscar/', {'q': 'python', 'estado': estado})
+                self.assertEqual([p['id_publicacion'] for p in respuesta.data['results']], [self.publicacion.pk])
+
+        self.client.credentials(HTTP_X_API_KEY=self.administrador.api_key)
+        respuesta = self.client.get('/api/publicaciones/buscar/', {'q': 'python', 'estado': 'todas'})
+        self.assertEqual(len(respuesta.data['results']), 2)
+        respuesta = self.client.get('/api/publicaciones/buscar/', {'q': 'python', 'estado': 'false'})
+        self.assertEqual([p['titulo'] for p in respuesta.data['results']], ['Clases de Python básico'])
+
+
+class NormalizarHabilidadesTests(TestCase):
+    def test_habilidades_cortas_y_con_simbolos(self):
+        self.assertEqual(
+            normalizar_habilidades('C#, Go, JS, R, UI/UX, IA y C++ de nivel básico'),
+            {'c#', 'go', 'js', 'r', 'ui', 'ux', 'ia', 'c++', 'basico'},
+        )
+
+    def test_descarta_palabras_vacias_y_letras_sueltas(self):
+        self.assertEqual(normalizar_habilidades('Clases de la a a la z'), {'clases'})
+
+
+class IndexarPerfilesMigracionTests(DatosDePruebaTestCase):
+    """0011 rellena HabilidadPerfil para los perfiles que ya existían."""
+    def test_rellena_el_indice(self):
+        esperadas = set(HabilidadPerfil.objects.values_list('estudiante', 'tipo', 'termino'))
+        self.assertTrue(esperadas)
+        HabilidadPerfil.objects.all().delete()
+        import_module('core.migrations.0011_habilidadperfil').indexar_perfiles(django_apps, None)
+        self.assertEqual(set(HabilidadPerfil.objects.values_list('estudiante', 'tipo', 'termino')), esperadas)
+
+
+class RecomendacionesCortasTests(DatosDePruebaTestCase):
+    def test_coinciden_habilidades_cortas(self):
+        Perfil.objects.filter(estudiante=self.autor).update(habilidades_ofrecidas='C#', habilidades_buscadas='Go')
+        Perfil.objects.filter(estudiante=self.lector).update(habilidades_ofrecidas='Go', habilidades_buscadas='C#')
+        for perfil in Perfil.objects.filter(estudiante__in=[self.autor, self.lector]):
+            perfil.save()  # reindexa (update() no dispara la señal)
+        self.assertIn(self.lector.pk, [r['estudiante'] for r in recomendar(self.autor)])
+
+
+class EnrutamientoLecturaTests(SimpleTestCase):
+    """LecturaEscrituraRouter y los PRAGMA de cada conexión (ver core/db.py)."""
+    # Las conexiones propias son de la misma clase que las de la configuración
+    databases = {'default', ALIAS_LECTURA}
+
+    def setUp(self):
+        self.router = LecturaEscrituraRouter()
+
+    def conexion(self, alias):
+        # Conexión propia a un archivo temporal: en los tests 'lectura' es un espejo de 'default'
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        ajustes = {**connections.settings[alias], 'NAME': os.path.join(directorio.name, 'db.sqlite3')}
+        conexion = connections[alias].__class__(ajustes, alias)
+        self.addCleanup(conexion.close)
+        return conexion
+
+    def test_solo_lectura_envia_las_lecturas_a_la_replica(self):
+        token = solo_lectura.set(True)
+        self.addCleanup(solo_lectura.reset, token)
+        self.assertEqual(self.router.db_for_read(Mensaje), ALIAS_LECTURA)
+        self.assertEqual(Mensaje.objects.all().db, ALIAS_LECTURA)
+        self.assertEqual(self.router.db_for_write(Mensaje), 'default')
+
+    def test_fuera_de_solo_lectura_todo_va_al_primario(self):
+        self.assertEqual(self.router.db_for_read(Mensaje), 'default')
+        self.assertEqual(self.router.db_for_write(Mensaje), 'default')
+
+    def test_pragmas_configurados(self):
+        with self.conexion('default').cursor() as cursor:
+            for nombre, esperado in (('journal_mode', 'wal'), ('synchronous', 1), ('busy_timeout', 20000)):
+                cursor.execute(f'PRAGMA {nombre}')
+                self.assertEqual(cursor.fetchone()[0], esperado, nombre)
+            cursor.execute('PRAGMA query_only')
+            self.assertEqual(cursor.fetchone()[0], 0)
+
+    def test_la_replica_rechaza_escrituras(self):
+        with self.conexion(ALIAS_LECTURA).cursor() as cursor:
+            cursor.execute('PRAGMA query_only')
+            self.assertEqual(cursor.fetchone()[0], 1)
+            with self.assertRaises(OperationalError):
+                cursor.execute('CREATE TABLE prueba (id INTEGER)')
+
+
+class BrokerMemoriaTests(SimpleTestCase):
+    async def test_entrega_al_estudiante_y_reanuda_desde_un_id(self):
+        broker = realtime.BrokerMemoria()
+        primero = broker.publicar(1, 'mensaje', {'n': 1})
+        segundo = broker.publicar(1, 'mensaje', {'n': 2})
+        broker.publicar(2, 'mensaje', {'n': 3})
+        suscripcion = broker.suscribir(1, desde_id=primero.id)
+        self.assertEqual((await suscripcion.siguiente(timeout=1)).id, segundo.id)
+        tercero = broker.publicar(1, 'notificacion', {'n': 4})
+        self.assertEqual((await suscripcion.siguiente(timeout=1)).id, tercero.id)
+        self.assertIsNone(await suscripcion.siguiente(timeout=0.05))
+
+    def test_ids_siguen_creciendo_tras_reiniciar(self):
+        anterior = realtime.BrokerMemoria().publicar(1, 'mensaje', {})
+        self.assertGreater(realtime.BrokerMemoria().publicar(1, 'mensaje', {}).id, anterior.id)
+
+    def test_loop_cerrado_no_interrumpe_la_entrega(self):
+        broker = realtime.BrokerMemoria()
+
+        async def suscribir():
+            return broker.suscribir(1)
+
+        cerrada = asyncio.run(suscribir())  # asyncio.run cierra su loop al terminar
+        loop = asyncio.new_event_loop()
+        viva = loop.run_until_complete(suscribir())
+        broker.publicar(1, 'mensaje', {'n': 1})
+        self.assertEqual(loop.run_until_complete(viva.siguiente(timeout=1)).datos, {'n': 1})
+        loop.close()
+        self.assertNotIn(cerrada, broker._suscriptores[1])
+
+
+class PublicacionTiempoRealTests(DatosDePruebaTestCase):
+    def test_suscriptor_caido_no_rompe_el_post(self):
+        broker = realtime.BrokerMemoria()
+
+        async def suscribir():
+            return broker.suscribir(self.lector.pk)
+
+        asyncio.run(suscribir())
+        anterior, realtime._broker = realtime._broker, broker
+        try:
+            with self.captureOnCommitCallbacks(execute=True):
+                respuesta = self.client.post('/api/mensajes/', {'chat': self.chat.pk, 'texto': 'hola'}, format='json')
+        finally:
+            realtime._broker = anterior
+        self.assertEqual(respuesta.status_code, 201)
+        self.assertEqual(broker._suscriptores[self.lector.pk], set())
+
+
+class RetencionPublicacionesTests(DatosDePruebaTestCase):
+    """publicaciones_inactivas archiva por última actividad, no por antigüedad."""
+    def test_solo_archiva_sin_actividad_reciente(self):
+        hace_un_anio = timezone.now() - timedelta(days=365)
+        sin_chats = Publicacion.objects.create(titulo='Vieja', descripcion='-', habilidad=1, estudiante=self.lector)
+        chat_viejo = Publicacion.objects.create(titulo='Vieja 2', descripcion='-', habilidad=1, estudiante=self.lector)
+        chat = Chat.objects.create(publicacion=chat_viejo)
+        Mensaje.objects.create(chat=chat, estudiante=self.autor, texto='hola')
+        Chat.objects.filter(pk=chat.pk).update(fecha_inicio=hace_un_anio)
+        Mensaje.objects.filter(chat=chat).update(fecha=hace_un_anio)
+        # La publicación con chats y mensajes de hoy también es antigua
+        Publicacion.objects.update(fecha_creacion=hace_un_anio)
+
+        politica, = obtener_politicas(['publicaciones_inactivas'])
+        self.assertEqual(aplicar_politica(politica).filas, 2)
+        self.assertEqual(
+            set(Publicacion.objects.filter(estado=False).values_list('pk', flat=True)), {sin_chats.pk, chat_viejo.pk}
+        )
+        self.assertTrue(Publicacion.objects.get(pk=self.publicacion.pk).estado)
+
+
+class LimitesTasaTests(DatosDePruebaTestCase):
+    def post_mensaje(self):
+        return self.client.post('/api/mensajes/', {'chat': self.chat.pk, 'texto': 'hola'}, format='json')
+
+    @override_settings(LIMITES_TASA={'mensajes': {'api_key': (2, 0.1)}})
+    def test_sin_tokens_responde_429_con_retry_after(self):
+        self.assertEqual([self.post_mensaje().status_code for _ in range(2)], [201, 201])
+        respuesta = self.post_mensaje()
+        self.assertEqual(respuesta.status_code, 429)
+        self.assertEqual(respuesta['Retry-After'], '10')
+        # Solo los POST tienen scope; otra API Key tiene su propia cubeta
+        self.assertEqual(self.client.get('/api/mensajes/').status_code, 200)
+        self.client.credentials(HTTP_X_API_KEY=self.lector.api_key)
+        self.assertEqual(self.post_mensaje().status_code, 201)
+
+    @override_settings(LIMITES_TASA={'registro': {'ip': (3, 0.01)}})
+    def test_x_forwarded_for_no_evade_el_limite_por_ip(self):
+        self.client.credentials()
+        estados = [
+            self.client.post('/api/register/', {}, format='json', HTTP_X_FORWARDED_FOR=f'10.0.0.{n}').status_code
+            for n in range(5)
+        ]
+        self.assertEqual(estados, [400, 400, 400, 429, 429])
+
+    @override_settings(LIMITES_TASA={'login': {'ip': (1, 0.5)}})
+    def test_login_async_comparte_el_limite(self):
+        self.client.credentials()
+        datos = {'email': 'autor@inacap.cl', 'password': 'x'}
+        self.assertEqual(self.client.post('/api/login/', datos, format='json').status_code, 401)
+        respuesta = self.client.post('/api/login/async/', datos, format='json')
+        self.assertEqual(respuesta.status_code, 429)
+        self.assertEqual(respuesta['Retry-After'], '2')
+
+
+# Tareas de prueba: run_worker las resuelve por ruta (core.tests.<nombre>)
+EJECUCIONES = []
+
+
+@tarea
+def anotar(valor):
+    EJECUCIONES.append(valor)
+
+
+@tarea(max_intentos=2)
+def fallar(veces):
+    EJECUCIONES.append('intento')
+    if EJECUCIONES.count('intento') <= veces:
+        raise RuntimeError('falla de prueba')
+
+
+@override_settings(TAREAS_BACKOFF_BASE=10, TAREAS_BACKOFF_MAXIMO=60)
+class TareasTests(TestCase):
+    def setUp(self):
+        EJECUCIONES.clear()
+
+    def vencer(self, tarea_):
+        Tarea.objects.filter(pk=tarea_.pk).update(disponible_desde=timezone.now() - timedelta(seconds=1))
+
+    def test_prioridad_y_retraso(self):
+        encolar(anotar, {'valor': 'baja'}, prioridad=-1)
+        encolar(anotar, {'valor': 'diferida'}, prioridad=5, retraso=60)
+        anotar.encolar(valor='normal')
+        encolar(anotar, {'valor': 'alta'}, prioridad=1)
+        while (reservada := reservar('w')) is not None:
+            ejecutar(reservada)
+        self.assertEqual(EJECUCIONES, ['alta', 'normal', 'baja'])
+        self.assertEqual(Tarea.objects.get(estado=Tarea.PENDIENTE).argumentos, {'valor': 'diferida'})
+
+    def test_se_encola_con_la_transaccion(self):
+        with self.assertRaises(ValueError), transaction.atomic():
+            anotar.encolar(valor='x')
+            raise ValueError
+        self.assertFalse(Tarea.objects.exists())
+
+    def test_reintento_con_backoff(self):
+        fallar.encolar(veces=1)
+        self.assertFalse(ejecutar(reservar('w')))
+        pendiente = Tarea.objects.get()
+        self.assertEqual((pendiente.estado, pendiente.intentos), (Tarea.PENDIENTE, 1))
+        self.assertIn('falla de prueba', pendiente.error)
+        espera = (pendiente.disponible_desde - timezone.now()).total_seconds()
+        self.assertTrue(4 < espera <= 10, espera)
+        self.assertIsNone(reservar('w'))  # todavía no vence el backoff
+        self.vencer(pendiente)
+        self.assertTrue(ejecutar(reservar('w')))
+        completada = Tarea.objects.get()
+        self.assertEqual((completada.estado, completada.intentos, completada.error), (Tarea.COMPLETADA, 2, ''))
+
+    def test_agota_los_intentos(self):
+        tarea_ = fallar.encolar(veces=5)
+        for _ in range(2):
+            self.vencer(tarea_)
+            self.assertFalse(ejecutar(reservar('w')))
+        fallida = Tarea.objects.get()
+        self.assertEqual((fallida.estado, fallida.intentos), (Tarea.FALLIDA, 2))
+        self.assertIsNotNone(fallida.fecha_fin)
+        self.vencer(fallida)
+        self.assertIsNone(reservar('w'))
+
+    def test_backoff_exponencial_con_tope(self):
+        for intentos, minimo, maximo in ((1, 5, 10), (2, 10, 20), (3, 20, 40), (10, 30, 60)):
+            self.assertTrue(minimo <= backoff(intentos) <= maximo, intentos)
+
+    def test_visibilidad_vencida(self):
+        tarea_ = anotar.encolar(valor='x')
+        perdida = reservar('muerto')
+        self.assertIsNone(reservar('otro'))  # oculta mientras dure la reserva
+        self.vencer(tarea_)
+        retomada = reservar('otro')
+        self.assertEqual((retomada.pk, retomada.intentos), (tarea_.pk, 2))
+        # El worker original ya no puede cerrarla; el nuevo sí
+        self.assertTrue(ejecutar(perdida))
+        self.assertEqual(Tarea.objects.get().estado, Tarea.EN_CURSO)
+        self.assertTrue(ejecutar(retomada))
+        self.assertEqual(Tarea.objects.get().estado, Tarea.COMPLETADA)
+
+    def test_reserva_vencida_en_el_ultimo_intento_falla(self):
+        tarea_ = fallar.encolar(veces=0)
+        Tarea.objects.filter(pk=tarea_.pk).update(estado=Tarea.EN_CURSO, intentos=2)
+        self.vencer(tarea_)
+        self.assertIsNone(reservar('w'))
+        self.assertEqual(Tarea.objects.get().estado, Tarea.FALLIDA)
+        self.assertEqual(EJECUCIONES, [])
+
+
+class RegistroTests(TestCase):
+    def test_el_token_se_crea_sin_worker(self):
+        respuesta = APIClient().post('/api/register/', {
+            'email': 'nuevo@inacap.cl', 'contraseña': 'Segura123', 'aceptar_politicas': True,
+        }, format='json')
+        self.assertEqual(respuesta.status_code, 201)
+        self.assertTrue(TokenVerificacion.objects.filter(estudiante__email='nuevo@inacap.cl').exists())
+        self.assertFalse(Tarea.objects.exists())
+
+
+class IdempotenciaTests(DatosDePruebaTestCase):
+    def setUp(self):
+        super().setUp()
+        caches[settings.IDEMPOTENCIA_CACHE].clear()
+
+    def enviar(self, texto, clave='clave-1'):
+        return self.client.post(
+            '/api/mensajes/', {'chat': self.chat.pk, 'texto': texto}, format='json', HTTP_IDEMPOTENCY_KEY=clave,
+        )
+
+    def test_reintento_devuelve_la_misma_respuesta(self):
+        primera = self.enviar('hola')
+        segunda = self.enviar('hola')
+        self.assertEqual(primera.status_code, 201)
+        self.assertEqual(segunda.status_code, 201)
+        self.assertEqual(segunda['Idempotent-Replayed'], 'true')
+        self.assertEqual(json.loads(segunda.content), json.loads(primera.content))
+        self.assertEqual(Mensaje.objects.filter(chat=self.chat, texto='hola').count(), 1)
+
+    def test_otra_clave_crea_otro_mensaje(self):
+        self.enviar('hola', clave='clave-1')
+        self.enviar('hola', clave='clave-2')
+        self.assertEqual(Mensaje.objects.filter(chat=self.chat, texto='hola').count(), 2)
+
+    def test_misma_clave_con_otro_body_es_422(self):
+        self.enviar('hola')
+        respuesta = self.enviar('chao')
+        self.assertEqual(respuesta.status_code, 422)
+        self.assertFalse(Mensaje.objects.filter(texto='chao').exists())
+
+    def test_duplicado_en_curso_es_409(self):
+        # Reserva la clave como lo haría la petición original sin terminar
+        original = APIRequestFactory().post(
+            '/api/mensajes/', {'chat': self.chat.pk, 'texto': 'hola'}, format='json',
+            HTTP_IDEMPOTENCY_KEY='clave-1', HTTP_X_API_KEY=self.autor.api_key,
+        )
+        self.assertIsNone(idempotencia.reservar(idempotencia.clave_de(original), idempotencia.huella(original)))
+
+        respuesta = self.enviar('hola')
+        self.assertEqual(respuesta.status_code, 409)
+        self.assertIn('Retry-After', respuesta)
+        self.assertFalse(Mensaje.objects.filter(texto='hola').exists())
+
+
+@override_settings(HASH_ITERACIONES=1000)
+class ImportacionTests(TestCase):
+    def archivo(self, filas):
+        descriptor, ruta = tempfile.mkstemp(suffix='.csv')
+        with os.fdopen(descriptor, 'w', encoding='utf-8') as archivo:
+            archivo.write('email,contraseña,nombre\n')
+            archivo.writelines(f'{email},Segura123,{email}\n' for email in filas)
+        self.addCleanup(os.remove, ruta)
+        return ruta
+
+    def test_reanudar_desde_la_ultima_linea_confirmada(self):
+        ruta = self.archivo([f'import{i}@inacap.cl' for i in range(5)])
+        confirmadas = []
+
+        def cortar(resultado):
+            confirmadas.append(resultado.ultima_linea)
+            raise KeyboardInterrupt
+
+        with self.assertRaises(KeyboardInterrupt):
+            importar(ruta, tamano_lote=2, procesos=0, al_confirmar=cortar)
+        self.assertEqual(confirmadas, [3])  # cabecera + 2 filas
+        self.assertEqual(Estudiante.objects.count(), 2)
+
+        resultado = importar(ruta, tamano_lote=2, procesos=0, desde_linea=confirmadas[-1])
+        self.assertEqual((resultado.importados, resultado.existentes, resultado.ultima_linea), (3, 0, 6))
+        self.assertEqual(Estudiante.objects.count(), 5)
+        self.assertEqual(Perfil.objects.count(), 5)
+
+    def test_repetir_el_archivo_no_duplica(self):
+        ruta = self.archivo(['import0@inacap.cl', 'import1@inacap.cl', 'import0@inacap.cl'])
+        primera = importar(ruta, procesos=0)
+        self.assertEqual((primera.importados, primera.existentes), (2, 1))
+        segunda = importar(ruta, procesos=0)
+        self.assertEqual((segunda.importados, segunda.existentes), (0, 3))
+        self.assertEqual(Estudiante.objects.count(), 2)
+        self.assertEqual(TokenVerificacion.objects.count(), 2)
+
+
+class ExportacionTests(DatosDePruebaTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.credentials(HTTP_X_API_KEY=self.administrador.api_key)
+
+    def exportar(self, url):
+        respuesta = self.client.get(url)
+        self.assertEqual(respuesta.status_code, 200, url)
+        return [json.loads(linea) for linea in b''.join(respuesta.streaming_content).decode().splitlines()]
+
+    def test_filtro_por_estado(self):
+        Reporte.objects.create(publicacion=self.publicacion, estudiante=self.otros[0], motivo='otro', estado=1)
+        filas = self.exportar('/api/exportar/reportes/?formato=jsonl&estado=1')
+        self.assertEqual([fila['motivo'] for fila in filas], ['otro'])
+
+    def test_hasta_con_solo_fecha_incluye_todo_el_dia(self):
+        hoy = timezone.localdate()
+        self.assertEqual(len(self.exportar(f'/api/exportar/reportes/?formato=jsonl&hasta={hoy}')), 1)
+        ayer = hoy - timedelta(days=1)
+        self.assertEqual(self.exportar(f'/api/exportar/reportes/?formato=jsonl&hasta={ayer}'), [])
+        self.assertEqual(self.exportar(f'/api/exportar/reportes/?formato=jsonl&desde={hoy}'), self.exportar(
+            '/api/exportar/reportes/?formato=jsonl'
+        ))
+
+    def test_filtro_por_chat(self):
+        chats = self.chats[:2]
+        filas = self.exportar(f'/api/exportar/chats/?formato=jsonl&chat={chats[0].pk}&chat={chats[1].pk}')
+        self.assertEqual(len(filas), 6)
+        self.assertEqual({fila['chat_id'] for fila in filas}, {chat.pk for chat in chats})
+
+    def test_filtros_invalidos_son_400(self):
+        for url in (
+            '/api/exportar/reportes/?desde=ayer',
+            '/api/exportar/reportes/?estado=abierto',
+            '/api/exportar/chats/?chat=uno',
+            '/api/exportar/reportes/?chat=1',
+            '/api/exportar/publicaciones/?formato=xml',
+            '/api/exportar/usuarios/',
+        ):
+            self.assertEqual(self.client.get(url).status_code, 400, url)
+
+    def test_solo_administradores(self):
+        self.client.credentials(HTTP_X_API_KEY=self.autor.api_key)
+        self.assertEqual(self.client.get('/api/exportar/reportes/').status_code, 401)
+
+
+class MarcaLecturaTests(DatosDePruebaTestCase):
+    def setUp(self):
+        super().setUp()
+        self.mensajes = list(Mensaje.objects.filter(chat=self.chat).order_by('pk').values_list('pk', flat=True))
+
+    def marcar(self, hasta=None, chat=None):
+        datos = {} if hasta is None else {'hasta': hasta}
+        return self.client.post(f'/api/chats/{(chat or self.chat).pk}/leer/', datos, format='json')
+
+    def ultimo_leido(self):
+        return ChatParticipante.objects.get(chat=self.chat, estudiante=self.autor).ultimo_leido
+
+    def no_leidos(self):
+        return {fila['chat']: fila['no_leidos'] for fila in self.client.get('/api/chats/no-leidos/').data['chats']}
+
+    def test_avanza_hasta_el_mensaje_indicado(self):
+        self.assertEqual(self.client.get('/api/contadores/').data['mensajes_no_leidos'], 9)
+        self.assertEqual(self.marcar(self.mensajes[0]).status_code, 204)
+        self.assertEqual(self.ultimo_leido(), self.mensajes[0])
+        self.assertEqual(self.no_leidos().get(self.chat.pk), 2)
+        self.assertEqual(Contadores.objects.get(estudiante=self.autor).mensajes_no_leidos, 8)
+
+    def test_no_retrocede(self):
+        self.marcar(self.mensajes[1])
+        self.assertEqual(self.marcar(self.mensajes[0]).status_code, 204)
+        self.assertEqual(self.ultimo_leido(), self.mensajes[1])
+
+    def test_no_pasa_del_ultimo_mensaje(self):
+        self.marcar(self.mensajes[-1] + 1000)
+        self.assertEqual(self.ultimo_leido(), self.mensajes[-1])
+        # Un mensaje nuevo vuelve a quedar sin leer
+        Mensaje.objects.create(chat=self.chat, estudiante=self.lector, texto='otro')
+        self.assertEqual(self.no_leidos().get(self.chat.pk), 1)
+
+    def test_sin_hasta_marca_todo(self):
+        self.marcar()
+        self.assertEqual(self.ultimo_leido(), self.mensajes[-1])
+        self.assertNotIn(self.chat.pk, self.no_leidos())
+
+    def test_no_participante_es_403(self):
+        self.client.credentials(HTTP_X_API_KEY=self.otros[0].api_key)
+        self.assertEqual(self.marcar().status_code, 403)
+
+    def test_hasta_invalido_es_400(self):
+        self.assertEqual(self.marcar('ultimo').status_code, 400)
+
+
+@override_settings(HASH_ITERACIONES=1000)
+class LoginTests(TestCase):
+    URLS = ('/api/login/', '/api/login/async/')
+
+    def setUp(self):
+        limites_tasa.get_almacen().limpiar()
+
+    def crear(self, contraseña):
+        return Estudiante.objects.create(email='login@inacap.cl', contraseña=contraseña, verificado=True)
+
+    def login(self, url='/api/login/'):
+        return self.client.post(
+            url, {'email': 'login@inacap.cl', 'password': 'Segura123'}, content_type='application/json',
+        )
+
+    def test_hash_antiguo_se_regenera(self):
+        for url in self.URLS:
+            with self.subTest(url=url):
+                Estudiante.objects.all().delete()
+                estudiante = self.crear(make_password('Segura123', hasher='pbkdf2_sha1'))
+                self.assertEqual(self.login(url).status_code, 200)
+                estudiante.refresh_from_db()
+                self.assertEqual(identify_hasher(estudiante.contraseña).algorithm, get_hasher().algorithm)
+                self.assertTrue(check_password('Segura123', estudiante.contraseña))
+
+    def test_hash_vigente_no_se_reescribe(self):
+        contraseña = make_password('Segura123')
+        estudiante = self.crear(contraseña)
+        self.assertEqual(self.login().status_code, 200)
+        estudiante.refresh_from_db()
+        self.assertEqual(estudiante.contraseña, contraseña)
+
+    def test_pool_saturado_responde_503(self):
+        self.crear(make_password('Segura123'))
+        pool = PoolHashing(workers=1, max_pendientes=0)
+        self.addCleanup(pool._executor.shutdown)
+        pool._cupos.acquire()  # el único cupo, ocupado por otro login
+        with mock.patch('core.views.get_pool', return_value=pool):
+            for url in self.URLS:
+                respuesta = self.login(url)
+                self.assertEqual(respuesta.status_code, 503, url)
+                self.assertEqual(respuesta['Retry-After'], '1')
+
+
+class ReputacionTests(DatosDePruebaTestCase):
+    """Reputacion incremental por calificación y su reconstrucción con recalcular."""
+    def calificar(self, evaluador, chat, puntaje):
+        self.client.credentials(HTTP_X_API_KEY=evaluador.api_key)
+        respuesta = self.client.post('/api/calificaciones-chat/', {'chat': chat.pk, 'puntaje': puntaje}, format='json')
+        self.assertEqual(respuesta.status_code, 201)
+
+    def reputaciones(self):
+        campos = ('estudiante', 'cantidad', 'suma', 'promedio', *(f'estrellas_{n}' for n in PUNTAJES))
+        return sorted(Reputacion.objects.values_list(*campos))
+
+    def test_cada_calificacion_se_suma(self):
+        self.calificar(self.lector, self.chats[0], 5)
+        self.calificar(self.otros[0], self.chats[1], 2)
+        self.calificar(self.otros[1], self.chats[2], 5)
+        self.calificar(self.autor, self.chats[0], 3)
+
+        autor = Reputacion.objects.get(estudiante=self.autor)
+        self.assertEqual((autor.cantidad, autor.suma), (3, 12))
+        self.assertAlmostEqual(autor.promedio, 4.0)
+        self.assertEqual(autor.histograma, {1: 0, 2: 1, 3: 0, 4: 0, 5: 2})
+        lector = Reputacion.objects.get(estudiante=self.lector)
+        self.assertEqual((lector.cantidad, lector.suma, lector.promedio), (1, 3, 3.0))
+        self.assertFalse(Reputacion.objects.filter(estudiante__in=self.otros).exists())
+
+    def test_recalcular_coincide_con_lo_incremental(self):
+        self.calificar(self.lector, self.chats[0], 4)
+        self.calificar(self.otros[0], self.chats[1], 1)
+        self.calificar(self.autor, self.chats[1], 5)
+        incremental = self.reputaciones()
+        Reputacion.objects.all().delete()
+        self.assertEqual(recalcular(tamano_lote=2), len(incremental))
+        self.assertEqual(self.reputaciones(), incremental)
+
+    def test_la_migracion_rellena_la_tabla(self):
+        self.calificar(self.lector, self.chats[0], 4)
+        incremental = self.reputaciones()
+        Reputacion.objects.all().delete()
+        import_module('core.migrations.0013_reputacion').rellenar_reputacion(django_apps, None)
+        self.assertEqual(self.reputaciones(), incremental)
+
+
+class SoftDeleteTests(DatosDePruebaTestCase):
+    """Borrado lógico por lotes con SoftDeleteService y el manager Publicacion.activas."""
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.extra = [
+            Publicacion.objects.create(titulo=f'Extra {i}', descripcion='x', habilidad=1, estudiante=cls.lector)
+            for i in range(4)
+        ]
+
+    def setUp(self):
+        super().setUp()
+        self.avisos = []
+
+        def receptor(sender, pks, **kwargs):
+            self.avisos.append((sender, sorted(pks)))
+
+        estado_cambiado.connect(receptor, weak=False)
+        self.addCleanup(estado_cambiado.disconnect, receptor)
+
+    @mock.patch.object(SoftDeleteService, 'TAMAÑO_LOTE', 2)
+    def test_un_update_por_lote(self):
+        pks = sorted(p.pk for p in self.extra)
+        # SAVEPOINT, SELECT de pks, un UPDATE por cada lote de 2 y RELEASE
+        with self.assertNumQueries(5):
+            filas = SoftDeleteService.desactivar_lote(Publicacion.objects.filter(pk__in=pks))
+        self.assertEqual(filas, 4)
+        self.assertEqual(self.avisos, [(Publicacion, pks)])
+        self.assertFalse(Publicacion.objects.filter(pk__in=pks, estado=True).exists())
+
+    def test_activas_oculta_las_desactivadas(self):
+        SoftDeleteService.desactivar(self.extra[0])
+        self.assertEqual(self.avisos, [(Publicacion, [self.extra[0].pk])])
+        self.assertFalse(Publicacion.activas.filter(pk=self.extra[0].pk).exists())
+        self.assertTrue(Publicacion.objects.filter(pk=self.extra[0].pk, estado=False).exists())
+        self.assertEqual(Publicacion.activas.count(), Publicacion.objects.count() - 1)
+
+        SoftDeleteService.reactivar_lote(Publicacion.objects.filter(pk=self.extra[0].pk))
+        self.assertEqual(Publicacion.activas.count(), Publicacion.objects.count())
+
+    def test_lote_vacio_no_avisa(self):
+        self.assertEqual(SoftDeleteService.desactivar_lote(Publicacion.objects.none()), 0)
+        self.assertEqual(self.avisos, [])
+
+
+class CachePublicacionesTests(DatosDePruebaTestCase):
+    """GET condicional e invalidación de core/cache_publicaciones.py."""
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.url = f'/api/publicaciones/{self.publicacion.pk}/'
+
+    def test_if_none_match_responde_304(self):
+        primera = self.client.get(self.url)
+        self.assertEqual(primera.status_code, 200)
+        segunda = self.client.get(self.url, HTTP_IF_NONE_MATCH=primera['ETag'])
+        self.assertEqual(segunda.status_code, 304)
+        self.assertEqual(segunda['ETag'], primera['ETag'])
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH='"otro"').status_code, 200)
+
+    def test_if_modified_since_responde_304(self):
+        primera = self.client.get('/api/publicaciones/')
+        respuesta = self.client.get('/api/publicaciones/', HTTP_IF_MODIFIED_SINCE=primera['Last-Modified'])
+        self.assertEqual(respuesta.status_code, 304)
+
+    def test_304_sin_consultas_si_esta_en_cache(self):
+        etag = self.client.get(self.url)['ETag']
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_inexistente_o_inactiva_es_404_aunque_sea_condicional(self):
+        inactiva = Publicacion.objects.create(
+            titulo='Borrada', descripcion='-', habilidad=1, estudiante=self.autor, estado=False,
+        )
+        for pk in (inactiva.pk, inactiva.pk + 1000):
+            respuesta = self.client.get(f'/api/publicaciones/{pk}/', HTTP_IF_NONE_MATCH='*')
+            self.assertEqual(respuesta.status_code, 404, pk)
+            respuesta = self.client.get(f'/api/publicaciones/{pk}/', HTTP_IF_MODIFIED_SINCE=http_date(2 ** 32))
+            self.assertEqual(respuesta.status_code, 404, pk)
+
+    def assertInvalida(self, cambio, esperado=200):
+        etag = self.client.get(self.url)['ETag']
+        etag_lista = self.client.get('/api/publicaciones/')['ETag']
+        # La invalidación se registra con on_commit
+        with self.captureOnCommitCallbacks(execute=True):
+            cambio()
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, esperado)
+        self.assertEqual(self.client.get('/api/publicaciones/', HTTP_IF_NONE_MATCH=etag_lista).status_code, 200)
+
+    def test_editar_invalida(self):
+        def editar():
+            respuesta = self.client.patch(f'{self.url}editar/', {'titulo': 'Clases de Go'}, format='json')
+            self.assertEqual(respuesta.status_code, 200)
+
+        self.assertInvalida(editar)
+        self.assertEqual(self.client.get(self.url).data['titulo'], 'Clases de Go')
+
+    def test_borrado_logico_invalida(self):
+        def borrar():
+            self.assertEqual(self.client.delete(f'{self.url}eliminar/').status_code, 204)
+
+        self.assertInvalida(borrar, esperado=404)
+
+    def test_moderar_invalida(self):
+        def moderar():
+            self.client.credentials(HTTP_X_API_KEY=self.administrador.api_key)
+            respuesta = self.client.post(
+                '/api/reportes/moderar/', {'accion': 'eliminar', 'publicaciones': [self.publicacion.pk]}, format='json',
+            )
+            self.assertEqual(respuesta.status_code, 200)
+
+        self.assertInvalida(moderar, esperado=404)
+
+
+@override_settings(HASH_ITERACIONES=1000)
+class BenchmarkTests(TransactionTestCase):
+    """Humo de core/bench.py: cada escenario corre una vez sobre un dataset mínimo."""
+    # Las peticiones de solo lectura van por el alias 'lectura' (espejo de 'default')
+    databases = {'default', ALIAS_LECTURA}
+
+    def test_todos_los_escenarios_responden(self):
+        dataset = generar_dataset(estudiantes=6)
+        for modo in ('wsgi', 'asgi'):
+            with self.subTest(modo=modo):
+                resultado = ejecutar_benchmark(dataset, peticiones=1, concurrencia=1, modo=modo)
+                self.assertEqual(resultado['sin_escenario'], [])
+                self.assertTrue(resultado['escenarios'])
+                for etiqueta, resumen in resultado['escenarios'].items():
+                    self.assertEqual(resumen['peticiones'], 1, etiqueta)
+                    errores = [estado for estado in resumen['estados'] if estado.startswith('5')]
+                    self.assertEqual(errores, [], etiqueta)
+
+
+class ModeracionTests(DatosDePruebaTestCase):
+    """Cola agregada de reportes pendientes y moderación en lote."""
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.reporte = Reporte.objects.get(publicacion=cls.publicacion)
+        cls.muy_reportada, cls.repetida = [
+            Publicacion.objects.create(titulo=titulo, descripcion='x', habilidad=1, estudiante=cls.lector)
+            for titulo in ('Muy reportada', 'Reportada dos veces')
+        ]
+        for estudiante in (cls.autor, *cls.otros):
+            Reporte.objects.create(publicacion=cls.muy_reportada, estudiante=estudiante, motivo='spam')
+        # El mismo estudiante dos veces y uno ya moderado: no suben la severidad
+        for estado in (0, 0, 1):
+            Reporte.objects.create(publicacion=cls.repetida, estudiante=cls.autor, motivo='spam', estado=estado)
+
+    def setUp(self):
+        super().setUp()
+        self.client.credentials(HTTP_X_API_KEY=self.administrador.api_key)
+
+    def moderar(self, **datos):
+        return self.client.post('/api/reportes/moderar/', datos, format='json')
+
+    def test_cola_por_reportantes_distintos(self):
+        respuesta = self.client.get('/api/reportes/cola/')
+        self.assertEqual(respuesta.status_code, 200)
+        filas = [(f['publicacion'], f['reportantes'], f['reportes']) for f in respuesta.data['results']]
+        # Empate de severidad: desempata el pk de la publicación, descendente
+        self.assertEqual(filas, [
+            (self.muy_reportada.pk, 3, 3), (self.repetida.pk, 1, 2), (self.publicacion.pk, 1, 1),
+        ])
+        self.assertEqual(respuesta.data['results'][0]['autor'], self.lector.pk)
+        self.assertTrue(respuesta.data['results'][0]['activa'])
+
+    def test_cola_pagina_sin_perder_filas(self):
+        primera = self.client.get('/api/reportes/cola/', {'page_size': 2}).data
+        segunda = self.client.get(primera['next']).data
+        pks = [f['publicacion'] for f in primera['results'] + segunda['results']]
+        self.assertEqual(pks, [self.muy_reportada.pk, self.repetida.pk, self.publicacion.pk])
+        self.assertIsNone(segunda['next'])
+
+    def test_aprobar_reportes(self):
+        respuesta = self.moderar(accion='aprobar', reportes=[self.reporte.pk])
+        self.assertEqual(respuesta.data, {'reportes': 1, 'publicaciones': 0})
+        self.reporte.refresh_from_db()
+        self.assertEqual((self.reporte.estado, self.reporte.administrador_id), (1, self.administrador.pk))
+        self.assertTrue(Publicacion.objects.get(pk=self.publicacion.pk).estado)
+        # Repetir el lote no cambia nada
+        self.assertEqual(self.moderar(accion='aprobar', reportes=[self.reporte.pk]).data['reportes'], 0)
+
+    def test_rechazar_solo_toca_los_pendientes(self):
+        respuesta = self.moderar(accion='rechazar', publicaciones=[self.repetida.pk])
+        self.assertEqual(respuesta.data, {'reportes': 2, 'publicaciones': 0})
+        self.assertEqual(
+            sorted(Reporte.objects.filter(publicacion=self.repetida).values_list('estado', flat=True)), [1, 2, 2],
+        )
+
+    def test_eliminar_da_de_baja_y_acepta(self):
+        reporte = Reporte.objects.filter(publicacion=self.muy_reportada).first()
+        respuesta = self.moderar(accion='eliminar', reportes=[reporte.pk], publicaciones=[self.publicacion.pk])
+        self.assertEqual(respuesta.data, {'reportes': 4, 'publicaciones': 2})
+        self.assertFalse(
+            Publicacion.objects.filter(pk__in=[self.muy_reportada.pk, self.publicacion.pk], estado=True).exists()
+        )
+        self.assertFalse(
+            Reporte.objects.filter(publicacion__in=[self.muy_reportada, self.publicacion]).exclude(estado=1).exists()
+        )
+        cola = self.client.get('/api/reportes/cola/').data['results']
+        self.assertEqual([f['publicacion'] for f in cola], [self.repetida.pk])
+
+    def test_lote_invalido(self):
+        self.assertEqual(self.moderar(accion='aprobar').status_code, 400)
+        self.assertEqual(self.moderar(accion='borrar', reportes=[self.reporte.pk]).status_code, 400)
+        self.client.credentials(HTTP_X_API_KEY=self.autor.api_key)
+        self.assertEqual(self.moderar(accion='aprobar', reportes=[self.reporte.pk]).status_code, 401)
+        self.assertEqual(Reporte.objects.get(pk=self.reporte.pk).estado, 0)
+
+
+class ContadoresTests(DatosDePruebaTestCase):
+    """Cada evento ajusta los badges y recalcular coincide con lo incremental."""
+    def setUp(self):
+        super().setUp()
+        # Crea las filas desde los datos reales; desde aquí solo cambian con ajustar()
+        for estudiante in Estudiante.objects.all():
+            contadores_leer(estudiante)
+
+    def contadores(self, estudiante):
+        return Contadores.objects.filter(estudiante=estudiante).values(*CAMPOS_CONTADORES).get()
+
+    def como(self, estudiante):
+        self.client.credentials(HTTP_X_API_KEY=estudiante.api_key)
+
+    def assertCoincideConRecalcular(self):
+        incrementales = {e.pk: self.contadores(e) for e in (self.autor, self.lector)}
+        self.assertEqual(contadores_recalcular(), (Estudiante.objects.count(), 0))
+        self.assertEqual({e.pk: self.contadores(e) for e in (self.autor, self.lector)}, incrementales)
+
+    def test_estado_inicial(self):
+        self.assertEqual(self.contadores(self.autor), {
+            'notificaciones_no_leidas': 9, 'mensajes_no_leidos': 9, 'calificaciones_pendientes': 0,
+        })
+        self.assertEqual(self.client.get('/api/contadores/').data, self.contadores(self.autor))
+
+    def test_enviar_mensaje(self):
+        # La notificación se escribe al confirmar la transacción
+        with self.captureOnCommitCallbacks(execute=True):
+            respuesta = self.client.post('/api/mensajes/', {'chat': self.chat.pk, 'texto': 'hola'}, format='json')
+        self.assertEqual(respuesta.status_code, 201)
+        self.assertEqual(self.contadores(self.lector), {
+            'notificaciones_no_leidas': 1, 'mensajes_no_leidos': 1, 'calificaciones_pendientes': 0,
+        })
+        self.assertEqual(self.contadores(self.autor)['mensajes_no_leidos'], 9)
+        self.assertCoincideConRecalcular()
+
+    def test_marcar_chat_leido(self):
+        self.client.post(f'/api/chats/{self.chat.pk}/leer/')
+        self.assertEqual(self.contadores(self.autor)['mensajes_no_leidos'], 6)
+        self.assertCoincideConRecalcular()
+
+    def test_marcar_notificaciones_leidas(self):
+        notificacion = Notificacion.objects.filter(estudiante=self.autor).first()
+        for _ in range(2):  # la segunda vez ya estaba leída: no descuenta
+            self.client.patch(f'/api/notificaciones/{notificacion.pk}/marcar-leida/')
+            self.assertEqual(self.contadores(self.autor)['notificaciones_no_leidas'], 8)
+        self.client.post('/api/notificaciones/marcar-todas-leidas/')
+        self.assertEqual(self.contadores(self.autor)['notificaciones_no_leidas'], 0)
+        self.assertCoincideConRecalcular()
+
+    def test_completar_y_calificar(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(f'/api/chats/{self.chat.pk}/completar/')
+        self.assertEqual(self.contadores(self.autor)['calificaciones_pendientes'], 1)
+        self.assertEqual(self.contadores(self.lector)['calificaciones_pendientes'], 1)
+        self.como(self.lector)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/api/calificaciones-chat/', {'chat': self.chat.pk, 'puntaje': 5}, format='json')
+        self.assertEqual(self.contadores(self.lector)['calificaciones_pendientes'], 0)
+        self.assertCoincideConRecalcular()
+
+    def test_recalcular_corrige_desvios(self):
+        Contadores.objects.filter(estudiante=self.autor).update(mensajes_no_leidos=0)
+        self.assertEqual(contadores_recalcular(), (Estudiante.objects.count(), 1))
+        self.assertEqual(self.contadores(self.autor)['mensajes_no_leidos'], 9)
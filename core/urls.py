@@ -1,10 +1,14 @@
 from django.urls import path
+from .realtime import eventos_stream
 from .views import (
     CalificacionChatCreateView, ChatDetailView, CompletarIntercambioView, CrearPerfilView, MarcarNotificacionLeidaView, MarcarTodasNotificacionesLeidasView, ModerarReporteView, RegistroEstudianteView, ActivarCuentaView, LoginEstudianteView,
-    PublicacionListCreateView, PublicacionDetailView,
+    PublicacionListCreateView, PublicacionDetailView, PublicacionBusquedaView,
     PublicacionUpdateView, PublicacionDeleteView, MisPublicacionesView,
     PerfilDetailView, NotificacionListView, ListarReportesView, CrearReporteView, 
-    ChatListCreateView, MensajeListCreateView,
+    ChatListCreateView, MensajeListCreateView, ChatMensajesView, ChatInboxView,
+    RecomendacionesView, login_estudiante_async, RankingReputacionView, ExportarView,
+    ColaModeracionView, ModerarReportesLoteView, ChatMarcarLeidoView, ChatNoLeidosView,
+    ContadoresView,
 )
 
 urlpatterns = [
@@ -12,17 +16,23 @@ urlpatterns = [
     path('register/', RegistroEstudianteView.as_view(), name='register'),
     path('activate/', ActivarCuentaView.as_view(), name='activate'),
     path('login/', LoginEstudianteView.as_view(), name='login'),
+    path('login/async/', login_estudiante_async, name='login-async'),
 
     # Publicaciones
     path('publicaciones/', PublicacionListCreateView.as_view(), name='publicaciones-list-create'),
+    path('publicaciones/buscar/', PublicacionBusquedaView.as_view(), name='publicaciones-buscar'),
     path('publicaciones/mias/', MisPublicacionesView.as_view(), name='mis-publicaciones'),
     path('publicaciones/<int:pk>/', PublicacionDetailView.as_view(), name='publicaciones-detail'),
     path('publicaciones/<int:pk>/editar/', PublicacionUpdateView.as_view(), name='publicaciones-update'),
     path('publicaciones/<int:pk>/eliminar/', PublicacionDeleteView.as_view(), name='publicaciones-delete'),
 
     path('chats/', ChatListCreateView.as_view(), name='chat-list-create'),
+    path('chats/inbox/', ChatInboxView.as_view(), name='chat-inbox'),
+    path('chats/no-leidos/', ChatNoLeidosView.as_view(), name='chat-no-leidos'),
     path('chats/<int:pk>/', ChatDetailView.as_view(), name='chat-detail'),
+    path('chats/<int:pk>/mensajes/', ChatMensajesView.as_view(), name='chat-mensajes'),
     path('chats/<int:pk>/completar/', CompletarIntercambioView.as_view(), name='chat-completar'),
+    path('chats/<int:pk>/leer/', ChatMarcarLeidoView.as_view(), name='chat-marcar-leido'),
 
     # Mensajes
     path('mensajes/', MensajeListCreateView.as_view(), name='mensaje-list-create'),
@@ -34,13 +44,24 @@ urlpatterns = [
     path('notificaciones/', NotificacionListView.as_view(), name='notificacion-list'),
     path('notificaciones/<int:pk>/marcar-leida/', MarcarNotificacionLeidaView.as_view(), name='notificacion-marcar-leida'),
     path('notificaciones/marcar-todas-leidas/', MarcarTodasNotificacionesLeidasView.as_view(), name='notificaciones-marcar-todas-leidas'),
+    path('contadores/', ContadoresView.as_view(), name='contadores'),
+
+    # Push de mensajes y notificaciones (SSE; el WebSocket se monta en asgi.py)
+    path('eventos/stream/', eventos_stream, name='eventos-stream'),
 
     # Perfil y notificaciones
     path('perfil/', PerfilDetailView.as_view(), name='perfil-estudiante'),
     path('perfil/crear/', CrearPerfilView.as_view(), name='crear-perfil'),
+    path('recomendaciones/', RecomendacionesView.as_view(), name='recomendaciones'),
+    path('reputacion/ranking/', RankingReputacionView.as_view(), name='reputacion-ranking'),
     
     # Reportes
     path('reportes/', CrearReporteView.as_view(), name='crear-reporte'),
     path('reportes/listar/', ListarReportesView.as_view(), name='listar-reportes'),
     path('reportes/<int:pk>/moderar/', ModerarReporteView.as_view(), name='moderar-reporte'),
+    path('reportes/cola/', ColaModeracionView.as_view(), name='cola-moderacion'),
+    path('reportes/moderar/', ModerarReportesLoteView.as_view(), name='moderar-reportes-lote'),
+
+    # Exportaciones para administradores (reportes, chats, publicaciones)
+    path('exportar/<str:tipo>/', ExportarView.as_view(), name='exportar'),
     ]
@@ -1,4 +1,9 @@
+import json
 from urllib import request
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
 from django.shortcuts import get_object_or_404
 from rest_framework import generics, permissions, status
 from rest_framework.response import Response
@@ -8,21 +13,42 @@ from django.utils import timezone
 from django.contrib.auth.hashers import check_password
 from rest_framework.exceptions import AuthenticationFailed
 from django.db import transaction
+from django.db.models import Count, F, Max, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest, Least
+from django.conf import settings
+from .authentication import administrador_de, estudiante_de
+from .contadores import ajustar, leer as leer_contadores, pendientes_al_completar, recalcular_mensajes
+from .cache_publicaciones import claves_detalle, claves_lista, respuesta_cacheada
 from .models import (
     Administrador, ChatParticipante, Estudiante, Publicacion, CalificacionChat, Mensaje, Reporte,
-    TokenVerificacion, Perfil, Notificacion, Perfil, Chat
+    TokenVerificacion, Perfil, Notificacion, Perfil, Chat, Reputacion
+)
+from .hashing import PoolSaturado, get_pool
+from .limites_tasa import IPThrottle, consumir, retry_after
+from .matching import recomendar
+from .service import SoftDeleteService
+from .reputacion import registrar_calificacion
+from .notifications import notificar, otros_participantes
+from .realtime import publicar_al_confirmar
+from .search import buscar_publicaciones
+from .exportacion import FORMATOS, construir_queryset, respuesta_streaming
+from .moderacion import cola_pendiente, moderar_lote
+from .pagination import (
+    ColaModeracionPagination, InboxPagination, MensajePagination, NotificacionPagination, PublicacionPagination
 )
 from .serializers import (
-    ModerarReporteSerializer, PerfilCompletoSerializer, RegistroEstudianteSerializer, ActivarCuentaSerializer,
-    PublicacionSerializer, ChatSerializer, MensajeSerializer,
+    ColaModeracionSerializer, ModerarLoteSerializer, ModerarReporteSerializer, PerfilCompletoSerializer,
+    RegistroEstudianteSerializer, ActivarCuentaSerializer,
+    PublicacionSerializer, ChatSerializer, ChatInboxSerializer, MensajeSerializer,
     PerfilCompletoSerializer, NotificacionSerializer, ReporteSerializer,
-    CalificacionChatSerializer
+    CalificacionChatSerializer, ReputacionSerializer
 )
 
 # ----------- ESTUDIANTES -----------
 class RegistroEstudianteView(generics.CreateAPIView):
     serializer_class = RegistroEstudianteSerializer
     permission_classes = [permissions.AllowAny]
+    throttle_scope = 'registro'
 
 class ActivarCuentaView(generics.GenericAPIView):
     serializer_class = ActivarCuentaSerializer
@@ -41,115 +67,188 @@ class ActivarCuentaView(generics.GenericAPIView):
         except TokenVerificacion.DoesNotExist:
             return Response({"error": "Token inválido"}, status=status.HTTP_400_BAD_REQUEST)
 
+LOGIN_SATURADO = {"detail": "Demasiados inicios de sesión en curso, reintente en unos segundos"}
+
+
+def resultado_login(estudiante, valida, nuevo_hash):
+    """(datos, status) comunes a las vistas de login síncrona y asíncrona."""
+    if estudiante is None or not valida:
+        return {"detail": "Credenciales inválidas"}, status.HTTP_401_UNAUTHORIZED
+    if nuevo_hash:
+        # Actualiza el hash al hasher/work factor preferido sin tocar otras columnas
+        Estudiante.objects.filter(pk=estudiante.pk).update(contraseña=nuevo_hash)
+    if not estudiante.verificado:
+        return {"detail": "Cuenta no activada"}, status.HTTP_401_UNAUTHORIZED
+    return {"api_key": estudiante.api_key}, status.HTTP_200_OK
+
+
 class LoginEstudianteView(APIView):
+    """
+    Login síncrono. El hash se verifica en el pool acotado de core/hashing.py,
+    pero el hilo de la petición queda bloqueado esperándolo: el pool limita la
+    CPU, no los hilos ocupados. Para no bloquearlos, login_estudiante_async.
+    """
     permission_classes = [permissions.AllowAny]
+    throttle_scope = 'login'
     def post(self, request):
         email = request.data.get("email")
         password = request.data.get("password")
-        try:
-            estudiante = Estudiante.objects.get(email=email)
-        except Estudiante.DoesNotExist:
-            return Response({"detail": "Credenciales inválidas"}, status=status.HTTP_401_UNAUTHORIZED)
-        if not check_password(password, estudiante.contraseña):
+        estudiante = Estudiante.objects.filter(email=email).first()
+        if estudiante is None:
             return Response({"detail": "Credenciales inválidas"}, status=status.HTTP_401_UNAUTHORIZED)
-        if not estudiante.verificado:
-            return Response({"detail": "Cuenta no activada"}, status=status.HTTP_401_UNAUTHORIZED)
-        return Response({"api_key": estudiante.api_key}, status=status.HTTP_200_OK)
+        try:
+            valida, nuevo_hash = get_pool().verificar(password, estudiante.contraseña)
+        except PoolSaturado:
+            return Response(LOGIN_SATURADO, status=status.HTTP_503_SERVICE_UNAVAILABLE, headers={'Retry-After': '1'})
+        datos, codigo = resultado_login(estudiante, valida, nuevo_hash)
+        return Response(datos, status=codigo)
+
+
+@csrf_exempt
+@require_POST
+async def login_estudiante_async(request):
+    """
+    Igual que LoginEstudianteView, pero bajo ASGI espera el hash sin ocupar
+    el hilo compartido de las vistas síncronas.
+    """
+    # Fuera de DRF: el mismo límite por IP que LoginEstudianteView
+    espera = consumir('login', 'ip', IPThrottle().get_ident(request))
+    if espera:
+        respuesta = JsonResponse({"detail": "Demasiados intentos, reintente más tarde"}, status=status.HTTP_429_TOO_MANY_REQUESTS)
+        respuesta['Retry-After'] = retry_after(espera)
+        return respuesta
+    try:
+        cuerpo = json.loads(request.body or b'{}') if request.content_type == 'application/json' else request.POST
+    except ValueError:
+        return JsonResponse({"detail": "JSON inválido"}, status=status.HTTP_400_BAD_REQUEST)
+    estudiante = await Estudiante.objects.filter(email=cuerpo.get("email")).afirst()
+    if estudiante is None:
+        return JsonResponse({"detail": "Credenciales inválidas"}, status=status.HTTP_401_UNAUTHORIZED)
+    try:
+        valida, nuevo_hash = await get_pool().verificar_async(cuerpo.get("password"), estudiante.contraseña)
+    except PoolSaturado:
+        respuesta = JsonResponse(LOGIN_SATURADO, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        respuesta['Retry-After'] = '1'
+        return respuesta
+    datos, codigo = await sync_to_async(resultado_login)(estudiante, valida, nuevo_hash)
+    return JsonResponse(datos, status=codigo)
 
 # ----------- PUBLICACIONES -----------
 class PublicacionListCreateView(generics.ListCreateAPIView):
-    queryset = Publicacion.objects.all()
+    presupuesto_consultas = {'GET': 1, 'POST': 2}
+    queryset = Publicacion.activas.all()
     serializer_class = PublicacionSerializer
     permission_classes = [permissions.AllowAny]
+    pagination_class = PublicacionPagination
+    def list(self, request, *args, **kwargs):
+        return respuesta_cacheada(
+            request, claves_lista(), f'lista:{request.get_host()}{request.get_full_path()}',
+            lambda: super(PublicacionListCreateView, self).list(request, *args, **kwargs),
+        )
+
     def perform_create(self, serializer):
-        api_key = self.request.headers.get('X-API-Key')
-        if not api_key:
-            raise AuthenticationFailed("Falta API Key")
-        try:
-            estudiante = Estudiante.objects.get(api_key=api_key)
-        except Estudiante.DoesNotExist:
-            raise AuthenticationFailed("API Key inválida")
+        estudiante = estudiante_de(self.request)
         serializer.save(estudiante=estudiante)
 
+class PublicacionBusquedaView(generics.ListAPIView):
+    """
+    Búsqueda por texto en titulo y descripcion (?q=), ordenada por BM25.
+    Filtro opcional ?habilidad=. Solo un administrador puede pedir
+    ?estado=false o ?estado=todas; para el resto siempre son solo activas.
+    """
+    serializer_class = PublicacionSerializer
+    permission_classes = [permissions.AllowAny]
+    max_limit = 100
+    presupuesto_consultas = 1
+
+    def list(self, request, *args, **kwargs):
+        texto = request.query_params.get('q', '').strip()
+        if not texto:
+            return Response({'detail': 'q es requerido.'}, status=400)
+        estado = True
+        if isinstance(request.user, Administrador):
+            estado = request.query_params.get('estado', 'true').lower()
+            estado = None if estado == 'todas' else estado in ('true', '1')
+        try:
+            habilidad = request.query_params.get('habilidad')
+            habilidad = int(habilidad) if habilidad else None
+            limite = max(1, min(int(request.query_params.get('limit', 20)), self.max_limit))
+            desplazamiento = max(0, int(request.query_params.get('offset', 0)))
+        except ValueError:
+            return Response({'detail': 'habilidad, limit y offset deben ser enteros.'}, status=400)
+
+        resultados = buscar_publicaciones(
+            texto,
+            estado=estado,
+            habilidad=habilidad,
+            limite=limite,
+            desplazamiento=desplazamiento,
+        )
+        return Response({'results': PublicacionSerializer(resultados, many=True).data}, status=200)
+
 class PublicacionDetailView(generics.RetrieveAPIView):
-    queryset = Publicacion.objects.all()
+    presupuesto_consultas = 1
+    queryset = Publicacion.activas.all()
     serializer_class = PublicacionSerializer
     permission_classes = [permissions.AllowAny]
+    def retrieve(self, request, *args, **kwargs):
+        pk = kwargs['pk']
+        return respuesta_cacheada(
+            request, claves_detalle(pk), f'detalle:{pk}',
+            lambda: super(PublicacionDetailView, self).retrieve(request, *args, **kwargs),
+        )
 
 class PublicacionUpdateView(generics.UpdateAPIView):
     queryset = Publicacion.objects.all()
     serializer_class = PublicacionSerializer
     permission_classes = [permissions.AllowAny]
     def perform_update(self, serializer):
-        api_key = self.request.headers.get('X-API-Key')
-        if not api_key:
-            raise AuthenticationFailed("Falta API Key")
-        try:
-            estudiante = Estudiante.objects.get(api_key=api_key)
-        except Estudiante.DoesNotExist:
-            raise AuthenticationFailed("API Key inválida")
+        estudiante = estudiante_de(self.request)
         publicacion = self.get_object()
         if publicacion.estudiante != estudiante:
             raise AuthenticationFailed("No puedes editar publicaciones de otro estudiante")
         serializer.save()
 
 class PublicacionDeleteView(generics.DestroyAPIView):
-    queryset = Publicacion.objects.all()
+    queryset = Publicacion.activas.all()
     serializer_class = PublicacionSerializer
     permission_classes = [permissions.AllowAny]
     def perform_destroy(self, instance):
-        api_key = self.request.headers.get('X-API-Key')
-        if not api_key:
-            raise AuthenticationFailed("Falta API Key")
-        try:
-            estudiante = Estudiante.objects.get(api_key=api_key)
-        except Estudiante.DoesNotExist:
-            raise AuthenticationFailed("API Key inválida")
-        if instance.estudiante != estudiante:
+        estudiante = estudiante_de(self.request)
+        if instance.estudiante_id != estudiante.pk:
             raise AuthenticationFailed("No puedes eliminar publicaciones de otro estudiante")
-        instance.delete()
+        # Borrado lógico: conserva chats, reportes y calificaciones asociados
+        SoftDeleteService.desactivar(instance)
 
 class MisPublicacionesView(generics.ListAPIView):
+    presupuesto_consultas = 1
     serializer_class = PublicacionSerializer
     permission_classes = [permissions.AllowAny]
     def get_queryset(self):
-        api_key = self.request.headers.get('X-API-Key')
-        if not api_key:
-            raise AuthenticationFailed("Falta API Key")
-        try:
-            estudiante = Estudiante.objects.get(api_key=api_key)
-        except Estudiante.DoesNotExist:
-            raise AuthenticationFailed("API Key inválida")
+        estudiante = estudiante_de(self.request)
         return Publicacion.objects.filter(estudiante=estudiante)
 
 # ----------- CHAT Y MENSAJES -----------
-def crear_notificacion(estudiante, tipo, mensaje, chat=None, publicacion=None, calificacion=None):
-    Notificacion.objects.create(
-        estudiante=estudiante,
-        tipo=tipo,
-        mensaje=mensaje,
-        chat=chat,
-        publicacion=publicacion,
-        calificacion=calificacion
-    )
-
-
 class ChatListCreateView(generics.ListCreateAPIView):
-    queryset = Chat.objects.all().order_by('-fecha_inicio')
+    presupuesto_consultas = {'GET': 3, 'POST': 6}
     serializer_class = ChatSerializer
+    throttle_scope = {'POST': 'chats'}
+
+    def get_queryset(self):
+        # Por petición: la ventana de CHAT_MENSAJES_RECIENTES se lee al armar el Prefetch
+        return ChatSerializer.preparar_queryset(Chat.objects.all().order_by('-fecha_inicio'))
 
     @transaction.atomic
     def create(self, request, *args, **kwargs):
         # 1. Resolver receptor desde la API Key
-        api_key = request.headers.get('X-API-Key')
-        receptor = get_object_or_404(Estudiante, api_key=api_key)
+        receptor = estudiante_de(request)
 
         # 2. Resolver publicación
         publicacion_id = request.data.get('publicacion')
         if not publicacion_id:
             return Response({'detail': 'publicacion es requerida.'}, status=400)
 
-        publicacion = get_object_or_404(Publicacion, pk=publicacion_id)
+        publicacion = get_object_or_404(Publicacion.activas, pk=publicacion_id)
 
         # ⚠️ Usa el nombre real del campo en tu modelo Publicacion
         autor = publicacion.estudiante  # cámbialo si tu FK se llama distinto
@@ -161,13 +260,15 @@ class ChatListCreateView(generics.ListCreateAPIView):
         # 4. Crear chat
         chat = Chat.objects.create(publicacion=publicacion)
 
-        # 5. Crear participantes de forma segura (sin duplicados)
-        ChatParticipante.objects.get_or_create(chat=chat, estudiante=autor, defaults={'rol': 'autor'})
-        ChatParticipante.objects.get_or_create(chat=chat, estudiante=receptor, defaults={'rol': 'receptor'})
+        # 5. Crear participantes (el chat es nuevo, no puede haber duplicados)
+        ChatParticipante.objects.bulk_create([
+            ChatParticipante(chat=chat, estudiante=autor, rol='autor'),
+            ChatParticipante(chat=chat, estudiante=receptor, rol='receptor'),
+        ])
 
         # 6. Notificar al autor
-        crear_notificacion(
-            estudiante=autor,
+        notificar(
+            [autor.pk],
             tipo='nuevo_chat',
             mensaje=f'Nuevo chat sobre tu publicación {publicacion_id}',
             chat=chat,
@@ -177,27 +278,121 @@ class ChatListCreateView(generics.ListCreateAPIView):
         return Response(ChatSerializer(chat).data, status=201)
     
 class ChatDetailView(generics.RetrieveAPIView):
-    queryset = Chat.objects.all()
+    presupuesto_consultas = 4
     serializer_class = ChatSerializer
     lookup_field = 'pk'
 
+    def get_queryset(self):
+        return ChatSerializer.preparar_queryset(Chat.objects.all())
+
     def retrieve(self, request, *args, **kwargs):
         chat = self.get_object()
         # Solo participantes pueden ver
-        if not ChatParticipante.objects.filter(chat=chat, estudiante=request.user).exists():
+        if not ChatParticipante.objects.filter(chat=chat, estudiante=estudiante_de(request)).exists():
             return Response({'detail': 'No autorizado.'}, status=403)
         return Response(ChatSerializer(chat).data, status=200)
 
 
+class ChatInboxView(generics.ListAPIView):
+    """
+    Bandeja del estudiante autenticado: sus chats (vía ChatParticipante) con
+    el último mensaje, el nombre de la contraparte y los no leídos, todo
+    resuelto con subconsultas en una sola query por página.
+    """
+    serializer_class = ChatInboxSerializer
+    pagination_class = InboxPagination
+    presupuesto_consultas = 1
+
+    def get_queryset(self):
+        estudiante = estudiante_de(self.request)
+        ultimo = Mensaje.objects.filter(chat=OuterRef('pk')).order_by('-fecha', '-id_mensaje')
+        contraparte = (
+            Perfil.objects
+            .filter(estudiante__participaciones__chat=OuterRef('pk'))
+            .exclude(estudiante=estudiante)
+            .values('nombre')[:1]
+        )
+        # Rango (chat, id_mensaje > marca de lectura) sobre el índice de chat_id
+        no_leidos = (
+            Mensaje.objects
+            .filter(chat=OuterRef('pk'), id_mensaje__gt=OuterRef('ultimo_leido'))
+            .exclude(estudiante=estudiante)
+            .values('chat')
+            .annotate(total=Count('pk'))
+            .values('total')
+        )
+        return (
+            Chat.objects
+            .filter(participantes__estudiante=estudiante)
+            .annotate(ultimo_leido=F('participantes__ultimo_leido'))
+            .annotate(
+                ultimo_mensaje_id=Subquery(ultimo.values('id_mensaje')[:1]),
+                ultimo_mensaje_texto=Subquery(ultimo.values('texto')[:1]),
+                ultimo_mensaje_estudiante=Subquery(ultimo.values('estudiante')[:1]),
+                ultimo_mensaje_fecha=Subquery(ultimo.values('fecha')[:1]),
+                ultima_actividad=Coalesce(Subquery(ultimo.values('fecha')[:1]), 'fecha_inicio'),
+                contraparte_nombre=Subquery(contraparte),
+                no_leidos=Coalesce(Subquery(no_leidos), 0),
+            )
+        )
+
+
+class ChatMensajesView(generics.ListAPIView):
+    """
+    Historial de un chat por ventanas. ?before=<id_mensaje> devuelve los
+    mensajes anteriores a ese id y ?after=<id_mensaje> los posteriores;
+    sin parámetros devuelve los más recientes. Siempre en orden cronológico.
+    """
+    serializer_class = MensajeSerializer
+    max_limit = 100
+    presupuesto_consultas = 3
+
+    def list(self, request, pk=None):
+        chat = get_object_or_404(Chat, pk=pk)
+        if not ChatParticipante.objects.filter(chat=chat, estudiante=estudiante_de(request)).exists():
+            return Response({'detail': 'No autorizado.'}, status=403)
+
+        try:
+            before = int(request.query_params.get('before', 0))
+            after = int(request.query_params.get('after', 0))
+            limite = int(request.query_params.get('limit', getattr(settings, 'CHAT_MENSAJES_RECIENTES', 20)))
+        except ValueError:
+            return Response({'detail': 'before, after y limit deben ser enteros.'}, status=400)
+        limite = max(1, min(limite, self.max_limit))
+
+        mensajes = Mensaje.objects.filter(chat=chat)
+        if after:
+            filas = list(mensajes.filter(id_mensaje__gt=after).order_by('id_mensaje')[:limite + 1])
+            hay_mas = len(filas) > limite
+            filas = filas[:limite]
+            hay_anteriores = True
+        else:
+            if before:
+                mensajes = mensajes.filter(id_mensaje__lt=before)
+            filas = list(mensajes.order_by('-id_mensaje')[:limite + 1])
+            hay_anteriores = len(filas) > limite
+            filas = filas[:limite][::-1]
+            hay_mas = False
+
+        return Response({
+            'before': filas[0].pk if filas and hay_anteriores else None,
+            'after': filas[-1].pk if filas else (after or None),
+            'hay_mas': hay_mas,
+            'results': MensajeSerializer(filas, many=True).data,
+        }, status=200)
+
+
 class CompletarIntercambioView(generics.UpdateAPIView):
-    queryset = Chat.objects.all()
+    presupuesto_consultas = 7
     serializer_class = ChatSerializer
 
+    def get_queryset(self):
+        return ChatSerializer.preparar_queryset(Chat.objects.all())
+
     @transaction.atomic
     def patch(self, request, *args, **kwargs):
         # 1. Resolver estudiante desde API Key
-        api_key = request.headers.get('X-API-Key')
-        estudiante = get_object_or_404(Estudiante, api_key=api_key)
+        estudiante = estudiante_de(request)
 
         # 2. Resolver chat
         chat = self.get_object()
@@ -212,31 +407,101 @@ class CompletarIntercambioView(generics.UpdateAPIView):
         if not es_autor:
             return Response({'detail': 'Solo el autor puede completar el intercambio.'}, status=403)
 
-        # 4. Marcar chat como completado
-        chat.completado = True
-        chat.save()
+        # 4. Marcar chat como completado (y sumar la calificación pendiente una sola vez)
+        if not chat.estado_intercambio:
+            chat.estado_intercambio = True
+            chat.save(update_fields=['estado_intercambio'])
+            pendientes_al_completar(chat)
 
         # 5. Notificar al receptor
-        receptores = ChatParticipante.objects.filter(chat=chat).exclude(estudiante=estudiante)
-        for receptor in receptores:
-            crear_notificacion(
-                estudiante=receptor.estudiante,
-                tipo='intercambio_completado',
-                mensaje=f'El autor ha marcado el chat {chat.pk} como completado.',
-                chat=chat
-            )
+        notificar(
+            otros_participantes(chat, estudiante),
+            tipo='intercambio_completado',
+            mensaje=f'El autor ha marcado el chat {chat.pk} como completado.',
+            chat=chat
+        )
 
         return Response(ChatSerializer(chat).data, status=200)
 
+
+class ChatMarcarLeidoView(APIView):
+    """
+    Avanza la marca de lectura del estudiante en el chat hasta ?hasta=
+    (id_mensaje, en el body) o hasta el último mensaje. Un solo UPDATE de la
+    fila ChatParticipante: la marca nunca retrocede ni pasa del último mensaje.
+    Después se vuelve a contar su badge de mensajes con otro UPDATE.
+    """
+    presupuesto_consultas = 2
+
+    def post(self, request, pk):
+        estudiante = estudiante_de(request)
+        ultimo = Coalesce(
+            Subquery(
+                Mensaje.objects.filter(chat=pk).values('chat').annotate(ultimo=Max('id_mensaje')).values('ultimo')
+            ),
+            0,
+        )
+        hasta = request.data.get('hasta')
+        if hasta is not None:
+            try:
+                ultimo = Least(Value(int(hasta)), ultimo)
+            except (TypeError, ValueError):
+                return Response({'detail': 'hasta debe ser un id de mensaje.'}, status=400)
+        with transaction.atomic():
+            actualizados = ChatParticipante.objects.filter(chat=pk, estudiante=estudiante).update(
+                ultimo_leido=Greatest(F('ultimo_leido'), ultimo),
+                fecha_lectura=timezone.now(),
+            )
+            if not actualizados:
+                return Response({'detail': 'No eres participante de este chat.'}, status=403)
+            recalcular_mensajes(estudiante.pk)
+        return Response(status=204)
+
+
+class ChatNoLeidosView(APIView):
+    """No leídos del estudiante por chat y en total, en una consulta agrupada."""
+    presupuesto_consultas = 1
+
+    def get(self, request):
+        estudiante = estudiante_de(request)
+        por_chat = (
+            Mensaje.objects
+            .filter(
+                chat__participantes__estudiante=estudiante,
+                id_mensaje__gt=F('chat__participantes__ultimo_leido'),
+            )
+            .exclude(estudiante=estudiante)
+            .values('chat')
+            .annotate(no_leidos=Count('pk'))
+            .order_by('chat')
+        )
+        chats = [{'chat': fila['chat'], 'no_leidos': fila['no_leidos']} for fila in por_chat]
+        return Response({'total': sum(fila['no_leidos'] for fila in chats), 'chats': chats}, status=200)
+
 # Mensajes
 class MensajeListCreateView(generics.ListCreateAPIView):
-    queryset = Mensaje.objects.all().order_by('fecha')
+    presupuesto_consultas = {'GET': 1, 'POST': 5}
     serializer_class = MensajeSerializer
+    pagination_class = MensajePagination
+    throttle_scope = {'POST': 'mensajes'}
+
+    def get_queryset(self):
+        # Solo los mensajes de los chats del estudiante; ?chat= limita a uno de ellos
+        estudiante = estudiante_de(self.request)
+        queryset = Mensaje.objects.filter(
+            chat__in=ChatParticipante.objects.filter(estudiante=estudiante).values('chat')
+        )
+        chat = self.request.query_params.get('chat')
+        if chat:
+            try:
+                queryset = queryset.filter(chat_id=int(chat))
+            except ValueError:
+                raise ValidationError({'detail': 'chat debe ser un id numérico.'})
+        return queryset.order_by('fecha')
 
     @transaction.atomic
     def create(self, request, *args, **kwargs):
-        api_key = request.headers.get('X-API-Key')
-        remitente = get_object_or_404(Estudiante, api_key=api_key)
+        remitente = estudiante_de(request)
 
         chat_id = request.data.get('chat')
         if not chat_id:
@@ -258,29 +523,32 @@ class MensajeListCreateView(generics.ListCreateAPIView):
         )
 
         # Notificar al otro participante
-        otros = ChatParticipante.objects.filter(chat=chat).exclude(estudiante=remitente)
-        for otro in otros:
-            crear_notificacion(
-                estudiante=otro.estudiante,
-                tipo='nuevo_mensaje',
-                mensaje=f'Nuevo mensaje en el chat {chat.id_chat}',
-                chat=chat
-            )
+        otros = otros_participantes(chat, remitente)
+        notificar(
+            otros,
+            tipo='nuevo_mensaje',
+            mensaje=f'Nuevo mensaje en el chat {chat.id_chat}',
+            chat=chat
+        )
+
+        ajustar(otros, mensajes_no_leidos=1)
 
-        return Response(MensajeSerializer(mensaje).data, status=201)
+        datos = MensajeSerializer(mensaje).data
+        publicar_al_confirmar(otros, 'mensaje', datos)
+        return Response(datos, status=201)
 
 
 
 # Calificaciones de chat
 class CalificacionChatCreateView(generics.CreateAPIView):
+    presupuesto_consultas = 8
     queryset = CalificacionChat.objects.all()
     serializer_class = CalificacionChatSerializer
 
     @transaction.atomic
     def create(self, request, *args, **kwargs):
         # 1. Resolver estudiante desde API Key
-        api_key = request.headers.get('X-API-Key')
-        evaluador = get_object_or_404(Estudiante, api_key=api_key)
+        evaluador = estudiante_de(request)
 
         # 2. Resolver chat
         chat_id = request.data.get('chat')
@@ -303,6 +571,12 @@ class CalificacionChatCreateView(generics.CreateAPIView):
 
         if not puntaje:
             return Response({'detail': 'puntaje es requerido.'}, status=400)
+        try:
+            puntaje = int(puntaje)
+        except (TypeError, ValueError):
+            return Response({'detail': 'puntaje debe ser un entero.'}, status=400)
+        if not 1 <= puntaje <= 5:
+            return Response({'detail': 'El puntaje debe estar entre 1 y 5.'}, status=400)
 
         # 6. Crear calificación
         calificacion = CalificacionChat.objects.create(
@@ -312,27 +586,31 @@ class CalificacionChatCreateView(generics.CreateAPIView):
             comentario=comentario
         )
 
-        # 7. Notificar al otro participante
-        otros = ChatParticipante.objects.filter(chat=chat).exclude(estudiante=evaluador)
-        for otro in otros:
-            crear_notificacion(
-                estudiante=otro.estudiante,
-                tipo='calificacion_chat',
-                mensaje=f'El estudiante {evaluador.pk} calificó el chat {chat.pk}.',
-                chat=chat
-            )
+        # 7. Actualizar la reputación y notificar al otro participante
+        otros = otros_participantes(chat, evaluador)
+        registrar_calificacion(otros, puntaje)
+        if chat.estado_intercambio:
+            ajustar([evaluador.pk], calificaciones_pendientes=-1)
+        notificar(
+            otros,
+            tipo='calificacion_recibida',
+            mensaje=f'El estudiante {evaluador.pk} calificó el chat {chat.pk}.',
+            chat=chat,
+            calificacion=calificacion
+        )
 
         return Response(CalificacionChatSerializer(calificacion).data, status=201)
 
 
 # Notificaciones
 class NotificacionListView(generics.ListAPIView):
+    presupuesto_consultas = 1
     serializer_class = NotificacionSerializer
+    pagination_class = NotificacionPagination
 
     def get_queryset(self):
         # Resolver estudiante desde API Key
-        api_key = self.request.headers.get('X-API-Key')
-        estudiante = get_object_or_404(Estudiante, api_key=api_key)
+        estudiante = estudiante_de(self.request)
 
         return Notificacion.objects.filter(estudiante=estudiante).order_by('-fecha')
 
@@ -340,30 +618,41 @@ class MarcarNotificacionLeidaView(generics.UpdateAPIView):
     serializer_class = NotificacionSerializer
     queryset = Notificacion.objects.all()
 
+    @transaction.atomic
     def patch(self, request, pk=None):
-        notif = get_object_or_404(Notificacion, pk=pk, estudiante=request.user)
-        notif.leida = True
-        notif.save(update_fields=['leida'])
+        notif = get_object_or_404(Notificacion, pk=pk, estudiante=estudiante_de(request))
+        if not notif.leida:
+            notif.leida = True
+            notif.save(update_fields=['leida'])
+            ajustar([notif.estudiante_id], notificaciones_no_leidas=-1)
         return Response(NotificacionSerializer(notif).data, status=200)
 
 
 class MarcarTodasNotificacionesLeidasView(generics.CreateAPIView):
+    @transaction.atomic
     def post(self, request):
-        Notificacion.objects.filter(estudiante=request.user, leida=False).update(leida=True)
+        estudiante = estudiante_de(request)
+        leidas = Notificacion.objects.filter(estudiante=estudiante, leida=False).update(leida=True)
+        ajustar([estudiante.pk], notificaciones_no_leidas=-leidas)
         return Response({'detail': 'Todas las notificaciones marcadas como leídas.'}, status=200)
+
+
+class ContadoresView(APIView):
+    """
+    Badges del estudiante (notificaciones y mensajes no leídos, calificaciones
+    pendientes) leídos de su fila Contadores: una consulta por refresco.
+    """
+    presupuesto_consultas = 1
+
+    def get(self, request):
+        return Response(leer_contadores(estudiante_de(request)), status=200)
 # ----------- PERFIL Y NOTIFICACIONES -----------
 class CrearPerfilView(generics.CreateAPIView):
     serializer_class = PerfilCompletoSerializer
     permission_classes = [permissions.AllowAny]
 
     def perform_create(self, serializer):
-        api_key = self.request.headers.get('X-API-Key')
-        if not api_key:
-            raise AuthenticationFailed("Falta API Key")
-        try:
-            estudiante = Estudiante.objects.get(api_key=api_key)
-        except Estudiante.DoesNotExist:
-            raise AuthenticationFailed("API Key inválida")
+        estudiante = estudiante_de(self.request)
 
         if Perfil.objects.filter(estudiante=estudiante).exists():
             raise ValidationError({"detalle": "El perfil ya existe"})
@@ -371,17 +660,12 @@ class CrearPerfilView(generics.CreateAPIView):
         serializer.save(estudiante=estudiante)
 
 class PerfilDetailView(generics.RetrieveUpdateDestroyAPIView):
+    presupuesto_consultas = 2
     serializer_class = PerfilCompletoSerializer
     permission_classes = [permissions.AllowAny]
 
     def get_object(self):
-        api_key = self.request.headers.get('X-API-Key')
-        if not api_key:
-            raise AuthenticationFailed("Falta API Key")
-        try:
-            estudiante = Estudiante.objects.get(api_key=api_key)
-        except Estudiante.DoesNotExist:
-            raise AuthenticationFailed("API Key inválida")
+        estudiante = estudiante_de(self.request)
 
         try:
             return Perfil.objects.get(estudiante=estudiante)
@@ -389,22 +673,67 @@ class PerfilDetailView(generics.RetrieveUpdateDestroyAPIView):
             raise NotFound("Perfil no encontrado. Debe crearlo primero.")
 
 
+class RecomendacionesView(APIView):
+    """Estudiantes con intercambio recíproco de habilidades (?limit=, máx. 50)."""
+    max_limit = 50
+    presupuesto_consultas = 2
+
+    def get(self, request):
+        estudiante = estudiante_de(request)
+        try:
+            limite = max(1, min(int(request.query_params.get('limit', 10)), self.max_limit))
+        except ValueError:
+            return Response({'detail': 'limit debe ser entero.'}, status=400)
+        return Response({'results': recomendar(estudiante, limite=limite)}, status=200)
+
+
+class RankingReputacionView(generics.ListAPIView):
+    """Mejores promedios entre estudiantes con al menos ?minimo= calificaciones (por defecto 3)."""
+    serializer_class = ReputacionSerializer
+    permission_classes = [permissions.AllowAny]
+    max_limit = 100
+    presupuesto_consultas = 1
+
+    def get_queryset(self):
+        try:
+            minimo = int(self.request.query_params.get('minimo', 3))
+            limite = max(1, min(int(self.request.query_params.get('limit', 20)), self.max_limit))
+        except ValueError:
+            raise ValidationError({'detail': 'minimo y limit deben ser enteros.'})
+        return (
+            Reputacion.objects
+            .filter(cantidad__gte=minimo)
+            .select_related('estudiante__perfil')
+            .order_by('-promedio', '-cantidad')[:limite]
+        )
+
+
 #--------------------------- REPORTES -----------
 class CrearReporteView(generics.CreateAPIView):
     serializer_class = ReporteSerializer
     permission_classes = [permissions.AllowAny]
 
     def perform_create(self, serializer):
-        api_key = self.request.headers.get('X-API-Key')
-        if not api_key:
-            raise AuthenticationFailed("Falta API Key")
-        estudiante = Estudiante.objects.get(api_key=api_key)
+        estudiante = estudiante_de(self.request)
         serializer.save(estudiante=estudiante)
 
 class ListarReportesView(generics.ListAPIView):
+    presupuesto_consultas = 1
     queryset = Reporte.objects.all()
     serializer_class = ReporteSerializer
-    permission_classes = [permissions.IsAdminUser]
+    permission_classes = [permissions.AllowAny]
+
+    def get_queryset(self):
+        administrador_de(self.request)
+        queryset = super().get_queryset()
+        # ?estado= y ?publicacion= para revisar el detalle de una fila de la cola
+        try:
+            for campo in ('estado', 'publicacion'):
+                if campo in self.request.query_params:
+                    queryset = queryset.filter(**{campo: int(self.request.query_params[campo])})
+        except ValueError:
+            raise ValidationError({'detail': 'estado y publicacion deben ser enteros.'})
+        return queryset
     
 class ModerarReporteView(generics.UpdateAPIView):
     serializer_class = ModerarReporteSerializer
@@ -412,8 +741,67 @@ class ModerarReporteView(generics.UpdateAPIView):
     permission_classes = [permissions.AllowAny]
 
     def get_object(self):
-        obj = super().get_object()
-        api_key = self.request.headers.get("X-API-Key")
-        if not api_key or not Administrador.objects.filter(api_key=api_key).exists():
-            raise AuthenticationFailed("No tienes permisos de moderador")
-        return obj
+        administrador_de(self.request)
+        return super().get_object()
+
+    def perform_update(self, serializer):
+        serializer.save(administrador=administrador_de(self.request))
+
+
+class ColaModeracionView(generics.ListAPIView):
+    """
+    Reportes pendientes agrupados por publicación, de mayor a menor cantidad
+    de reportantes distintos. Una consulta agregada por página.
+    """
+    serializer_class = ColaModeracionSerializer
+    pagination_class = ColaModeracionPagination
+    permission_classes = [permissions.AllowAny]
+    presupuesto_consultas = 1
+
+    def get_queryset(self):
+        administrador_de(self.request)
+        return cola_pendiente()
+
+
+class ModerarReportesLoteView(generics.GenericAPIView):
+    """
+    Aprueba, rechaza o elimina (da de baja la publicación) en una sola
+    transacción: {"accion": ..., "reportes": [ids], "publicaciones": [ids]}.
+    """
+    serializer_class = ModerarLoteSerializer
+    permission_classes = [permissions.AllowAny]
+    presupuesto_consultas = 4
+
+    def post(self, request):
+        administrador = administrador_de(request)
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        cambios = moderar_lote(administrador, **serializer.validated_data)
+        return Response(cambios, status=200)
+
+
+class ExportarView(APIView):
+    """
+    Descarga en streaming de reportes, chats (transcripciones) o publicaciones.
+    Filtros: ?desde=&hasta= (fecha o fecha-hora), ?estado=, ?chat= (repetible),
+    ?formato=csv|jsonl y ?gzip=1.
+    """
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request, tipo):
+        administrador_de(request)
+        formato = request.query_params.get('formato', 'csv')
+        if formato not in FORMATOS:
+            return Response({'detail': 'formato debe ser csv o jsonl.'}, status=400)
+        try:
+            queryset = construir_queryset(
+                tipo,
+                desde=request.query_params.get('desde'),
+                hasta=request.query_params.get('hasta'),
+                estado=request.query_params.get('estado'),
+                chats=request.query_params.getlist('chat'),
+            )
+        except ValueError as exc:
+            return Response({'detail': str(exc)}, status=400)
+        gzip = request.query_params.get('gzip') in ('1', 'true')
+        return respuesta_streaming(request, tipo, queryset, formato=formato, gzip=gzip)
@@ -13,4 +13,16 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'interu_backend.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Se importa después de cargar Django: depende de los modelos de core
+from core.realtime import websocket_eventos  # noqa: E402
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'websocket' and scope['path'].rstrip('/') == '/ws/eventos':
+        return await websocket_eventos(scope, receive, send)
+    if scope['type'] == 'websocket':
+        await send({'type': 'websocket.close'})
+        return
+    return await django_application(scope, receive, send)
@@ -43,12 +43,15 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.InstrumentacionSQLMiddleware',
+    'core.middleware.IdempotenciaMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.middleware.EnrutamientoLecturaMiddleware',
 ]
 
 ROOT_URLCONF = 'interu_backend.urls'
@@ -78,13 +81,56 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
-    }
+        'OPTIONS': {
+            # Toma el lock de escritura al abrir la transacción, en vez de
+            # fallar con 'database is locked' al intentar escalarlo
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 20,
+        },
+    },
+    # Mismo archivo, conexión aparte para endpoints de solo lectura
+    'lectura': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {'timeout': 20},
+        'TEST': {'MIRROR': 'default'},
+    },
+}
+
+DATABASE_ROUTERS = ['core.db.LecturaEscrituraRouter']
+
+# Se aplican a cada conexión nueva (ver core/db.py)
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 20000,
+    'cache_size': -64000,  # 64 MB
+    'mmap_size': 268435456,  # 256 MB
+    'temp_store': 'MEMORY',
 }
 
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
+# El primero es el preferido: make_password lo usa y los hashes antiguos se
+# regeneran con él en el siguiente login correcto (ver core/hashing.py)
+PASSWORD_HASHERS = [
+    'core.hashing.PBKDF2ConfigurableHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+
+# Work factor de PBKDF2ConfigurableHasher
+HASH_ITERACIONES = 1_000_000
+
+# Pool de verificación de contraseñas del login. Limita la CPU; /login/ igual
+# bloquea su hilo mientras espera, /login/async/ (ASGI) no
+LOGIN_POOL_WORKERS = 4
+LOGIN_POOL_MAX_PENDIENTES = 32
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -122,3 +168,100 @@ STATIC_URL = 'static/'
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+
+# Django REST framework
+# Todas las vistas resuelven al Estudiante/Administrador desde X-API-Key
+
+REST_FRAMEWORK = {
+    'DEFAULT_AUTHENTICATION_CLASSES': [
+        'core.authentication.ApiKeyAuthentication',
+    ],
+    # Proxies de confianza delante de la app. Con 0 la IP de los límites por IP
+    # es REMOTE_ADDR y X-Forwarded-For (que el cliente puede inventar) se
+    # ignora; detrás de nginx u otro proxy, poner la cantidad real
+    'NUM_PROXIES': 0,
+    # Solo actúan en vistas con throttle_scope (ver core/limites_tasa.py)
+    'DEFAULT_THROTTLE_CLASSES': [
+        'core.limites_tasa.ApiKeyThrottle',
+        'core.limites_tasa.IPThrottle',
+    ],
+}
+
+# Caché en memoria de API Keys (ver core/authentication.py). Es por proceso:
+# en los demás workers una key rotada o borrada sigue valiendo hasta el TTL
+API_KEY_CACHE_MAX_ENTRADAS = 4096
+API_KEY_CACHE_TTL = 60
+
+# Paginación por cursor (ver core/pagination.py)
+PAGINACION_PAGE_SIZE = 20
+PAGINACION_MAX_PAGE_SIZE = 100
+
+# Mensajes que se incluyen en la representación de un chat
+CHAT_MENSAJES_RECIENTES = 20
+
+# Las notificaciones se escriben después del commit de la petición
+NOTIFICACIONES_AL_CONFIRMAR = True
+# Con True las escribe run_worker. Requiere un REALTIME_BROKER compartido:
+# lo que publica el worker en BrokerMemoria no llega a los clientes de la web
+NOTIFICACIONES_EN_COLA = False
+
+# Broker de eventos en tiempo real (ver core/realtime.py). BrokerMemoria solo
+# sirve para un proceso; con varios workers se debe usar un broker compartido.
+REALTIME_BROKER = 'core.realtime.BrokerMemoria'
+
+# Caché de respuestas de publicaciones (ver core/cache_publicaciones.py).
+# locmem es por proceso: con varios workers conviene un backend compartido
+# (p. ej. FileBasedCache o Redis) para que la invalidación llegue a todos.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'interu',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+    # Respuestas guardadas por Idempotency-Key: locmem descarta las menos
+    # usadas (LRU) al pasar MAX_ENTRIES
+    'idempotencia': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'interu-idempotencia',
+        'OPTIONS': {'MAX_ENTRIES': 20000},
+    },
+}
+PUBLICACIONES_CACHE = 'default'
+PUBLICACIONES_CACHE_TTL = 300
+
+# Instrumentación de SQL por petición (ver core/instrumentacion.py): cabecera
+# Server-Timing y una línea JSON por petición en el logger 'core.sql'.
+# SQL_INSTRUMENTACION_TRAZAS guarda el stack de las consultas repetidas.
+SQL_INSTRUMENTACION = True
+SQL_INSTRUMENTACION_LENTAS = 3
+SQL_INSTRUMENTACION_TRAZAS = False
+
+# Idempotency-Key en los POST (ver core/idempotencia.py). Igual que la caché de
+# publicaciones, con varios workers el alias debe apuntar a un backend compartido.
+IDEMPOTENCIA = True
+IDEMPOTENCIA_CACHE = 'idempotencia'
+IDEMPOTENCIA_TTL = 86400  # 24 h
+IDEMPOTENCIA_EN_CURSO_TTL = 30
+
+# Límites de tasa (token bucket, ver core/limites_tasa.py).
+# scope: {tipo: (capacidad, tokens repuestos por segundo)}. Por IP los límites
+# son más holgados porque muchos estudiantes comparten la IP del campus.
+LIMITES_TASA = {
+    'mensajes': {'api_key': (20, 0.5), 'ip': (300, 10)},  # ráfaga de 20, luego 30/min
+    'chats': {'api_key': (10, 1 / 12), 'ip': (100, 2)},  # ráfaga de 10, luego 5/min
+    'registro': {'ip': (10, 1 / 30)},  # ráfaga de 10, luego 2/min
+    'login': {'ip': (60, 1)},
+}
+# AlmacenMemoria es por proceso; con varios workers, AlmacenSQLite comparte
+# las cubetas en LIMITES_TASA_SQLITE.
+LIMITES_TASA_ALMACEN = 'core.limites_tasa.AlmacenMemoria'
+LIMITES_TASA_MAX_CLAVES = 100_000
+LIMITES_TASA_SQLITE = BASE_DIR / 'limites_tasa.sqlite3'
+
+# Cola de tareas en segundo plano (ver core/tareas.py). Lo encolado solo se
+# ejecuta si hay al menos un `manage.py run_worker` corriendo
+TAREAS_MAX_INTENTOS = 5
+TAREAS_VISIBILIDAD = 300  # segundos que una tarea reservada queda oculta a otros workers
+TAREAS_BACKOFF_BASE = 10  # segundos antes del primer reintento; se duplica en cada uno
+TAREAS_BACKOFF_MAXIMO = 3600